@@ -38,6 +38,7 @@
 #include "conic.hpp"
 #include "jit_function.hpp"
 #include "serializing_stream.hpp"
+#include "mapped_file.hpp"
 
 #include <cctype>
 #include <fstream>
@@ -591,6 +592,10 @@ namespace casadi {
   Function::map(casadi_int n, const std::string& parallelization,
       casadi_int max_num_threads) const {
     casadi_assert(max_num_threads>=1, "max_num_threads invalid.");
+    // Threads are limited by the map itself
+    if (parallelization=="thread") {
+      return map(n, parallelization, Dict{{"max_num_threads", max_num_threads}});
+    }
     // No need for logic when we are not saturating the limit
     if (n<=max_num_threads) return map(n, parallelization);
 
@@ -620,6 +625,11 @@ namespace casadi {
 
   Function
   Function::map(casadi_int n, const std::string& parallelization) const {
+    return map(n, parallelization, Dict());
+  }
+
+  Function
+  Function::map(casadi_int n, const std::string& parallelization, const Dict& opts) const {
     // Make sure not degenerate
     casadi_assert(n>0, "Degenerate map operation");
     // Quick return if possible
@@ -649,10 +659,10 @@ namespace casadi {
         res[i] = horzcat(tmp);
       }
       // Construct function
-      return Function(name() + "_" + str(n), arg, res, name_in(), name_out());
+      return Function(name() + "_" + str(n), arg, res, name_in(), name_out(), opts);
     } else {
       // Generate/retrieve potentially cached map
-      return (*this)->map(n, parallelization);
+      return (*this)->map(n, parallelization, opts);
     }
   }
 
@@ -820,6 +830,18 @@ namespace casadi {
     return (*this)->get_stats(memory(mem));
   }
 
+  std::string Function::profile(const std::string& format) const {
+    try {
+      return (*this)->get_profile(format);
+    } catch (exception& e) {
+      THROW_ERROR("profile", e.what());
+    }
+  }
+
+  void Function::reset_profile() const {
+    (*this)->reset_profile();
+  }
+
   const Sparsity Function::
   sparsity_jac(casadi_int iind, casadi_int oind, bool compact, bool symmetric) const {
     try {
@@ -913,6 +935,8 @@ namespace casadi {
 
   size_t Function::sz_w() const { return (*this)->sz_w();}
 
+  size_t Function::sz_w_batch(casadi_int K) const { return (*this)->sz_w_batch(K);}
+
   int Function::operator()(const bvec_t** arg, bvec_t** res,
                             casadi_int* iw, bvec_t* w, casadi_int mem) const {
     try {
@@ -1144,7 +1168,19 @@ namespace casadi {
     return deserialize(s);
   }
 
-  Function Function::load(const std::string& filename) {
+  Function Function::load(const std::string& filename, const Dict& opts) {
+    bool mmap = false;
+    for (auto&& op : opts) {
+      if (op.first=="mmap") {
+        mmap = op.second;
+      } else {
+        casadi_error("Unknown option: '" + op.first + "'.");
+      }
+    }
+    if (mmap) {
+      DeserializingStream s(std::make_shared<MappedFile>(filename));
+      return deserialize(s);
+    }
     std::ifstream stream(filename, ios_base::binary | std::ios::in);
     if ((stream.rdstate() & std::ifstream::failbit) != 0) {
       casadi_error("Could not open file '" + filename + "'.");
@@ -1314,6 +1350,65 @@ namespace casadi {
     }
   }
 
+  int Function::eval_batch(const double** arg, double** res,
+      casadi_int* iw, double* w, casadi_int K) const {
+    try {
+      scoped_checkout<Function> mem(*this);
+      return (*this)->eval_batch(arg, res, iw, w, memory(mem), K);
+    } catch (exception& e) {
+      THROW_ERROR("eval_batch", e.what());
+    }
+  }
+
+  vector<DM> Function::eval_batch(const vector<DM>& arg, casadi_int K) const {
+    try {
+      casadi_assert(K>=1, "Number of points must be positive, got " + str(K));
+      casadi_assert(arg.size()==n_in(), "Incorrect number of inputs: Expected "
+                    + str(n_in()) + ", got " + str(arg.size()));
+
+      // Inputs at K points side by side
+      vector<DM> arg1(n_in());
+      vector<const double*> argp(sz_arg(), nullptr);
+      for (casadi_int i=0; i<n_in(); ++i) {
+        const Sparsity& sp = sparsity_in(i);
+        if (arg[i].is_empty()) {
+          arg1[i] = DM(repmat(sp, 1, K), default_in(i));
+        } else if (arg[i].size()==sp.size()) {
+          arg1[i] = repmat(project(arg[i], sp), 1, K);
+        } else {
+          casadi_assert(arg[i].size1()==sp.size1() && arg[i].size2()==K*sp.size2(),
+                        "Input " + str(i) + " (" + name_in(i) + ") has dimension "
+                        + str(arg[i].size1()) + "-by-" + str(arg[i].size2())
+                        + ", expected " + str(sp.size1()) + "-by-" + str(sp.size2())
+                        + " or " + str(sp.size1()) + "-by-" + str(K*sp.size2()));
+          arg1[i] = project(arg[i], repmat(sp, 1, K));
+        }
+        argp[i] = get_ptr(arg1[i].nonzeros());
+      }
+
+      // Outputs at K points side by side
+      vector<DM> res(n_out());
+      vector<double*> resp(sz_res(), nullptr);
+      for (casadi_int i=0; i<n_out(); ++i) {
+        res[i] = DM::zeros(repmat(sparsity_out(i), 1, K));
+        resp[i] = get_ptr(res[i].nonzeros());
+      }
+
+      // Work vectors
+      vector<casadi_int> iw(sz_iw());
+      vector<double> w(sz_w_batch(K));
+
+      scoped_checkout<Function> mem(*this);
+      if ((*this)->eval_batch(get_ptr(argp), get_ptr(resp), get_ptr(iw), get_ptr(w),
+                              memory(mem), K)) {
+        casadi_error("Evaluation failed");
+      }
+      return res;
+    } catch (exception& e) {
+      THROW_ERROR("eval_batch", e.what());
+    }
+  }
+
   int Function::operator()(const SXElem** arg, SXElem** res,
       casadi_int* iw, SXElem* w, casadi_int mem) const {
     try {
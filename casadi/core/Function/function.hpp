@@ -478,6 +478,21 @@ namespace casadi {
     int operator()(const double** arg, double** res,
         casadi_int* iw, double* w) const;
 
+    /** \brief Evaluate numerically at K points at once
+        The inputs and outputs hold the K points one after another, like the
+        inputs and outputs of map(K). w must have length sz_w_batch(K).
+     */
+    int eval_batch(const double** arg, double** res,
+        casadi_int* iw, double* w, casadi_int K) const;
+
+    /** \brief Evaluate numerically at K points at once
+        Each input is given at K points side by side, or at one point used for all.
+        Returns the outputs at the K points side by side.
+        Faster than a loop over the points or map(K) for SXFunction, which
+        applies each operation to all points before moving on to the next.
+     */
+    std::vector<DM> eval_batch(const std::vector<DM>& arg, casadi_int K) const;
+
     /** \brief Evaluate memory-less SXElem
         Same syntax as the double version, allowing use in templated code
      */
@@ -578,11 +593,13 @@ namespace casadi {
                 s_(N-1) <- f(a_(N-1), p_(N-1))
         \endverbatim
 
-        \param parallelization Type of parallelization used: unroll|serial|openmp
+        \param parallelization Type of parallelization used: unroll|serial|openmp|thread
+        \param opts Options for the map, e.g. max_num_threads and chunk_size for thread
     */
     Function map(casadi_int n, const std::string& parallelization="serial") const;
     Function map(casadi_int n, const std::string& parallelization,
       casadi_int max_num_threads) const;
+    Function map(casadi_int n, const std::string& parallelization, const Dict& opts) const;
 
     ///@{
     /** \brief Map with reduction
@@ -716,7 +733,18 @@ namespace casadi {
     /** \brief Serialize an object */
     void serialize(SerializingStream &s) const;
 
-    /** \brief Serialize */
+    /** \brief Serialize
+     *
+     * Options:
+     *   debug (bool): Add type information, checked when deserializing
+     *   aligned (bool): Write unencoded with 8-byte aligned numeric blocks,
+     *     such that load(filename, {{"mmap", true}}) can use them in place.
+     *     The result is binary data.
+     *   compact (bool): Code integers as variable-length differences and write
+     *     repeated sparsity patterns once
+     *   compression (string): 'none' or 'zlib' (requires WITH_ZLIB).
+     *     The result is binary data.
+     */
     std::string serialize(const Dict& opts=Dict()) const;
     void save(const std::string &fname, const Dict& opts=Dict()) const;
 
@@ -746,6 +774,19 @@ namespace casadi {
     /// Get all statistics obtained at the end of the last evaluate call
     Dict stats(casadi_int mem=0) const;
 
+    /** \brief Get the recorded profile of the numerical evaluations
+     *
+     * Requires the "profile" option. Format "json" returns the call tree, with
+     * the number of calls, the inclusive (t_wall) and exclusive (t_self) wall
+     * time and the work vector size for every (nested) callee. Format "trace"
+     * returns the individual calls in the Chrome trace-event format, which can
+     * be opened in chrome://tracing or Perfetto.
+     */
+    std::string profile(const std::string& format="json") const;
+
+    /** \brief Clear the recorded profile */
+    void reset_profile() const;
+
     ///@{
     /** \brief Get symbolic primitives equivalent to the input expressions
      * There is no guarantee that subsequent calls return unique answers
@@ -870,6 +911,9 @@ namespace casadi {
     /** \brief Get required length of w field */
     size_t sz_w() const;
 
+    /** \brief Get required length of w field for eval_batch */
+    size_t sz_w_batch(casadi_int K) const;
+
     /** \brief Get number of temporary variables needed */
     void sz_work(size_t& sz_arg, size_t& sz_res, size_t& sz_iw, size_t& sz_w) const;
 
@@ -922,8 +966,14 @@ namespace casadi {
     /** \brief Build function from serialization */
     static Function deserialize(const std::string& s);
 
-    /** \brief Build function from serialization */
-    static Function load(const std::string& filename);
+    /** \brief Build function from serialization
+     *
+     * Options:
+     *   mmap (bool): Memory-map the file instead of reading it. Constant nonzeros
+     *     of files saved with the "aligned" option are then used in place,
+     *     shared between all processes loading the same file.
+     */
+    static Function load(const std::string& filename, const Dict& opts=Dict());
 
     /** \brief Build function from serialization */
     static Function deserialize(DeserializingStream& s);
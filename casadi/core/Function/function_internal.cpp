@@ -40,8 +40,14 @@
 #include "conic_impl.hpp"
 #include "integrator_impl.hpp"
 #include "external_impl.hpp"
+#include "jit_cache.hpp"
+#include "casadi_meta.hpp"
+#include "thread_pool.hpp"
 
 #include <cctype>
+#include <exception>
+#include <functional>
+#include <memory>
 #include <typeinfo>
 #ifdef WITH_DL
 #include <cstdlib>
@@ -80,6 +86,8 @@ namespace casadi {
     jit_cleanup_ = true;
     jit_base_name_ = "jit_tmp";
     jit_temp_suffix_ = true;
+    jit_cache_max_size_ = 1 << 30;
+    jit_cache_max_entries_ = 0;
     compiler_plugin_ = "clang";
     print_time_ = true;
     eval_ = nullptr;
@@ -95,6 +103,7 @@ namespace casadi {
     dump_dir_ = ".";
     dump_format_ = "mtx";
     dump_ = false;
+    profile_ = false;
     sz_arg_tmp_ = 0;
     sz_res_tmp_ = 0;
     sz_iw_tmp_ = 0;
@@ -217,6 +226,29 @@ namespace casadi {
         "This is desired for thread-safety. "
         "This behaviour may defeat caching compiler wrappers. "
         "Default: true"}},
+      {"jit_cache",
+       {OT_STRING,
+        "Directory of an on-disk cache of compiled code, shared between processes. "
+        "Entries are keyed by the generated code, the compiler and its options, "
+        "such that the compiler is not invoked if the code has been compiled before. "
+        "Requires a compiler plugin that reports the library it builds. "
+        "Default: '' (no caching)"}},
+      {"jit_cache_max_size",
+       {OT_INT,
+        "Maximum total size in bytes of the libraries in the jit cache. "
+        "Least recently used entries are evicted first. Non-positive for no limit. "
+        "Default: 1 GiB"}},
+      {"jit_cache_max_entries",
+       {OT_INT,
+        "Maximum number of entries in the jit cache. "
+        "Least recently used entries are evicted first. Non-positive for no limit. "
+        "Default: 0"}},
+      {"sparsity_cache",
+       {OT_STRING,
+        "Directory of an on-disk cache of Jacobian sparsity patterns and seed matrices "
+        "(graph colorings), shared between processes. Entries are keyed by a structural "
+        "hash of the function, which must be serializable. "
+        "Default: '' (no caching)"}},
       {"compiler",
        {OT_STRING,
         "Just-in-time compiler plugin to be used."}},
@@ -274,6 +306,11 @@ namespace casadi {
       {"dump",
        {OT_BOOL,
         "Dump function to file upon first evaluation. [false]"}},
+      {"profile",
+       {OT_BOOL,
+        "Record a hierarchical profile of the numerical evaluations, including nested "
+        "function calls, retrievable with Function::profile. Nested calls are recorded "
+        "in the profile of the outermost profiled function [default: false]"}},
       {"dump_dir",
        {OT_STRING,
         "Directory to dump inputs/outputs to. Make sure the directory exists [.]"}},
@@ -319,6 +356,10 @@ namespace casadi {
     opts["jit_options"] = jit_options_;
     opts["jit_name"] = jit_name_;
     opts["jit_temp_suffix"] = jit_temp_suffix_;
+    opts["jit_cache"] = jit_cache_;
+    opts["jit_cache_max_size"] = jit_cache_max_size_;
+    opts["jit_cache_max_entries"] = jit_cache_max_entries_;
+    opts["sparsity_cache"] = sparsity_cache_;
     opts["derivative_of"] = derivative_of_;
     opts["ad_weight"] = ad_weight_;
     opts["ad_weight_sp"] = ad_weight_sp_;
@@ -337,6 +378,7 @@ namespace casadi {
     opts["dump_dir"] = dump_dir_;
     opts["dump_format"] = dump_format_;
     opts["dump"] = dump_;
+    opts["profile"] = profile_;
     opts["forward_options"] = forward_options_;
     opts["reverse_options"] = reverse_options_;
     return opts;
@@ -377,6 +419,14 @@ namespace casadi {
         jit_base_name_ = op.second.to_string();
       } else if (op.first=="jit_temp_suffix") {
         jit_temp_suffix_ = op.second;
+      } else if (op.first=="jit_cache") {
+        jit_cache_ = op.second.to_string();
+      } else if (op.first=="jit_cache_max_size") {
+        jit_cache_max_size_ = op.second;
+      } else if (op.first=="jit_cache_max_entries") {
+        jit_cache_max_entries_ = op.second;
+      } else if (op.first=="sparsity_cache") {
+        sparsity_cache_ = op.second.to_string();
       } else if (op.first=="derivative_of") {
         derivative_of_ = op.second;
       } else if (op.first=="ad_weight") {
@@ -409,6 +459,8 @@ namespace casadi {
         dump_out_ = op.second;
       } else if (op.first=="dump") {
         dump_ = op.second;
+      } else if (op.first=="profile") {
+        profile_ = op.second;
       } else if (op.first=="dump_dir") {
         dump_dir_ = op.second.to_string();
       } else if (op.first=="dump_format") {
@@ -512,9 +564,35 @@ namespace casadi {
         opts["prefix"] = "jit";
         CodeGenerator gen(jit_name_, opts);
         gen.add(self());
-        if (verbose_) casadi_message("Compiling function '" + name_ + "'..");
-        compiler_ = Importer(gen.generate(), compiler_plugin_, jit_options_);
-        if (verbose_) casadi_message("Compiling function '" + name_ + "' done.");
+        std::string src = gen.generate();
+        // Look up the compiled code in the on-disk cache
+        std::string code, key, lib;
+        if (!jit_cache_.empty()) {
+          code = gen.dump();
+          key = JitCache::key(code, compiler_plugin_, jit_options_);
+          lib = JitCache(jit_cache_, jit_cache_max_size_, jit_cache_max_entries_).lookup(key, code);
+        }
+        if (!lib.empty()) {
+          if (verbose_) casadi_message("Loading function '" + name_ + "' from " + lib + ".");
+          compiler_ = Importer(lib, "dll");
+        } else {
+          if (verbose_) casadi_message("Compiling function '" + name_ + "'..");
+          compiler_ = Importer(src, compiler_plugin_, jit_options_);
+          if (verbose_) casadi_message("Compiling function '" + name_ + "' done.");
+          if (!jit_cache_.empty()) {
+            if (compiler_.library().empty()) {
+              // The plugin does not report the shared library it built
+              casadi_warning("Compiler plugin '" + compiler_plugin_ + "' does not report "
+                             "the library it builds, function '" + name_ + "' cannot be "
+                             "added to the jit cache.");
+            } else {
+              JitCache cache(jit_cache_, jit_cache_max_size_, jit_cache_max_entries_);
+              if (cache.insert(key, code, compiler_.library()).empty()) {
+                casadi_warning("Failed to add function '" + name_ + "' to the jit cache.");
+              }
+            }
+          }
+        }
         // Try to load
         eval_ = (eval_t)compiler_.get_function(name_);
         casadi_assert(eval_!=nullptr, "Cannot load JIT'ed function.");
@@ -619,8 +697,67 @@ namespace casadi {
     return dump_count_++;
   }
 
+  /// \cond INTERNAL
+  // Times a numerical evaluation in the call tree of the current thread, if any
+  class ProfileScope {
+  public:
+    explicit ProfileScope(const FunctionInternal& f) : f_(f), profile_(CallProfile::active()) {
+      if (!profile_) {
+        if (!f.profile_) return;
+        // Outermost profiled call, start a new call tree
+        owner_.reset(new CallProfile());
+        profile_ = CallProfile::active() = owner_.get();
+      }
+      profile_->enter(&f, f.name_, f.sz_w()*sizeof(double) + f.sz_iw()*sizeof(casadi_int));
+    }
+
+    ~ProfileScope() {
+      if (!profile_) return;
+      profile_->leave();
+      if (owner_) {
+        CallProfile::active() = nullptr;
+        f_.add_profile(*owner_);
+      }
+    }
+
+  private:
+    const FunctionInternal& f_;
+    CallProfile* profile_;
+    std::unique_ptr<CallProfile> owner_;
+  };
+  /// \endcond
+
+  std::string FunctionInternal::get_profile(const std::string& format) const {
+#ifdef CASADI_WITH_THREAD
+    std::lock_guard<std::mutex> lock(profile_mtx_);
+#endif // CASADI_WITH_THREAD
+    if (format=="json") {
+      return profile_data_.to_json();
+    } else if (format=="trace") {
+      return profile_data_.to_trace();
+    } else {
+      casadi_error("Unknown profile format '" + format + "', expected 'json' or 'trace'");
+    }
+  }
+
+  void FunctionInternal::reset_profile() const {
+#ifdef CASADI_WITH_THREAD
+    std::lock_guard<std::mutex> lock(profile_mtx_);
+#endif // CASADI_WITH_THREAD
+    profile_data_.reset();
+  }
+
+  void FunctionInternal::add_profile(const CallProfile& p) const {
+#ifdef CASADI_WITH_THREAD
+    std::lock_guard<std::mutex> lock(profile_mtx_);
+#endif // CASADI_WITH_THREAD
+    profile_data_.merge(p);
+  }
+
   int FunctionInternal::
   eval_gen(const double** arg, double** res, casadi_int* iw, double* w, void* mem) const {
+    // Record the call if profiling
+    ProfileScope profile_scope(*this);
     casadi_int dump_id = (dump_in_ || dump_out_ || dump_) ? get_dump_id() : 0;
     if (dump_in_) dump_in(dump_id, arg);
     if (dump_ && dump_id==0) dump();
@@ -658,6 +795,24 @@ namespace casadi {
     return ret;
   }
 
+  int FunctionInternal::eval_batch(const double** arg, double** res, casadi_int* iw,
+      double* w, void* mem, casadi_int K) const {
+    // Evaluate point by point, the work vectors beyond the inputs and outputs
+    // may be overwritten
+    vector<const double*> arg1(arg, arg + sz_arg());
+    vector<double*> res1(res, res + sz_res());
+    for (casadi_int p=0; p<K; ++p) {
+      for (casadi_int i=0; i<n_in_; ++i) {
+        arg1[i] = arg[i] ? arg[i] + p*nnz_in(i) : nullptr;
+      }
+      for (casadi_int i=0; i<n_out_; ++i) {
+        res1[i] = res[i] ? res[i] + p*nnz_out(i) : nullptr;
+      }
+      if (eval_gen(get_ptr(arg1), get_ptr(res1), iw, w, mem)) return 1;
+    }
+    return 0;
+  }
+
   void FunctionInternal::print_dimensions(ostream &stream) const {
     stream << " Number of inputs: " << n_in_ << endl;
     for (casadi_int i=0; i<n_in_; ++i) {
@@ -733,9 +888,10 @@ namespace casadi {
     }
   }
 
-  Function FunctionInternal::map(casadi_int n, const std::string& parallelization) const {
+  Function FunctionInternal::map(casadi_int n, const std::string& parallelization,
+      const Dict& opts) const {
     Function f;
-    if (parallelization=="serial") {
+    if (parallelization=="serial" && opts.empty()) {
       // Serial maps are cached
       string fname = "map" + str(n) + "_" + name_;
       if (!incache(fname, f)) {
@@ -746,8 +902,8 @@ namespace casadi {
         tocache(f);
       }
     } else {
-      // Non-serial maps are not cached
-      f = Map::create(parallelization, self(), n);
+      // Non-serial maps and maps with options are not cached
+      f = Map::create(parallelization, self(), n, opts);
     }
     return f;
   }
@@ -816,24 +972,21 @@ namespace casadi {
     }
   };
 
+  // Propagate every n_workers-th batch of bvec_size seed directions, starting with batch k
   template<bool fwd>
-  Sparsity FunctionInternal::
-  getJacSparsityGen(casadi_int iind, casadi_int oind, bool symmetric,
-      casadi_int gr_i, casadi_int gr_o) const {
-    // Number of nonzero inputs and outputs
-    casadi_int nz_in = nnz_in(iind);
-    casadi_int nz_out = nnz_out(oind);
-
+  static void jac_sparsity_sweeps(const FunctionInternal* f, casadi_int iind, casadi_int oind,
+      casadi_int k, casadi_int n_workers, void* mem, bool verbose,
+      std::vector<casadi_int>& jcol, std::vector<casadi_int>& jrow) {
     // Evaluation buffers
-    vector<typename JacSparsityTraits<fwd>::arg_t> arg(sz_arg(), nullptr);
-    vector<bvec_t*> res(sz_res(), nullptr);
-    vector<casadi_int> iw(sz_iw());
-    vector<bvec_t> w(sz_w(), 0);
+    vector<typename JacSparsityTraits<fwd>::arg_t> arg(f->sz_arg(), nullptr);
+    vector<bvec_t*> res(f->sz_res(), nullptr);
+    vector<casadi_int> iw(f->sz_iw());
+    vector<bvec_t> w(f->sz_w(), 0);
 
     // Seeds and sensitivities
-    vector<bvec_t> seed(nz_in, 0);
+    vector<bvec_t> seed(f->nnz_in(iind), 0);
     arg[iind] = get_ptr(seed);
-    vector<bvec_t> sens(nz_out, 0);
+    vector<bvec_t> sens(f->nnz_out(oind), 0);
     res[oind] = get_ptr(sens);
     if (!fwd) std::swap(seed, sens);
 
@@ -841,23 +994,14 @@ namespace casadi {
     casadi_int nsweep = seed.size() / bvec_size;
     if (seed.size() % bvec_size) nsweep++;
 
-    // Print
-    if (verbose_) {
-      casadi_message(str(nsweep) + string(fwd ? " forward" : " reverse") + " sweeps "
-                     "needed for " + str(seed.size()) + " directions");
-    }
-
     // Progress
     casadi_int progress = -10;
 
-    // Temporary vectors
-    std::vector<casadi_int> jcol, jrow;
-
     // Loop over the variables, bvec_size variables at a time
-    for (casadi_int s=0; s<nsweep; ++s) {
+    for (casadi_int s=k; s<nsweep; s+=n_workers) {
 
       // Print progress
-      if (verbose_) {
+      if (verbose) {
         casadi_int progress_new = (s*100)/nsweep;
         // Print when entering a new decade
         if (progress_new / 10 > progress / 10) {
@@ -878,8 +1022,8 @@ namespace casadi {
       }
 
       // Propagate the dependencies
-      JacSparsityTraits<fwd>::sp(this, get_ptr(arg), get_ptr(res),
-                                  get_ptr(iw), get_ptr(w), memory(0));
+      JacSparsityTraits<fwd>::sp(f, get_ptr(arg), get_ptr(res),
+                                  get_ptr(iw), get_ptr(w), mem);
 
       // Loop over the nonzeros of the output
       for (casadi_int el=0; el<sens.size(); ++el) {
@@ -913,6 +1057,233 @@ namespace casadi {
         seed[offset+i] = 0;
       }
     }
+  }
+
+  /// \cond INTERNAL
+  // Every n_workers-th batch of sweeps, starting with batch k, using a memory object
+  typedef std::function<void(casadi_int k, casadi_int n_workers, void* mem,
+                             std::vector<casadi_int>& jcol,
+                             std::vector<casadi_int>& jrow)> JacSparsitySweeps;
+
+#ifdef CASADI_WITH_THREAD
+  // Sweeps of a sparsity algorithm distributed over the thread pool
+  struct JacSparsityJob {
+    const FunctionInternal* f;
+    // Owning reference, for checking out memory objects
+    Function self;
+    const JacSparsitySweeps* sweeps;
+    casadi_int n_workers;
+    // Pattern entries and errors of each worker
+    std::vector< std::vector<casadi_int> > jcol, jrow;
+    std::vector<std::exception_ptr> err;
+
+    static void work(void* data, casadi_int k) {
+      JacSparsityJob* d = static_cast<JacSparsityJob*>(data);
+      try {
+        // Each worker needs its own memory object
+        scoped_checkout<Function> mem(d->self);
+        (*d->sweeps)(k, d->n_workers, d->f->memory(mem), d->jcol[k], d->jrow[k]);
+      } catch (...) {
+        // Rethrown in the calling thread
+        d->err[k] = std::current_exception();
+      }
+    }
+  };
+#endif // CASADI_WITH_THREAD
+
+  // Number of threads for nsweep independent sweeps
+  static casadi_int jac_sparsity_workers(casadi_int nsweep) {
+    casadi_int n_workers = 1;
+#ifdef CASADI_WITH_THREAD
+    n_workers = std::max(std::min(GlobalOptions::sparsity_threads, nsweep), casadi_int(1));
+#endif // CASADI_WITH_THREAD
+    return n_workers;
+  }
+
+  // Carry out independent sweeps, distributed over n_workers threads
+  static void run_jac_sparsity_sweeps(const FunctionInternal* f, casadi_int n_workers,
+      const JacSparsitySweeps& sweeps,
+      std::vector<casadi_int>& jcol, std::vector<casadi_int>& jrow) {
+    if (n_workers==1) {
+      sweeps(0, 1, f->memory(0), jcol, jrow);
+    } else {
+#ifdef CASADI_WITH_THREAD
+      JacSparsityJob job;
+      job.f = f;
+      job.self = f->self();
+      job.sweeps = &sweeps;
+      job.n_workers = n_workers;
+      job.jcol.resize(n_workers);
+      job.jrow.resize(n_workers);
+      job.err.resize(n_workers);
+      ThreadPool::instance().run(n_workers, JacSparsityJob::work, &job);
+      for (casadi_int k=0; k<n_workers; ++k) {
+        if (job.err[k]) std::rethrow_exception(job.err[k]);
+        jcol.insert(jcol.end(), job.jcol[k].begin(), job.jcol[k].end());
+        jrow.insert(jrow.end(), job.jrow[k].begin(), job.jrow[k].end());
+      }
+#endif // CASADI_WITH_THREAD
+    }
+  }
+
+  // A sweep of the hierarchical sparsity algorithms, for bvec_size directions
+  struct HierarchicalSweep {
+    // Seed bit and range of seed nonzeros of each fine block
+    std::vector<casadi_int> seed_bit, seed_begin, seed_end;
+    // Triplets of the lookup table from seed bits and coarse blocks to fine blocks
+    std::vector<casadi_int> lookup_row, lookup_col, lookup_value;
+  };
+
+  // The sweeps of a level of the hierarchical sparsity algorithms
+  struct HierarchicalLevel {
+    const FunctionInternal* f;
+    casadi_int iind, oind;
+    // Forward or reverse mode
+    bool fwd;
+    // Ambiguous entries of the lookup table are skipped and entries are mirrored
+    bool symmetric;
+    std::vector<HierarchicalSweep> sweeps;
+    // Coarse and fine blocks of the sensitivities
+    const std::vector<casadi_int>* coarse;
+    const std::vector<casadi_int>* fine;
+    const std::vector<casadi_int>* fine_lookup;
+  };
+
+  // Propagate every n_workers-th sweep of a level, starting with sweep k
+  static void hierarchical_sweeps(const HierarchicalLevel& l, casadi_int k, casadi_int n_workers,
+      void* mem, std::vector<casadi_int>& jcol, std::vector<casadi_int>& jrow) {
+    const FunctionInternal* f = l.f;
+    const std::vector<casadi_int>& coarse = *l.coarse;
+    const std::vector<casadi_int>& fine = *l.fine;
+    const std::vector<casadi_int>& fine_lookup = *l.fine_lookup;
+
+    // Seeds and sensitivities
+    vector<bvec_t> s_in(f->nnz_in(l.iind), 0);
+    vector<bvec_t> s_out(f->nnz_out(l.oind), 0);
+    bvec_t* seed_v = l.fwd ? get_ptr(s_in) : get_ptr(s_out);
+    bvec_t* sens_v = l.fwd ? get_ptr(s_out) : get_ptr(s_in);
+
+    // Evaluation buffers
+    vector<const bvec_t*> arg_fwd(f->sz_arg(), nullptr);
+    vector<bvec_t*> arg_adj(f->sz_arg(), nullptr);
+    arg_fwd[l.iind] = arg_adj[l.iind] = get_ptr(s_in);
+    vector<bvec_t*> res(f->sz_res(), nullptr);
+    res[l.oind] = get_ptr(s_out);
+    vector<casadi_int> iw(f->sz_iw());
+    vector<bvec_t> w(f->sz_w(), 0);
+
+    for (casadi_int s=k; s<l.sweeps.size(); s+=n_workers) {
+      const HierarchicalSweep& sw = l.sweeps[s];
+
+      // Toggle on seeds
+      for (casadi_int i=0; i<sw.seed_bit.size(); ++i) {
+        bvec_toggle(seed_v, sw.seed_begin[i], sw.seed_end[i], sw.seed_bit[i]);
+      }
+
+      // Construct lookup table
+      IM lookup = IM::triplet(sw.lookup_row, sw.lookup_col, sw.lookup_value,
+                              bvec_size, coarse.size());
+      if (l.symmetric) {
+        std::vector<casadi_int> lookup_row(sw.lookup_row.rbegin(), sw.lookup_row.rend());
+        std::vector<casadi_int> lookup_col(sw.lookup_col.rbegin(), sw.lookup_col.rend());
+        std::vector<casadi_int> lookup_value(sw.lookup_value.rbegin(), sw.lookup_value.rend());
+        IM duplicates =
+          IM::triplet(lookup_row, lookup_col, lookup_value, bvec_size, coarse.size())
+          - lookup;
+        duplicates = sparsify(duplicates);
+        lookup(duplicates.sparsity()) = -bvec_size;
+      }
+
+      // Propagate the dependencies
+      if (l.fwd) {
+        f->sp_forward(get_ptr(arg_fwd), get_ptr(res), get_ptr(iw), get_ptr(w), mem);
+      } else {
+        fill(w.begin(), w.end(), 0);
+        f->sp_reverse(get_ptr(arg_adj), get_ptr(res), get_ptr(iw), get_ptr(w), mem);
+      }
+
+      // Temporary bit work vector
+      bvec_t spsens;
+
+      // Loop over the cols of coarse blocks
+      for (casadi_int cri=0; cri<coarse.size()-1; ++cri) {
+
+        // Loop over the cols of fine blocks within the current coarse block
+        for (casadi_int fri=fine_lookup[coarse[cri]]; fri<fine_lookup[coarse[cri+1]]; ++fri) {
+          // Lump individual sensitivities together into fine block
+          bvec_or(sens_v, spsens, fine[fri], fine[fri+1]);
+
+          // Next iteration if no sparsity
+          if (!spsens) continue;
+
+          // Loop over all bvec_bits
+          for (casadi_int bvec_i=0; bvec_i<bvec_size; ++bvec_i) {
+            if (spsens & (bvec_t(1) << bvec_i)) {
+              // if dependency is found, add it to the new sparsity pattern
+              casadi_int ind = lookup.sparsity().get_nz(bvec_i, cri);
+              if (ind==-1) continue;
+              casadi_int lk = lookup->at(ind);
+              if (!l.symmetric) {
+                jrow.push_back(bvec_i+lk);
+                jcol.push_back(fri);
+              } else if (lk>-bvec_size) {
+                jrow.push_back(bvec_i+lk);
+                jcol.push_back(fri);
+                jrow.push_back(fri);
+                jcol.push_back(bvec_i+lk);
+              }
+            }
+          }
+        }
+      }
+
+      // Clear the seeds and sensitivities, ready for the next sweep
+      fill(s_in.begin(), s_in.end(), 0);
+      fill(s_out.begin(), s_out.end(), 0);
+    }
+  }
+
+  // Propagate the sweeps of a level, distributed over threads if enabled
+  static void hierarchical_level(const HierarchicalLevel& l,
+      std::vector<casadi_int>& jcol, std::vector<casadi_int>& jrow) {
+    run_jac_sparsity_sweeps(l.f, jac_sparsity_workers(l.sweeps.size()),
+      [&l](casadi_int k, casadi_int n_workers, void* mem,
+           std::vector<casadi_int>& jcol_k, std::vector<casadi_int>& jrow_k) {
+        hierarchical_sweeps(l, k, n_workers, mem, jcol_k, jrow_k);
+      }, jcol, jrow);
+  }
+  /// \endcond
+
+  template<bool fwd>
+  Sparsity FunctionInternal::
+  getJacSparsityGen(casadi_int iind, casadi_int oind, bool symmetric,
+      casadi_int gr_i, casadi_int gr_o) const {
+    // Number of nonzero inputs and outputs
+    casadi_int nz_in = nnz_in(iind);
+    casadi_int nz_out = nnz_out(oind);
+
+    // Number of sweeps we must make
+    casadi_int n_seed = fwd ? nz_in : nz_out;
+    casadi_int nsweep = n_seed / bvec_size;
+    if (n_seed % bvec_size) nsweep++;
+
+    // Sweeps are independent and can be distributed over threads
+    casadi_int n_workers = jac_sparsity_workers(nsweep);
+
+    // Print
+    if (verbose_) {
+      casadi_message(str(nsweep) + string(fwd ? " forward" : " reverse") + " sweeps "
+                     "needed for " + str(n_seed) + " directions"
+                     + (n_workers>1 ? " on " + str(n_workers) + " threads" : ""));
+    }
+
+    // Propagate the dependencies
+    std::vector<casadi_int> jcol, jrow;
+    run_jac_sparsity_sweeps(this, n_workers,
+      [&](casadi_int k, casadi_int n, void* mem,
+          std::vector<casadi_int>& jcol_k, std::vector<casadi_int>& jrow_k) {
+        jac_sparsity_sweeps<fwd>(this, iind, oind, k, n, mem, verbose_ && n==1, jcol_k, jrow_k);
+      }, jcol, jrow);
 
     // Construct sparsity pattern and return
     if (!fwd) swap(jrow, jcol);
@@ -932,20 +1303,6 @@ namespace casadi {
     casadi_int nz = nnz_in(iind);
     casadi_assert_dev(nz==nnz_out(oind));
 
-    // Evaluation buffers
-    vector<const bvec_t*> arg(sz_arg(), nullptr);
-    vector<bvec_t*> res(sz_res(), nullptr);
-    vector<casadi_int> iw(sz_iw());
-    vector<bvec_t> w(sz_w());
-
-    // Seeds
-    vector<bvec_t> seed(nz, 0);
-    arg[iind] = get_ptr(seed);
-
-    // Sensitivities
-    vector<bvec_t> sens(nz, 0);
-    res[oind] = get_ptr(sens);
-
     // Sparsity triplet accumulator
     std::vector<casadi_int> jcol, jrow;
 
@@ -984,9 +1341,6 @@ namespace casadi {
           + str(D.size2()) + " <-> " + str(D.size1()));
       }
 
-      // Clear the seeds
-      fill(seed.begin(), seed.end(), 0);
-
       // Subdivide the coarse block
       for (casadi_int k=0; k<coarse.size()-1; ++k) {
         casadi_int diff = coarse[k+1]-coarse[k];
@@ -1005,10 +1359,10 @@ namespace casadi {
       // Create lookup tables for the fine blocks
       std::vector<casadi_int> fine_lookup = lookupvector(fine, nz+1);
 
-      // Triplet data used as a lookup table
-      std::vector<casadi_int> lookup_col;
-      std::vector<casadi_int> lookup_row;
-      std::vector<casadi_int> lookup_value;
+      // The sweeps of this level, independent of each other
+      HierarchicalLevel level = {this, iind, oind, true, true,
+                                 std::vector<HierarchicalSweep>(1),
+                                 &coarse, &fine, &fine_lookup};
 
       // The maximum number of fine blocks contained in one coarse block
       casadi_int n_fine_blocks_max = 0;
@@ -1029,6 +1383,7 @@ namespace casadi {
 
         // Loop while not finished
         while (!f_finished) {
+          HierarchicalSweep& sw = level.sweeps.back();
 
           // Loop over all coarse rows that are found in the coloring for this coarse seed direction
           for (casadi_int k=D.colind(csd); k<D.colind(csd+1); ++k) {
@@ -1051,14 +1406,15 @@ namespace casadi {
               // Loop over the coarse block cols that appear in the
               // coloring for the current coarse seed direction
               for (casadi_int cri=r.colind(cci);cri<r.colind(cci+1);++cri) {
-                lookup_col.push_back(r.row(cri));
-                lookup_row.push_back(bvec_i+bvec_i_mod);
-                lookup_value.push_back(value);
+                sw.lookup_col.push_back(r.row(cri));
+                sw.lookup_row.push_back(bvec_i+bvec_i_mod);
+                sw.lookup_value.push_back(value);
               }
 
-              // Toggle on seeds
-              bvec_toggle(get_ptr(seed), fine[fci+fci_start], fine[fci+fci_start+1],
-                          bvec_i+bvec_i_mod);
+              // Seeds to toggle on
+              sw.seed_bit.push_back(bvec_i+bvec_i_mod);
+              sw.seed_begin.push_back(fine[fci+fci_start]);
+              sw.seed_end.push_back(fine[fci+fci_start+1]);
               bvec_i_mod++;
             }
           }
@@ -1066,65 +1422,9 @@ namespace casadi {
           // Bump bvec_i for next major coarse direction
           bvec_i+= min(n_fine_blocks_max, fci_cap);
 
-          // Check if bvec buffer is full
-          if (bvec_i==bvec_size || csd==D.size2()-1) {
-            // Calculate sparsity for bvec_size directions at once
-
-            // Statistics
-            nsweeps+=1;
-
-            // Construct lookup table
-            IM lookup = IM::triplet(lookup_row, lookup_col, lookup_value,
-                                    bvec_size, coarse.size());
-
-            std::reverse(lookup_col.begin(), lookup_col.end());
-            std::reverse(lookup_row.begin(), lookup_row.end());
-            std::reverse(lookup_value.begin(), lookup_value.end());
-            IM duplicates =
-              IM::triplet(lookup_row, lookup_col, lookup_value, bvec_size, coarse.size())
-              - lookup;
-            duplicates = sparsify(duplicates);
-            lookup(duplicates.sparsity()) = -bvec_size;
-
-            // Propagate the dependencies
-            sp_forward(get_ptr(arg), get_ptr(res), get_ptr(iw), get_ptr(w), nullptr);
-
-            // Temporary bit work vector
-            bvec_t spsens;
-
-            // Loop over the cols of coarse blocks
-            for (casadi_int cri=0; cri<coarse.size()-1; ++cri) {
-
-              // Loop over the cols of fine blocks within the current coarse block
-              for (casadi_int fri=fine_lookup[coarse[cri]];fri<fine_lookup[coarse[cri+1]];++fri) {
-                // Lump individual sensitivities together into fine block
-                bvec_or(get_ptr(sens), spsens, fine[fri], fine[fri+1]);
-
-                // Loop over all bvec_bits
-                for (casadi_int bvec_i=0;bvec_i<bvec_size;++bvec_i) {
-                  if (spsens & (bvec_t(1) << bvec_i)) {
-                    // if dependency is found, add it to the new sparsity pattern
-                    casadi_int ind = lookup.sparsity().get_nz(bvec_i, cri);
-                    if (ind==-1) continue;
-                    casadi_int lk = lookup->at(ind);
-                    if (lk>-bvec_size) {
-                      jrow.push_back(bvec_i+lk);
-                      jcol.push_back(fri);
-                      jrow.push_back(fri);
-                      jcol.push_back(bvec_i+lk);
-                    }
-                  }
-                }
-              }
-            }
-
-            // Clear the forward seeds/adjoint sensitivities, ready for next bvec sweep
-            fill(seed.begin(), seed.end(), 0);
-
-            // Clean lookup table
-            lookup_col.clear();
-            lookup_row.clear();
-            lookup_value.clear();
+          // Start a new sweep if the bvec buffer is full
+          if ((bvec_i==bvec_size || csd==D.size2()-1) && !sw.seed_bit.empty()) {
+            level.sweeps.emplace_back();
           }
 
           if (n_fine_blocks_max>fci_cap) {
@@ -1136,6 +1436,11 @@ namespace casadi {
           }
         }
       }
+      if (level.sweeps.back().seed_bit.empty()) level.sweeps.pop_back();
+
+      // Calculate sparsity for bvec_size directions at once, for every sweep
+      nsweeps += level.sweeps.size();
+      hierarchical_level(level, jcol, jrow);
 
       // Construct fine sparsity pattern
       r = Sparsity::triplet(fine.size()-1, fine.size()-1, jrow, jcol);
@@ -1166,19 +1471,6 @@ namespace casadi {
     // Number of nonzero outputs
     casadi_int nz_out = nnz_out(oind);
 
-    // Seeds and sensitivities
-    vector<bvec_t> s_in(nz_in, 0);
-    vector<bvec_t> s_out(nz_out, 0);
-
-    // Evaluation buffers
-    vector<const bvec_t*> arg_fwd(sz_arg(), nullptr);
-    vector<bvec_t*> arg_adj(sz_arg(), nullptr);
-    arg_fwd[iind] = arg_adj[iind] = get_ptr(s_in);
-    vector<bvec_t*> res(sz_res(), nullptr);
-    res[oind] = get_ptr(s_out);
-    vector<casadi_int> iw(sz_iw());
-    vector<bvec_t> w(sz_w());
-
     // Sparsity triplet accumulator
     std::vector<casadi_int> jcol, jrow;
 
@@ -1211,13 +1503,6 @@ namespace casadi {
     // Get weighting factor
     double sp_w = sp_weight();
 
-    // Lookup table for bvec_t
-    std::vector<bvec_t> bvec_lookup;
-    bvec_lookup.reserve(bvec_size);
-    for (casadi_int i=0;i<bvec_size;++i) {
-      bvec_lookup.push_back(bvec_t(1) << i);
-    }
-
     while (!hasrun || coarse_col.size()!=nz_out+1 || coarse_row.size()!=nz_in+1) {
       if (verbose_) {
         casadi_message("Block size: " + str(granularity_col) + " x " + str(granularity_row));
@@ -1256,17 +1541,10 @@ namespace casadi {
             "(fwd cost: " + str(fwd_cost) + ", adj cost: " + str(adj_cost) + ")");
       }
 
-      // Get seeds and sensitivities
-      bvec_t* seed_v = use_fwd ? get_ptr(s_in) : get_ptr(s_out);
-      bvec_t* sens_v = use_fwd ? get_ptr(s_out) : get_ptr(s_in);
-
       // The number of zeros in the seed and sensitivity directions
       casadi_int nz_seed = use_fwd ? nz_in  : nz_out;
       casadi_int nz_sens = use_fwd ? nz_out : nz_in;
 
-      // Clear the seeds
-      for (casadi_int i=0; i<nz_seed; ++i) seed_v[i]=0;
-
       // Choose the active jacobian coloring scheme
       Sparsity D = use_fwd ? D1 : D2;
 
@@ -1306,11 +1584,10 @@ namespace casadi {
       std::vector<casadi_int> fine_col_lookup = lookupvector(fine_col, nz_sens+1);
       std::vector<casadi_int> fine_row_lookup = lookupvector(fine_row, nz_seed+1);
 
-      // Triplet data used as a lookup table
-      std::vector<casadi_int> lookup_col;
-      std::vector<casadi_int> lookup_row;
-      std::vector<casadi_int> lookup_value;
-
+      // The sweeps of this level, independent of each other
+      HierarchicalLevel level = {this, iind, oind, use_fwd, false,
+                                 std::vector<HierarchicalSweep>(1),
+                                 &coarse_col, &fine_col, &fine_col_lookup};
 
       // The maximum number of fine blocks contained in one coarse block
       casadi_int n_fine_blocks_max = 0;
@@ -1330,6 +1607,7 @@ namespace casadi {
 
         // Loop while not finished
         while (!f_finished) {
+          HierarchicalSweep& sw = level.sweeps.back();
 
           // Loop over all coarse rows that are found in the coloring for this coarse seed direction
           for (casadi_int k=D.colind(csd); k<D.colind(csd+1); ++k) {
@@ -1350,14 +1628,15 @@ namespace casadi {
               // Loop over the coarse block cols that appear in the coloring
               // for the current coarse seed direction
               for (casadi_int cri=rT.colind(cci);cri<rT.colind(cci+1);++cri) {
-                lookup_col.push_back(rT.row(cri));
-                lookup_row.push_back(bvec_i+bvec_i_mod);
-                lookup_value.push_back(value);
+                sw.lookup_col.push_back(rT.row(cri));
+                sw.lookup_row.push_back(bvec_i+bvec_i_mod);
+                sw.lookup_value.push_back(value);
               }
 
-              // Toggle on seeds
-              bvec_toggle(seed_v, fine_row[fci+fci_start], fine_row[fci+fci_start+1],
-                          bvec_i+bvec_i_mod);
+              // Seeds to toggle on
+              sw.seed_bit.push_back(bvec_i+bvec_i_mod);
+              sw.seed_begin.push_back(fine_row[fci+fci_start]);
+              sw.seed_end.push_back(fine_row[fci+fci_start+1]);
               bvec_i_mod++;
             }
           }
@@ -1365,63 +1644,9 @@ namespace casadi {
           // Bump bvec_i for next major coarse direction
           bvec_i+= min(n_fine_blocks_max, fci_cap);
 
-          // Check if bvec buffer is full
-          if (bvec_i==bvec_size || csd==D.size2()-1) {
-            // Calculate sparsity for bvec_size directions at once
-
-            // Statistics
-            nsweeps+=1;
-
-            // Construct lookup table
-            IM lookup = IM::triplet(lookup_row, lookup_col, lookup_value, bvec_size,
-                                    coarse_col.size());
-
-            // Propagate the dependencies
-            if (use_fwd) {
-              sp_forward(get_ptr(arg_fwd), get_ptr(res), get_ptr(iw), get_ptr(w), memory(0));
-            } else {
-              fill(w.begin(), w.end(), 0);
-              sp_reverse(get_ptr(arg_adj), get_ptr(res), get_ptr(iw), get_ptr(w), memory(0));
-            }
-
-            // Temporary bit work vector
-            bvec_t spsens;
-
-            // Loop over the cols of coarse blocks
-            for (casadi_int cri=0;cri<coarse_col.size()-1;++cri) {
-
-              // Loop over the cols of fine blocks within the current coarse block
-              for (casadi_int fri=fine_col_lookup[coarse_col[cri]];
-                   fri<fine_col_lookup[coarse_col[cri+1]];++fri) {
-                // Lump individual sensitivities together into fine block
-                bvec_or(sens_v, spsens, fine_col[fri], fine_col[fri+1]);
-
-                // Next iteration if no sparsity
-                if (!spsens) continue;
-
-                // Loop over all bvec_bits
-                for (casadi_int bvec_i=0;bvec_i<bvec_size;++bvec_i) {
-                  if (spsens & bvec_lookup[bvec_i]) {
-                    // if dependency is found, add it to the new sparsity pattern
-                    casadi_int ind = lookup.sparsity().get_nz(bvec_i, cri);
-                    if (ind==-1) continue;
-                    jrow.push_back(bvec_i+lookup->at(ind));
-                    jcol.push_back(fri);
-                  }
-                }
-              }
-            }
-
-            // Clear the forward seeds/adjoint sensitivities, ready for next bvec sweep
-            fill(s_in.begin(), s_in.end(), 0);
-
-            // Clear the adjoint seeds/forward sensitivities, ready for next bvec sweep
-            fill(s_out.begin(), s_out.end(), 0);
-
-            // Clean lookup table
-            lookup_col.clear();
-            lookup_row.clear();
-            lookup_value.clear();
+          // Start a new sweep if the bvec buffer is full
+          if ((bvec_i==bvec_size || csd==D.size2()-1) && !sw.seed_bit.empty()) {
+            level.sweeps.emplace_back();
           }
 
           if (n_fine_blocks_max>fci_cap) {
@@ -1431,10 +1656,13 @@ namespace casadi {
           } else {
             f_finished = true;
           }
-
         }
-
       }
+      if (level.sweeps.back().seed_bit.empty()) level.sweeps.pop_back();
+
+      // Calculate sparsity for bvec_size directions at once, for every sweep
+      nsweeps += level.sweeps.size();
+      hierarchical_level(level, jcol, jrow);
 
       // Swap results if adjoint mode was used
       if (use_fwd) {
@@ -1508,6 +1736,11 @@ namespace casadi {
 
   Sparsity& FunctionInternal::
   sparsity_jac(casadi_int iind, casadi_int oind, bool compact, bool symmetric) const {
+#ifdef CASADI_WITH_THREAD
+    // Blocks are generated once, also when requested by concurrent sweeps
+    std::lock_guard<std::recursive_mutex> lock(jac_sparsity_mtx_);
+#endif // CASADI_WITH_THREAD
+
     // Get an owning reference to the block
     Sparsity jsp = compact ? jac_sparsity_compact_.elem(oind, iind)
         : jac_sparsity_.elem(oind, iind);
@@ -1563,12 +1796,29 @@ namespace casadi {
     return jsp_ref;
   }
 
+  Sparsity FunctionInternal::sparsity_jac_compact(casadi_int iind, casadi_int oind) const {
+#ifdef CASADI_WITH_THREAD
+    // The reference is invalidated when another thread adds a block
+    std::lock_guard<std::recursive_mutex> lock(jac_sparsity_mtx_);
+#endif // CASADI_WITH_THREAD
+    return sparsity_jac(iind, oind, true, false);
+  }
+
   void FunctionInternal::get_partition(casadi_int iind, casadi_int oind, Sparsity& D1, Sparsity& D2,
                                        bool compact, bool symmetric,
                                        bool allow_forward, bool allow_reverse) const {
     if (verbose_) casadi_message(name_ + "::get_partition");
     casadi_assert(allow_forward || allow_reverse, "Inconsistent options");
 
+    // Look up in the on-disk cache
+    std::string check;
+    std::string key = partition_key(iind, oind, compact, symmetric, allow_forward, allow_reverse,
+                                    check);
+    if (!key.empty() && load_partition(key, check, iind, oind, compact, D1, D2)) {
+      if (verbose_) casadi_message("Loaded partition from the sparsity cache");
+      return;
+    }
+
     // Sparsity pattern with transpose
     Sparsity &AT = sparsity_jac(iind, oind, compact, symmetric);
     Sparsity A = symmetric ? AT : AT.T();
@@ -1578,9 +1828,9 @@ namespace casadi {
       casadi_assert_dev(enable_forward_ || enable_fd_);
       casadi_assert_dev(allow_forward);
 
-      // Star coloring if symmetric
+      // Star coloring if symmetric, trying all orderings
       if (verbose_) casadi_message("FunctionInternal::getPartition star_coloring");
-      D1 = A.star_coloring();
+      D1 = A.star_coloring(-1);
       if (verbose_) {
         casadi_message("Star coloring completed: " + str(D1.size2())
           + " directional derivatives needed ("
@@ -1660,6 +1910,84 @@ namespace casadi {
       }
 
     }
+
+    // Add to the on-disk cache
+    if (!key.empty()) save_partition(key, check, AT, D1, D2);
+  }
+
+  std::string FunctionInternal::partition_key(casadi_int iind, casadi_int oind, bool compact,
+      bool symmetric, bool allow_forward, bool allow_reverse, std::string& check) const {
+    if (sparsity_cache_.empty()) return "";
+
+    // Structural hash, covering the expression graph and the sparsity of all inputs and
+    // outputs, calculated once
+    if (!structure_hashed_) {
+      structure_hashed_ = true;
+      try {
+        std::vector<std::string> structure = {CasadiMeta::version(), self().serialize()};
+        structure_hash_ = JitCache::hash(structure);
+        structure_digest_ = JitCache::digest(structure);
+      } catch (exception& e) {
+        casadi_warning("Function '" + name_ + "' cannot be added to the sparsity cache: "
+                       + std::string(e.what()));
+      }
+    }
+    if (structure_hash_.empty()) return "";
+
+    // Combine with the arguments of get_partition
+    std::stringstream ss;
+    ss << iind << " " << oind << " " << compact << symmetric << allow_forward << allow_reverse
+       << " " << ad_weight();
+    // Stored in the entry and compared on load, ruling out hash collisions
+    check = structure_hash_ + " " + structure_digest_ + " " + ss.str();
+    return "sp_" + JitCache::hash({structure_hash_, ss.str()});
+  }
+
+  bool FunctionInternal::load_partition(const std::string& key, const std::string& check,
+      casadi_int iind, casadi_int oind, bool compact, Sparsity& D1, Sparsity& D2) const {
+    std::string data;
+    if (!JitCache(sparsity_cache_, 0, 0).lookup_data(key, data)) return false;
+    Sparsity jac, d1, d2;
+    try {
+      std::stringstream ss(data);
+      DeserializingStream s(ss);
+      // Entry of another function or set of arguments with a colliding key
+      std::string stored_check;
+      s.unpack("FunctionInternal::partition::check", stored_check);
+      if (stored_check!=check) return false;
+      s.unpack("FunctionInternal::partition::jac", jac);
+      s.unpack("FunctionInternal::partition::D1", d1);
+      s.unpack("FunctionInternal::partition::D2", d2);
+    } catch (exception& e) {
+      // Corrupt entry, will be overwritten
+      return false;
+    }
+    if (jac.size1()!=(compact ? nnz_out(oind) : numel_out(oind))
+        || jac.size2()!=(compact ? nnz_in(iind) : numel_in(iind))) return false;
+
+    // Restore the in-memory cache of the Jacobian sparsity
+    Sparsity& jsp = compact ? jac_sparsity_compact_.elem(oind, iind)
+        : jac_sparsity_.elem(oind, iind);
+    jsp = jac;
+    D1 = d1;
+    D2 = d2;
+    return true;
+  }
+
+  void FunctionInternal::save_partition(const std::string& key, const std::string& check,
+      const Sparsity& jac, const Sparsity& D1, const Sparsity& D2) const {
+    std::stringstream ss;
+    {
+      SerializingStream s(ss);
+      s.pack("FunctionInternal::partition::check", check);
+      s.pack("FunctionInternal::partition::jac", jac);
+      s.pack("FunctionInternal::partition::D1", D1);
+      s.pack("FunctionInternal::partition::D2", D2);
+    }
+    if (!JitCache(sparsity_cache_, 0, 0).insert_data(key, ss.str())) {
+      casadi_warning("Failed to add the partition of function '" + name_
+                     + "' to the sparsity cache.");
+    }
   }
 
   std::vector<DM> FunctionInternal::eval_dm(const std::vector<DM>& arg) const {
@@ -2001,6 +2329,10 @@ namespace casadi {
     codegen_decref(g);
     g << "}\n\n";
 
+    // Memory object routines, generated code keeps no state between calls
+    g << g.declare("void* " + name_ + "_checkout(void)") << " { return 0;}\n\n"
+      << g.declare("void " + name_ + "_release(void* mem)") << " {}\n\n";
+
     // Number of inputs and outptus
     g << g.declare("casadi_int " + name_ + "_n_in(void)")
       << " { return " << n_in_ << ";}\n\n"
@@ -2188,9 +2520,8 @@ namespace casadi {
     }
 
     if (g.with_mem) {
-      // Allocate memory
-      g << g.declare("casadi_functions* " + name_ + "_functions(void)") << " {\n"
-        << "static casadi_functions fun = {\n"
+      // Entry points
+      g << "static casadi_functions " << name_ << "_fun = {\n"
         << name_ << "_incref,\n"
         << name_ << "_decref,\n"
         << name_ << "_n_in,\n"
@@ -2200,9 +2531,18 @@ namespace casadi {
         << name_ << "_sparsity_in,\n"
         << name_ << "_sparsity_out,\n"
         << name_ << "_work,\n"
-        << name_ << "\n"
-        << "};\n"
-        << "return &fun;\n"
+        << name_ << ",\n"
+        << name_ << "_checkout,\n"
+        << name_ << "_release\n"
+        << "};\n\n"
+        << g.declare("casadi_functions* " + name_ + "_functions(void)") << " {\n"
+        << "return &" << name_ << "_fun;\n"
+        << "}\n\n";
+
+      // Pool of memory structs, for concurrent evaluations without allocation
+      g << g.declare("casadi_pool* " + name_ + "_pool(void)") << " {\n"
+        << "static casadi_pool pool = {&" << name_ << "_fun, 0, 0, 0, 0};\n"
+        << "return &pool;\n"
         << "}\n";
     }
     // Flush
@@ -2249,7 +2589,7 @@ namespace casadi {
         if (arg[iind]==nullptr || nnz_in(iind)==0) continue;
 
         // Get the sparsity of the Jacobian block
-        Sparsity sp = sparsity_jac(iind, oind, true, false);
+        Sparsity sp = sparsity_jac_compact(iind, oind);
         if (sp.is_null() || sp.nnz() == 0) continue; // Skip if zero
 
         // Carry out the sparse matrix-vector multiplication
@@ -2278,7 +2618,7 @@ namespace casadi {
         if (arg[iind]==nullptr || nnz_in(iind)==0) continue;
 
         // Get the sparsity of the Jacobian block
-        Sparsity sp = sparsity_jac(iind, oind, true, false);
+        Sparsity sp = sparsity_jac_compact(iind, oind);
         if (sp.is_null() || sp.nnz() == 0) continue; // Skip if zero
 
         // Carry out the sparse matrix-vector multiplication
@@ -3212,7 +3552,7 @@ namespace casadi {
 
   void FunctionInternal::serialize_body(SerializingStream& s) const {
     ProtoFunction::serialize_body(s);
-    s.version("FunctionInternal", 1);
+    s.version("FunctionInternal", 3);
     s.pack("FunctionInternal::sp_in", sparsity_in_);
     s.pack("FunctionInternal::sp_out", sparsity_out_);
     s.pack("FunctionInternal::name_in", name_in_);
@@ -3224,6 +3564,10 @@ namespace casadi {
     s.pack("FunctionInternal::jit_base_name", jit_base_name_);
     s.pack("FunctionInternal::jit_options", jit_options_);
     s.pack("FunctionInternal::compiler_plugin", compiler_plugin_);
+    s.pack("FunctionInternal::jit_cache", jit_cache_);
+    s.pack("FunctionInternal::jit_cache_max_size", jit_cache_max_size_);
+    s.pack("FunctionInternal::jit_cache_max_entries", jit_cache_max_entries_);
+    s.pack("FunctionInternal::sparsity_cache", sparsity_cache_);
     s.pack("FunctionInternal::has_refcount", has_refcount_);
 
     s.pack("FunctionInternal::derivative_of", derivative_of_);
@@ -3274,7 +3618,7 @@ namespace casadi {
   }
 
   FunctionInternal::FunctionInternal(DeserializingStream& s) : ProtoFunction(s) {
-    s.version("FunctionInternal", 1);
+    int version = s.version("FunctionInternal", 1, 3);
     s.unpack("FunctionInternal::sp_in", sparsity_in_);
     s.unpack("FunctionInternal::sp_out", sparsity_out_);
     s.unpack("FunctionInternal::name_in", name_in_);
@@ -3286,6 +3630,15 @@ namespace casadi {
     s.unpack("FunctionInternal::jit_base_name", jit_base_name_);
     s.unpack("FunctionInternal::jit_options", jit_options_);
     s.unpack("FunctionInternal::compiler_plugin", compiler_plugin_);
+    if (version>=2) {
+      s.unpack("FunctionInternal::jit_cache", jit_cache_);
+      s.unpack("FunctionInternal::jit_cache_max_size", jit_cache_max_size_);
+      s.unpack("FunctionInternal::jit_cache_max_entries", jit_cache_max_entries_);
+    } else {
+      jit_cache_max_size_ = 1 << 30;
+      jit_cache_max_entries_ = 0;
+    }
+    if (version>=3) s.unpack("FunctionInternal::sparsity_cache", sparsity_cache_);
     s.unpack("FunctionInternal::has_refcount", has_refcount_);
 
     s.unpack("FunctionInternal::derivative_of", derivative_of_);
@@ -3323,6 +3676,7 @@ namespace casadi {
     s.unpack("FunctionInternal::dump_format", dump_format_);
     // Makes no sense to dump a Function that is being deserialized
     dump_ = false;
+    profile_ = false;
     s.unpack("FunctionInternal::forward_options", forward_options_);
     s.unpack("FunctionInternal::reverse_options", reverse_options_);
 
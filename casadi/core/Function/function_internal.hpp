@@ -39,6 +39,7 @@
 #include "sparse_storage.hpp"
 #include "options.hpp"
 #include "shared_object_internal.hpp"
+#include "timing.hpp"
 #ifdef CASADI_WITH_THREAD
 #ifdef CASADI_WITH_THREAD_MINGW
 #include <mingw.mutex.h>
@@ -172,6 +173,7 @@ namespace casadi {
   */
   class CASADI_EXPORT FunctionInternal : public ProtoFunction {
     friend class Function;
+    friend class ProfileScope;
   public:
     /** \brief Constructor */
     FunctionInternal(const std::string& name);
@@ -238,6 +240,12 @@ namespace casadi {
     virtual int eval(const double** arg, double** res, casadi_int* iw, double* w, void* mem) const;
     ///@}
 
+    /** \brief  Evaluate numerically at K points
+        The inputs and outputs hold the points one after another, as for map
+    */
+    virtual int eval_batch(const double** arg, double** res, casadi_int* iw, double* w,
+                           void* mem, casadi_int K) const;
+
     /** \brief  Evaluate with symbolic scalars */
     virtual int eval_sx(const SXElem** arg, SXElem** res,
       casadi_int* iw, SXElem* w, void* mem) const;
@@ -608,6 +616,16 @@ namespace casadi {
                       bool compact, bool symmetric,
                       bool allow_forward, bool allow_reverse) const;
 
+    ///@{
+    /** \brief Persistent cache of Jacobian sparsity patterns and seed matrices */
+    std::string partition_key(casadi_int iind, casadi_int oind, bool compact, bool symmetric,
+                              bool allow_forward, bool allow_reverse, std::string& check) const;
+    bool load_partition(const std::string& key, const std::string& check, casadi_int iind,
+                        casadi_int oind, bool compact, Sparsity& D1, Sparsity& D2) const;
+    void save_partition(const std::string& key, const std::string& check, const Sparsity& jac,
+                        const Sparsity& D1, const Sparsity& D2) const;
+    ///@}
+
     ///@{
     /** \brief Number of input/output nonzeros */
     casadi_int nnz_in() const;
@@ -667,6 +685,9 @@ namespace casadi {
     /// Get, if necessary generate, the sparsity of a Jacobian block
     Sparsity& sparsity_jac(casadi_int iind, casadi_int oind, bool compact, bool symmetric) const;
 
+    /// Copy of a compact Jacobian block, safe to call from concurrent sparsity sweeps
+    Sparsity sparsity_jac_compact(casadi_int iind, casadi_int oind) const;
+
     /// Get a vector of symbolic variables corresponding to the outputs
     virtual std::vector<MX> symbolic_output(const std::vector<MX>& arg) const;
 
@@ -756,6 +777,9 @@ namespace casadi {
     /** \brief Get required length of w field */
     size_t sz_w() const { return sz_w_per_ + sz_w_tmp_;}
 
+    /** \brief Get required length of w field for evaluation at K points */
+    virtual size_t sz_w_batch(casadi_int K) const { return sz_w();}
+
     /** \brief Ensure required length of arg field */
     void alloc_arg(size_t sz_arg, bool persistent=false);
 
@@ -795,7 +819,8 @@ namespace casadi {
     virtual Dict info() const;
 
     /** \brief Generate/retrieve cached serial map */
-    Function map(casadi_int n, const std::string& parallelization) const;
+    Function map(casadi_int n, const std::string& parallelization,
+                 const Dict& opts=Dict()) const;
 
     /** \brief Export an input file that can be passed to generate C code with a main */
     void generate_in(const std::string& fname, const double** arg) const;
@@ -824,6 +849,21 @@ namespace casadi {
     /** \brief Use a temporary name */
     bool jit_temp_suffix_;
 
+    /** \brief Directory of the on-disk cache of compiled code, empty if disabled */
+    std::string jit_cache_;
+
+    /** \brief Limits of the on-disk cache */
+    casadi_int jit_cache_max_size_, jit_cache_max_entries_;
+
+    /** \brief Directory of the on-disk cache of Jacobian partitions, empty if disabled */
+    std::string sparsity_cache_;
+
+    /** \brief Structural hash of the function, empty if not serializable */
+    mutable std::string structure_hash_;
+    /** \brief Independent structural hash, stored in the entries to detect collisions */
+    mutable std::string structure_digest_;
+    mutable bool structure_hashed_ = false;
+
     /** \brief Numerical evaluation redirected to a C function */
     eval_t eval_;
 
@@ -841,6 +881,9 @@ namespace casadi {
 
     /// Cache for sparsities of the Jacobian blocks
     mutable SparseStorage<Sparsity> jac_sparsity_, jac_sparsity_compact_;
+#ifdef CASADI_WITH_THREAD
+    mutable std::recursive_mutex jac_sparsity_mtx_;
+#endif // CASADI_WITH_THREAD
 
     /// If the function is the derivative of another function
     Function derivative_of_;
@@ -909,6 +952,15 @@ namespace casadi {
     mutable std::mutex dump_count_mtx_;
 #endif // CASADI_WITH_THREAD
 
+    // Record a profile of the numerical evaluations
+    bool profile_;
+
+    // Call tree of the numerical evaluations since the last reset
+    mutable CallProfile profile_data_;
+#ifdef CASADI_WITH_THREAD
+    mutable std::mutex profile_mtx_;
+#endif // CASADI_WITH_THREAD
+
     /** \brief Check if the function is of a particular type */
     virtual bool is_a(const std::string& type, bool recursive) const;
 
@@ -944,6 +996,13 @@ namespace casadi {
 
     static std::map<std::string, ProtoFunction* (*)(DeserializingStream&)> deserialize_map;
 
+    ///@{
+    /** \brief Recorded profile of the numerical evaluations, see Function::profile */
+    std::string get_profile(const std::string& format) const;
+    void reset_profile() const;
+    void add_profile(const CallProfile& p) const;
+    ///@}
+
   protected:
     /** \brief Populate jac_sparsity_ and jac_sparsity_compact_ during initialization */
     void set_jac_sparsity(const Sparsity& sp);
@@ -25,6 +25,7 @@
 
 #include "map.hpp"
 #include "serializing_stream.hpp"
+#include "thread_pool.hpp"
 
 #ifdef CASADI_WITH_THREAD
 #ifdef CASADI_WITH_THREAD_MINGW
@@ -38,15 +39,16 @@ using namespace std;
 
 namespace casadi {
 
-  Function Map::create(const std::string& parallelization, const Function& f, casadi_int n) {
+  Function Map::create(const std::string& parallelization, const Function& f, casadi_int n,
+      const Dict& opts) {
     // Create instance of the right class
     string suffix = str(n) + "_" + f.name();
     if (parallelization == "serial") {
-      return Function::create(new Map("map" + suffix, f, n), Dict());
+      return Function::create(new Map("map" + suffix, f, n), opts);
     } else if (parallelization== "openmp") {
-      return Function::create(new OmpMap("ompmap" + suffix, f, n), Dict());
+      return Function::create(new OmpMap("ompmap" + suffix, f, n), opts);
     } else if (parallelization== "thread") {
-      return Function::create(new ThreadMap("threadmap" + suffix, f, n), Dict());
+      return Function::create(new ThreadMap("threadmap" + suffix, f, n), opts);
     } else {
       casadi_error("Unknown parallelization: " + parallelization);
     }
@@ -179,7 +181,7 @@ namespace casadi {
                 const Dict& opts) const {
     // Generate map of derivative
     Function df = f_.forward(nfwd);
-    Function dm = df.map(n_, parallelization());
+    Function dm = df.map(n_, parallelization(), parallelization_options());
 
     // Input expressions
     vector<MX> arg = dm.mx_in();
@@ -230,7 +232,7 @@ namespace casadi {
                 const Dict& opts) const {
     // Generate map of derivative
     Function df = f_.reverse(nadj);
-    Function dm = df.map(n_, parallelization());
+    Function dm = df.map(n_, parallelization(), parallelization_options());
 
     // Input expressions
     vector<MX> arg = dm.mx_in();
@@ -367,36 +369,79 @@ namespace casadi {
   }
 
 
+  const Options ThreadMap::options_
+  = {{&FunctionInternal::options_},
+     {{"max_num_threads",
+       {OT_INT,
+        "Maximum number of threads evaluating in parallel, "
+        "including the calling thread [number of hardware threads]"}},
+      {"chunk_size",
+       {OT_INT,
+        "Number of consecutive evaluations scheduled at once. "
+        "Larger chunks reduce the scheduling overhead, smaller chunks balance "
+        "the load better [about four chunks per thread]"}}
+     }
+  };
+
   ThreadMap::~ThreadMap() {
+    clear_mem();
   }
 
-  void ThreadsWork(const Function& f, casadi_int i,
-      const double** arg, double** res,
-      casadi_int* iw, double* w,
-      casadi_int ind, int& ret) {
-
-    // Function dimensions
-    casadi_int n_in = f.n_in();
-    casadi_int n_out = f.n_out();
-
+  int ThreadMap::eval_worker(casadi_int k, const double** arg, double** res,
+      casadi_int* iw, double* w, ThreadMapMemory* m) const {
     // Function work sizes
     size_t sz_arg, sz_res, sz_iw, sz_w;
-    f.sz_work(sz_arg, sz_res, sz_iw, sz_w);
+    f_.sz_work(sz_arg, sz_res, sz_iw, sz_w);
 
-    // Input buffers
-    const double** arg1 = arg + n_in + i*sz_arg;
-    for (casadi_int j=0; j<n_in; ++j) {
-      arg1[j] = arg[j] ? arg[j] + i*f.nnz_in(j) : nullptr;
-    }
+    // Work vectors of the worker
+    const double** arg1 = arg + n_in_ + k*sz_arg;
+    double** res1 = res + n_out_ + k*sz_res;
+    iw += k*sz_iw;
+    w += k*sz_w;
 
-    // Output buffers
-    double** res1 = res + n_out + i*sz_res;
-    for (casadi_int j=0; j<n_out; ++j) {
-      res1[j] = res[j] ? res[j] + i*f.nnz_out(j) : nullptr;
+    // Evaluate own chunks first, then steal from the other workers
+    int ret = 0;
+    for (casadi_int v=0; v<n_workers_; ++v) {
+      casadi_int owner = (k+v) % n_workers_;
+      casadi_int end = (owner+1)*n_chunks_/n_workers_;
+      casadi_int c;
+      while ((c = m->next[owner]++) < end) {
+        casadi_int i_end = std::min((c+1)*chunk_size_, n_);
+        for (casadi_int i=c*chunk_size_; i<i_end; ++i) {
+          for (casadi_int j=0; j<n_in_; ++j) {
+            arg1[j] = arg[j] ? arg[j] + i*f_.nnz_in(j) : nullptr;
+          }
+          for (casadi_int j=0; j<n_out_; ++j) {
+            res1[j] = res[j] ? res[j] + i*f_.nnz_out(j) : nullptr;
+          }
+          if (f_(arg1, res1, iw, w, m->mem[k])) ret = 1;
+        }
+      }
     }
+    return ret;
+  }
 
-    ret = f(arg1, res1, iw + i*sz_iw, w + i*sz_w, ind);
+#ifdef CASADI_WITH_THREAD
+  // Arguments of a ThreadMap evaluation, passed to the workers
+  struct ThreadMapCall {
+    const ThreadMap* self;
+    const double** arg;
+    double** res;
+    casadi_int* iw;
+    double* w;
+    ThreadMapMemory* m;
+  };
+
+  static void ThreadsWork(void* data, casadi_int k) {
+    ThreadMapCall* d = static_cast<ThreadMapCall*>(data);
+    try {
+      d->m->ret[k] = d->self->eval_worker(k, d->arg, d->res, d->iw, d->w, d->m);
+    } catch (...) {
+      // Rethrown in the calling thread
+      d->m->err[k] = std::current_exception();
+    }
   }
+#endif // CASADI_WITH_THREAD
 
   int ThreadMap::eval(const double** arg, double** res, casadi_int* iw, double* w,
       void* mem) const {
@@ -404,36 +449,25 @@ namespace casadi {
 #ifndef CASADI_WITH_THREAD
     return Map::eval(arg, res, iw, w, mem);
 #else // CASADI_WITH_THREAD
-    // Checkout memory objects
-    std::vector< scoped_checkout<Function> > ind; ind.reserve(n_);
-    for (casadi_int i=0; i<n_; ++i) ind.emplace_back(f_);
+    auto m = static_cast<ThreadMapMemory*>(mem);
 
-    // Allocate space for return values
-    std::vector<int> ret_values(n_);
-
-    // Spawn threads
-    std::vector<std::thread> threads;
-    for (casadi_int i=0; i<n_; ++i) {
-      // Why the lambda function?
-      // Because it was the first iteration to pass tests on MingGW
-      // using mingw-std-threads.
-      threads.emplace_back(
-        [i](const Function& f, const double** arg, double** res,
-            casadi_int* iw, double* w, casadi_int ind, int& ret) {
-              ThreadsWork(f, i, arg, res, iw, w, ind, ret);
-            },
-        std::ref(f_), arg, res, iw, w, casadi_int(ind[i]), std::ref(ret_values[i]));
+    // Divide the chunks evenly over the workers
+    for (casadi_int k=0; k<n_workers_; ++k) {
+      m->next[k] = k*n_chunks_/n_workers_;
+      m->ret[k] = 0;
+      m->err[k] = nullptr;
     }
 
-    // Join threads
-    for (auto && th : threads) th.join();
-
-    // Anticipate success
-    int ret = 0;
+    // Evaluate in parallel
+    ThreadMapCall call = {this, arg, res, iw, w, m};
+    ThreadPool::instance().run(n_workers_, ThreadsWork, &call);
 
     // Compute aggregate return value
-    for (int e : ret_values) ret = ret || e;
-
+    int ret = 0;
+    for (casadi_int k=0; k<n_workers_; ++k) {
+      if (m->err[k]) std::rethrow_exception(m->err[k]);
+      ret = ret || m->ret[k];
+    }
     return ret;
 #endif // CASADI_WITH_THREAD
   }
@@ -442,6 +476,35 @@ namespace casadi {
     Map::codegen_body(g);
   }
 
+  Dict ThreadMap::parallelization_options() const {
+    return {{"max_num_threads", max_num_threads_}, {"chunk_size", chunk_size_}};
+  }
+
+  casadi_int ThreadMap::default_num_threads() {
+#ifdef CASADI_WITH_THREAD
+    return std::max(static_cast<casadi_int>(std::thread::hardware_concurrency()),
+                    casadi_int(1));
+#else // CASADI_WITH_THREAD
+    return 1;
+#endif // CASADI_WITH_THREAD
+  }
+
+  void ThreadMap::set_workers() {
+    // About four chunks per thread, to allow for load balancing
+    if (chunk_size_==-1) {
+      casadi_int nt = std::min(std::max(max_num_threads_, casadi_int(1)), n_);
+      chunk_size_ = std::max(n_ / (4*nt), casadi_int(1));
+    }
+    casadi_assert(max_num_threads_>=1, "Option 'max_num_threads' must be positive");
+    casadi_assert(chunk_size_>=1, "Option 'chunk_size' must be positive");
+    n_chunks_ = (n_ + chunk_size_ - 1) / chunk_size_;
+#ifdef CASADI_WITH_THREAD
+    n_workers_ = std::min(max_num_threads_, n_chunks_);
+#else // CASADI_WITH_THREAD
+    n_workers_ = 1;
+#endif // CASADI_WITH_THREAD
+  }
+
   void ThreadMap::init(const Dict& opts) {
 #ifndef CASADI_WITH_THREAD
     casadi_warning("CasADi was not compiled with WITH_THREAD=ON. "
@@ -450,14 +513,64 @@ namespace casadi {
     // Call the initialization method of the base class
     Map::init(opts);
 
-    // Allocate memory for holding memory object references
-    alloc_iw(n_, true);
+    // Default options
+    max_num_threads_ = default_num_threads();
+    chunk_size_ = -1;
 
-    // Allocate sufficient memory for parallel evaluation
-    alloc_arg(f_.sz_arg() * n_);
-    alloc_res(f_.sz_res() * n_);
-    alloc_w(f_.sz_w() * n_);
-    alloc_iw(f_.sz_iw() * n_);
+    // Read options
+    for (auto&& op : opts) {
+      if (op.first=="max_num_threads") {
+        max_num_threads_ = op.second;
+      } else if (op.first=="chunk_size") {
+        chunk_size_ = op.second;
+      }
+    }
+    set_workers();
+
+    // Allocate work vectors for each worker, once
+    alloc_arg(f_.sz_arg() * n_workers_);
+    alloc_res(f_.sz_res() * n_workers_);
+    alloc_w(f_.sz_w() * n_workers_);
+    alloc_iw(f_.sz_iw() * n_workers_);
+  }
+
+  int ThreadMap::init_mem(void* mem) const {
+    if (!mem) return 1;
+    auto m = static_cast<ThreadMapMemory*>(mem);
+
+    // Memory objects of the mapped function are held on to by the workers
+    m->mem.resize(n_workers_);
+    for (casadi_int& e : m->mem) e = f_.checkout();
+    m->next = std::vector< std::atomic<casadi_int> >(n_workers_);
+    m->ret.resize(n_workers_);
+    m->err.resize(n_workers_);
+    return 0;
+  }
+
+  void ThreadMap::free_mem(void *mem) const {
+    auto m = static_cast<ThreadMapMemory*>(mem);
+    for (casadi_int e : m->mem) f_.release(e);
+    delete m;
+  }
+
+  void ThreadMap::serialize_body(SerializingStream &s) const {
+    Map::serialize_body(s);
+    s.version("ThreadMap", 1);
+    s.pack("ThreadMap::max_num_threads", max_num_threads_);
+    s.pack("ThreadMap::chunk_size", chunk_size_);
+  }
+
+  ThreadMap::ThreadMap(DeserializingStream& s) : Map(s) {
+    if (s.protocol_version()>=7) {
+      s.version("ThreadMap", 1);
+      s.unpack("ThreadMap::max_num_threads", max_num_threads_);
+      s.unpack("ThreadMap::chunk_size", chunk_size_);
+    } else {
+      // Written before the options existed
+      max_num_threads_ = default_num_threads();
+      chunk_size_ = -1;
+    }
+    set_workers();
   }
 
 } // namespace casadi
@@ -27,6 +27,8 @@
 #define CASADI_MAP_HPP
 
 #include "function_internal.hpp"
+#include <atomic>
+#include <exception>
 
 /// \cond INTERNAL
 
@@ -40,7 +42,7 @@ namespace casadi {
   public:
     // Create function (use instead of constructor)
     static Function create(const std::string& parallelization,
-                           const Function& f, casadi_int n);
+                           const Function& f, casadi_int n, const Dict& opts=Dict());
 
     /** \brief Destructor */
     ~Map() override;
@@ -83,6 +85,9 @@ namespace casadi {
     /// Type of parallellization
     virtual std::string parallelization() const { return "serial"; }
 
+    /// Options of the parallelization, passed on to derivatives
+    virtual Dict parallelization_options() const { return Dict(); }
+
     /** \brief  evaluate symbolically while also propagating directional derivatives */
     int eval_sx(const SXElem** arg, SXElem** res,
                 casadi_int* iw, SXElem* w, void* mem) const override;
@@ -194,9 +199,23 @@ namespace casadi {
     explicit OmpMap(DeserializingStream& s) : Map(s) {}
   };
 
+  /** \brief Memory for ThreadMap */
+  struct CASADI_EXPORT ThreadMapMemory {
+    // Memory objects of the mapped function, one per worker
+    std::vector<casadi_int> mem;
+
+    // Next chunk to be evaluated in the range of chunks owned by each worker
+    std::vector< std::atomic<casadi_int> > next;
+
+    // Return flag and exception, if any, of each worker
+    std::vector<int> ret;
+    std::vector<std::exception_ptr> err;
+  };
+
   /** A map Evaluate in parallel using std::thread
-      Note: Do not use this class with much more than the intended number of
-      threads for the parallel evaluation as it will cause excessive memory use.
+      The evaluations are split into chunks, which are divided evenly over a
+      process-wide pool of worker threads. A worker that runs out of chunks
+      steals the remaining chunks of the other workers.
 
       \author Joris Gillis
       \date 2018
@@ -213,21 +232,61 @@ namespace casadi {
     /** \brief Get type name */
     std::string class_name() const override {return "ThreadMap";}
 
+    ///@{
+    /** \brief Options */
+    static const Options options_;
+    const Options& get_options() const override { return options_;}
+    ///@}
+
     /// Evaluate the function numerically
     int eval(const double** arg, double** res, casadi_int* iw, double* w, void* mem) const override;
 
+    /// Evaluate the chunks assigned to, or stolen by, a worker
+    int eval_worker(casadi_int k, const double** arg, double** res,
+                    casadi_int* iw, double* w, ThreadMapMemory* m) const;
+
     /** \brief  Initialize */
     void init(const Dict& opts) override;
 
+    /** \brief Create memory block */
+    void* alloc_mem() const override { return new ThreadMapMemory();}
+
+    /** \brief Initalize memory block */
+    int init_mem(void* mem) const override;
+
+    /** \brief Free memory block */
+    void free_mem(void *mem) const override;
+
     /// Type of parallellization
     std::string parallelization() const override { return "thread"; }
 
+    /// Options of the parallelization, passed on to derivatives
+    Dict parallelization_options() const override;
+
     /** \brief Generate code for the body of the C function */
     void codegen_body(CodeGenerator& g) const override;
 
+    /** \brief Serialize an object without type information */
+    void serialize_body(SerializingStream &s) const override;
+
   protected:
     /** \brief Deserializing constructor */
-    explicit ThreadMap(DeserializingStream& s) : Map(s) {}
+    explicit ThreadMap(DeserializingStream& s);
+
+    /// Default for the option 'max_num_threads'
+    static casadi_int default_num_threads();
+
+    /// Number of workers and chunks, given the options
+    void set_workers();
+
+    // Maximum number of threads evaluating in parallel
+    casadi_int max_num_threads_;
+
+    // Number of consecutive evaluations scheduled at once
+    casadi_int chunk_size_;
+
+    // Number of workers and chunks
+    casadi_int n_workers_, n_chunks_;
   };
 
 } // namespace casadi
@@ -75,6 +75,9 @@ namespace casadi {
                    + str(free_vars_) + " are free.");
     }
 
+    // Faster interpreter, if compiled
+    if (!bc_op_.empty()) return eval_bytecode(arg, res, w);
+
     // NOTE: The implementation of this function is very delicate. Small changes in the
     // class structure can cause large performance losses. For this reason,
     // the preprocessor macros are used below
@@ -94,6 +97,234 @@ namespace casadi {
     return 0;
   }
 
+  // Number of points evaluated together by eval_batch, keeping the work vector in cache
+  static const casadi_int batch_lanes = 64;
+
+  size_t SXFunction::sz_w_batch(casadi_int K) const {
+    return sz_w() * std::min(K, batch_lanes);
+  }
+
+  int SXFunction::eval_batch(const double** arg, double** res,
+      casadi_int* iw, double* w, void* mem, casadi_int K) const {
+    if (verbose_) casadi_message(name_ + "::eval_batch");
+
+    // Make sure no free parameters
+    if (!free_vars_.empty()) {
+      std::stringstream ss;
+      disp(ss, false);
+      casadi_error("Cannot evaluate \"" + ss.str() + "\" since variables "
+                   + str(free_vars_) + " are free.");
+    }
+
+    // The work vector holds n consecutive values (a lane) for each variable
+    for (casadi_int p=0; p<K; p+=batch_lanes) {
+      casadi_int n = std::min(K-p, batch_lanes);
+      for (auto&& e : algorithm_) {
+        switch (e.op) {
+          CASADI_MATH_FUN_BUILTIN_GEN(BinaryOperationVV, w+e.i1*n, w+e.i2*n, w+e.i0*n, n)
+
+        case OP_CONST:
+          std::fill_n(w+e.i0*n, n, e.d);
+          break;
+        case OP_INPUT:
+          if (arg[e.i1]==nullptr) {
+            std::fill_n(w+e.i0*n, n, 0);
+          } else {
+            casadi_int nnz = nnz_in(e.i1);
+            const double* a = arg[e.i1] + p*nnz + e.i2;
+            double* f = w+e.i0*n;
+            for (casadi_int k=0; k<n; ++k) f[k] = a[k*nnz];
+          }
+          break;
+        case OP_OUTPUT:
+          if (res[e.i0]!=nullptr) {
+            casadi_int nnz = nnz_out(e.i0);
+            double* r = res[e.i0] + p*nnz + e.i2;
+            const double* f = w+e.i1*n;
+            for (casadi_int k=0; k<n; ++k) r[k*nnz] = f[k];
+          }
+          break;
+        default:
+          casadi_error("Unknown operation" + str(e.op));
+        }
+      }
+    }
+    return 0;
+  }
+
+// Dispatch with computed goto where supported (GCC, Clang), otherwise with a switch
+#if defined(__GNUC__) && !defined(CASADI_SX_NO_COMPUTED_GOTO)
+#define CASADI_SX_COMPUTED_GOTO
+#endif
+
+// Built-in operations of the bytecode interpreter, cf. CASADI_MATH_FUN_BUILTIN
+#define CASADI_SX_BYTECODE_BUILTIN(I) \
+  I(ASSIGN) I(ADD) I(SUB) I(MUL) I(DIV) I(NEG) I(EXP) I(LOG) I(POW) I(CONSTPOW) \
+  I(SQRT) I(SQ) I(TWICE) I(SIN) I(COS) I(TAN) I(ASIN) I(ACOS) I(ATAN) I(LT) I(LE) \
+  I(EQ) I(NE) I(NOT) I(AND) I(OR) I(IF_ELSE_ZERO) I(FLOOR) I(CEIL) I(FMOD) I(FABS) \
+  I(SIGN) I(COPYSIGN) I(ERF) I(FMIN) I(FMAX) I(INV) I(SINH) I(COSH) I(TANH) \
+  I(ASINH) I(ACOSH) I(ATANH) I(ATAN2) I(ERFINV) I(LIFT) I(PRINTME)
+
+// Pairs of operations fused into superinstructions
+#define CASADI_SX_BYTECODE_FUSED(F) \
+  F(MUL, ADD) F(MUL, SUB) F(MUL, MUL) F(ADD, ADD) F(ADD, MUL) F(SUB, MUL) \
+  F(SQ, ADD) F(NEG, MUL)
+
+  /// Instructions of the bytecode interpreter
+  enum SXBytecodeOp {
+    BC_END, BC_CONST, BC_INPUT, BC_OUTPUT, BC_INPUT_INPUT, BC_OUTPUT_OUTPUT, BC_UNKNOWN,
+#define CASADI_SX_BYTECODE_ENUM(OP) BC_##OP,
+    CASADI_SX_BYTECODE_BUILTIN(CASADI_SX_BYTECODE_ENUM)
+#undef CASADI_SX_BYTECODE_ENUM
+#define CASADI_SX_BYTECODE_ENUM(A, B) BC_##A##_##B,
+    CASADI_SX_BYTECODE_FUSED(CASADI_SX_BYTECODE_ENUM)
+#undef CASADI_SX_BYTECODE_ENUM
+    BC_NUM
+  };
+
+  // Instruction for a built-in operation, BC_UNKNOWN if not supported
+  static unsigned char bytecode_op(int op) {
+    switch (op) {
+#define CASADI_SX_BYTECODE_CASE(OP) case OP_##OP: return BC_##OP;
+      CASADI_SX_BYTECODE_BUILTIN(CASADI_SX_BYTECODE_CASE)
+#undef CASADI_SX_BYTECODE_CASE
+      case OP_CONST: return BC_CONST;
+      case OP_INPUT: return BC_INPUT;
+      case OP_OUTPUT: return BC_OUTPUT;
+      default: return BC_UNKNOWN;
+    }
+  }
+
+  // Superinstruction for a pair of instructions, BC_END if none
+  static unsigned char bytecode_fused(unsigned char a, unsigned char b) {
+#define CASADI_SX_BYTECODE_PAIR(A, B) if (a==BC_##A && b==BC_##B) return BC_##A##_##B;
+    CASADI_SX_BYTECODE_FUSED(CASADI_SX_BYTECODE_PAIR)
+#undef CASADI_SX_BYTECODE_PAIR
+    if (a==BC_INPUT && b==BC_INPUT) return BC_INPUT_INPUT;
+    if (a==BC_OUTPUT && b==BC_OUTPUT) return BC_OUTPUT_OUTPUT;
+    return BC_END;
+  }
+
+  void SXFunction::compile_bytecode() {
+    casadi_int n = algorithm_.size();
+    bc_op_.resize(n+1);
+    bc_i0_.resize(n+1);
+    bc_i1_.resize(n+1);
+    bc_i2_.resize(n+1);
+    bc_const_.clear();
+    for (casadi_int k=0; k<n; ++k) {
+      const AlgEl& e = algorithm_[k];
+      bc_op_[k] = bytecode_op(e.op);
+      bc_i0_[k] = e.i0;
+      if (e.op==OP_CONST) {
+        // Index in the constant pool
+        bc_i1_[k] = bc_const_.size();
+        bc_i2_[k] = 0;
+        bc_const_.push_back(e.d);
+      } else if (bc_op_[k]==BC_UNKNOWN) {
+        // Reported during evaluation, like the switch interpreter does
+        bc_i1_[k] = e.op;
+        bc_i2_[k] = 0;
+      } else {
+        bc_i1_[k] = e.i1;
+        bc_i2_[k] = e.i2;
+      }
+    }
+    // Terminate, saving a bounds check per instruction
+    bc_op_[n] = BC_END;
+    bc_i0_[n] = bc_i1_[n] = bc_i2_[n] = 0;
+
+    // Fuse pairs of instructions, the second one keeps its operands
+    for (casadi_int k=0; k+1<n; ++k) {
+      unsigned char f = bytecode_fused(bc_op_[k], bc_op_[k+1]);
+      if (f!=BC_END) bc_op_[k++] = f;
+    }
+  }
+
+  int SXFunction::eval_bytecode(const double** arg, double** res, double* w) const {
+    // Struct of arrays
+    const unsigned char* op = get_ptr(bc_op_);
+    const int* i0 = get_ptr(bc_i0_);
+    const int* i1 = get_ptr(bc_i1_);
+    const int* i2 = get_ptr(bc_i2_);
+    const double* c = get_ptr(bc_const_);
+
+    // Instruction counter
+    casadi_int k = 0;
+
+    // Each instruction jumps directly to the next one, instead of returning to a loop
+#ifdef CASADI_SX_COMPUTED_GOTO
+#define CASADI_SX_BYTECODE_LABEL(L) &&L_##L,
+#define CASADI_SX_BYTECODE_PAIR(A, B) &&L_##A##_##B,
+    static const void* dispatch[BC_NUM] = {
+      &&L_END, &&L_CONST, &&L_INPUT, &&L_OUTPUT, &&L_INPUT_INPUT, &&L_OUTPUT_OUTPUT, &&L_UNKNOWN,
+      CASADI_SX_BYTECODE_BUILTIN(CASADI_SX_BYTECODE_LABEL)
+      CASADI_SX_BYTECODE_FUSED(CASADI_SX_BYTECODE_PAIR)
+    };
+#undef CASADI_SX_BYTECODE_LABEL
+#undef CASADI_SX_BYTECODE_PAIR
+#define CASADI_SX_BYTECODE_INSTR(L) L_##L:
+#define CASADI_SX_BYTECODE_NEXT(N) k += N; goto *dispatch[op[k]]
+#define CASADI_SX_BYTECODE_BEGIN goto *dispatch[op[0]];
+#define CASADI_SX_BYTECODE_FINISH
+#else // CASADI_SX_COMPUTED_GOTO
+#define CASADI_SX_BYTECODE_INSTR(L) case BC_##L:
+#define CASADI_SX_BYTECODE_NEXT(N) k += N; continue
+#define CASADI_SX_BYTECODE_BEGIN for (;;) switch (op[k]) {
+#define CASADI_SX_BYTECODE_FINISH default: casadi_error("Corrupt bytecode"); }
+#endif // CASADI_SX_COMPUTED_GOTO
+
+// Instruction bodies, evaluating the instruction at position K
+#define CASADI_SX_BYTECODE_INPUT(K) w[i0[K]] = arg[i1[K]]==nullptr ? 0 : arg[i1[K]][i2[K]];
+#define CASADI_SX_BYTECODE_OUTPUT(K) if (res[i0[K]]!=nullptr) res[i0[K]][i2[K]] = w[i1[K]];
+#define CASADI_SX_BYTECODE_FUN(OP, K) \
+    BinaryOperationSS<OP_##OP>::fcn(w[i1[K]], w[i2[K]], w[i0[K]], 1);
+
+    CASADI_SX_BYTECODE_BEGIN
+    CASADI_SX_BYTECODE_INSTR(END)
+      return 0;
+    CASADI_SX_BYTECODE_INSTR(CONST)
+      w[i0[k]] = c[i1[k]];
+      CASADI_SX_BYTECODE_NEXT(1);
+    CASADI_SX_BYTECODE_INSTR(INPUT)
+      CASADI_SX_BYTECODE_INPUT(k)
+      CASADI_SX_BYTECODE_NEXT(1);
+    CASADI_SX_BYTECODE_INSTR(OUTPUT)
+      CASADI_SX_BYTECODE_OUTPUT(k)
+      CASADI_SX_BYTECODE_NEXT(1);
+    CASADI_SX_BYTECODE_INSTR(INPUT_INPUT)
+      CASADI_SX_BYTECODE_INPUT(k)
+      CASADI_SX_BYTECODE_INPUT(k+1)
+      CASADI_SX_BYTECODE_NEXT(2);
+    CASADI_SX_BYTECODE_INSTR(OUTPUT_OUTPUT)
+      CASADI_SX_BYTECODE_OUTPUT(k)
+      CASADI_SX_BYTECODE_OUTPUT(k+1)
+      CASADI_SX_BYTECODE_NEXT(2);
+    CASADI_SX_BYTECODE_INSTR(UNKNOWN)
+      casadi_error("Unknown operation" + str(i1[k]));
+#define CASADI_SX_BYTECODE_CASE(OP) \
+    CASADI_SX_BYTECODE_INSTR(OP) \
+      CASADI_SX_BYTECODE_FUN(OP, k) \
+      CASADI_SX_BYTECODE_NEXT(1);
+    CASADI_SX_BYTECODE_BUILTIN(CASADI_SX_BYTECODE_CASE)
+#undef CASADI_SX_BYTECODE_CASE
+#define CASADI_SX_BYTECODE_CASE(A, B) \
+    CASADI_SX_BYTECODE_INSTR(A##_##B) \
+      CASADI_SX_BYTECODE_FUN(A, k) \
+      CASADI_SX_BYTECODE_FUN(B, k+1) \
+      CASADI_SX_BYTECODE_NEXT(2);
+    CASADI_SX_BYTECODE_FUSED(CASADI_SX_BYTECODE_CASE)
+#undef CASADI_SX_BYTECODE_CASE
+    CASADI_SX_BYTECODE_FINISH
+#undef CASADI_SX_BYTECODE_BEGIN
+#undef CASADI_SX_BYTECODE_FINISH
+#undef CASADI_SX_BYTECODE_INSTR
+#undef CASADI_SX_BYTECODE_NEXT
+#undef CASADI_SX_BYTECODE_INPUT
+#undef CASADI_SX_BYTECODE_OUTPUT
+#undef CASADI_SX_BYTECODE_FUN
+  }
+
   bool SXFunction::is_smooth() const {
     // Go through all nodes and check if any node is non-smooth
     for (auto&& a : algorithm_) {
@@ -196,7 +427,12 @@ namespace casadi {
         "Just-in-time compilation for numeric evaluation using OpenCL (experimental)"}},
       {"live_variables",
        {OT_BOOL,
-        "Reuse variables in the work vector"}}
+        "Reuse variables in the work vector"}},
+      {"interpreter",
+       {OT_STRING,
+        "Interpreter for numerical evaluation: 'switch' (default) or 'bytecode', "
+        "which fuses common pairs of operations and uses a compact layout and "
+        "faster dispatch"}}
      }
   };
 
@@ -206,6 +442,7 @@ namespace casadi {
     opts["live_variables"] = live_variables_;
     opts["just_in_time_sparsity"] = just_in_time_sparsity_;
     opts["just_in_time_opencl"] = just_in_time_opencl_;
+    opts["interpreter"] = interpreter_;
     return opts;
   }
 
@@ -216,6 +453,7 @@ namespace casadi {
 
     // Default (temporary) options
     live_variables_ = true;
+    interpreter_ = "switch";
 
     // Read options
     for (auto&& op : opts) {
@@ -227,8 +465,13 @@ namespace casadi {
         just_in_time_opencl_ = op.second;
       } else if (op.first=="just_in_time_sparsity") {
         just_in_time_sparsity_ = op.second;
+      } else if (op.first=="interpreter") {
+        interpreter_ = op.second.to_string();
       }
     }
+    casadi_assert(interpreter_=="switch" || interpreter_=="bytecode",
+                  "Unknown interpreter '" + interpreter_ + "', "
+                  "expected 'switch' or 'bytecode'");
 
     // Check/set default inputs
     if (default_in_.empty()) {
@@ -474,6 +717,10 @@ namespace casadi {
       casadi_error("OpenCL is not supported in this version of CasADi");
     }
 
+    // Compile for the bytecode interpreter
+    bc_op_.clear();
+    if (interpreter_=="bytecode") compile_bytecode();
+
     // Print
     if (verbose_) casadi_message(str(algorithm_.size()) + " elementary operations");
   }
@@ -967,7 +1214,7 @@ namespace casadi {
 
   SXFunction::SXFunction(DeserializingStream& s) :
     XFunction<SXFunction, SX, SXNode>(s) {
-    s.version("SXFunction", 1);
+    int version = s.version("SXFunction", 1, 2);
     size_t n_instructions;
     s.unpack("SXFunction::n_instr", n_instructions);
 
@@ -991,13 +1238,19 @@ namespace casadi {
     just_in_time_sparsity_ = false;
 
     s.unpack("SXFunction::live_variables", live_variables_);
+    if (version>=2) {
+      s.unpack("SXFunction::interpreter", interpreter_);
+    } else {
+      interpreter_ = "switch";
+    }
+    if (interpreter_=="bytecode") compile_bytecode();
 
     XFunction<SXFunction, SX, SXNode>::delayed_deserialize_members(s);
   }
 
   void SXFunction::serialize_body(SerializingStream &s) const {
     XFunction<SXFunction, SX, SXNode>::serialize_body(s);
-    s.version("SXFunction", 1);
+    s.version("SXFunction", 2);
     s.pack("SXFunction::n_instr", algorithm_.size());
 
     s.pack("SXFunction::worksize", worksize_);
@@ -1015,6 +1268,7 @@ namespace casadi {
     }
 
     s.pack("SXFunction::live_variables", live_variables_);
+    s.pack("SXFunction::interpreter", interpreter_);
 
     XFunction<SXFunction, SX, SXNode>::delayed_serialize_members(s);
   }
@@ -62,6 +62,19 @@ class CASADI_EXPORT SXFunction :
   /** \brief  Evaluate numerically, work vectors given */
   int eval(const double** arg, double** res, casadi_int* iw, double* w, void* mem) const override;
 
+  /** \brief  Evaluate numerically at K points, one operation for all points at a time */
+  int eval_batch(const double** arg, double** res, casadi_int* iw, double* w,
+                 void* mem, casadi_int K) const override;
+
+  /** \brief Get required length of w field for evaluation at K points */
+  size_t sz_w_batch(casadi_int K) const override;
+
+  /** \brief  Evaluate numerically using the bytecode interpreter */
+  int eval_bytecode(const double** arg, double** res, double* w) const;
+
+  /** \brief  Compile the algorithm for the bytecode interpreter */
+  void compile_bytecode();
+
   /** \brief  evaluate symbolically while also propagating directional derivatives */
   int eval_sx(const SXElem** arg, SXElem** res,
               casadi_int* iw, SXElem* w, void* mem) const override;
@@ -238,6 +251,21 @@ class CASADI_EXPORT SXFunction :
   /// Live variables?
   bool live_variables_;
 
+  /// Interpreter used for numerical evaluation: "switch" or "bytecode"
+  std::string interpreter_;
+
+  ///@{
+  /** \brief  Algorithm in the layout of the bytecode interpreter
+
+      One entry per instruction in each array (struct of arrays). Pairs of
+      instructions that are common in expression graphs are fused into
+      superinstructions, occupying two consecutive entries.
+  */
+  std::vector<unsigned char> bc_op_;
+  std::vector<int> bc_i0_, bc_i1_, bc_i2_;
+  std::vector<double> bc_const_;
+  ///@}
+
 protected:
   /** \brief Deserializing constructor */
   explicit SXFunction(DeserializingStream& s);
@@ -264,6 +264,41 @@ namespace casadi {
     x_ = DM(sparsity_, v);
   }
 
+  void ConstantMapped::generate(CodeGenerator& g,
+                                const std::vector<casadi_int>& arg,
+                                const std::vector<casadi_int>& res) const {
+    string ind = g.constant(vector<double>(nz_, nz_+nnz()));
+    g << g.copy(ind, nnz(), g.work(res[0], nnz())) << '\n';
+  }
+
+  Matrix<double> ConstantMapped::get_DM() const {
+    return DM(sparsity(), vector<double>(nz_, nz_+nnz()));
+  }
+
+  bool ConstantMapped::is_equal(const MXNode* node, casadi_int depth) const {
+    const ConstantMapped* n = dynamic_cast<const ConstantMapped*>(node);
+    if (n==nullptr) return false;
+    if (this->sparsity()!=node->sparsity()) return false;
+    return std::equal(nz_, nz_+nnz(), n->nz_);
+  }
+
+  void ConstantMapped::serialize_type(SerializingStream& s) const {
+    MXNode::serialize_type(s);
+    s.pack("ConstantMX::type", 'a');
+  }
+
+  void ConstantMapped::serialize_body(SerializingStream& s) const {
+    MXNode::serialize_body(s);
+    s.pack("ConstantMX::nonzeros", vector<double>(nz_, nz_+nnz()));
+  }
+
+  ConstantMapped::ConstantMapped(DeserializingStream& s) : ConstantMX(s) {
+    file_ = s.mapped_file();
+    casadi_int n;
+    nz_ = s.unpack_mapped("ConstantMX::nonzeros", owned_, n);
+    casadi_assert(n==nnz(), "Error deserializing");
+  }
+
   void ZeroByZero::serialize_type(SerializingStream& s) const {
     MXNode::serialize_type(s);
     s.pack("ConstantMX::type", 'z');
@@ -277,7 +312,9 @@ namespace casadi {
     char t;
     s.unpack("ConstantMX::type", t);
     switch (t) {
-      case 'a':    return new ConstantDM(s);
+      case 'a':
+        if (s.mapped_file()) return new ConstantMapped(s);
+        return new ConstantDM(s);
       case 'z':    return ZeroByZero::getInstance();
       case 'D':
         return new Constant<RuntimeConst<double> >(s, RuntimeConst<double>::deserialize(s));
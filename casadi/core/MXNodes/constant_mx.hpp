@@ -193,6 +193,74 @@ namespace casadi {
     explicit ConstantDM(DeserializingStream& s);
   };
 
+  /** \brief A constant whose nonzeros are stored in a memory-mapped file
+
+      Created when deserializing from a MappedFile written with the "aligned"
+      option. Serializes like ConstantDM.
+  */
+  class CASADI_EXPORT ConstantMapped : public ConstantMX {
+  public:
+
+    /// Destructor
+    ~ConstantMapped() override {}
+
+    /** \brief  Print expression */
+    std::string disp(const std::vector<std::string>& arg) const override {
+      return get_DM().get_str();
+    }
+
+    /** \brief  Evaluate the function numerically */
+    int eval(const double** arg, double** res, casadi_int* iw, double* w) const override {
+      std::copy(nz_, nz_+nnz(), res[0]);
+      return 0;
+    }
+
+    /** \brief  Evaluate the function symbolically (SX) */
+    int eval_sx(const SXElem** arg, SXElem** res,
+                         casadi_int* iw, SXElem* w) const override {
+      std::copy(nz_, nz_+nnz(), res[0]);
+      return 0;
+    }
+
+    /** \brief Generate code for the operation */
+    void generate(CodeGenerator& g,
+                  const std::vector<casadi_int>& arg,
+                  const std::vector<casadi_int>& res) const override;
+
+    /** \brief  Check if a particular integer value */
+    bool is_zero() const override { return get_DM().is_zero();}
+    bool is_one() const override { return get_DM().is_one();}
+    bool is_minus_one() const override { return get_DM().is_minus_one();}
+    bool is_eye() const override { return get_DM().is_eye();}
+
+    /// Get the value (only for scalar constant nodes)
+    double to_double() const override {return get_DM().scalar();}
+
+    /// Get the value (only for constant nodes)
+    Matrix<double> get_DM() const override;
+
+    /** \brief Check if two nodes are equivalent up to a given depth */
+    bool is_equal(const MXNode* node, casadi_int depth) const override;
+
+    /** \brief Serialize an object without type information */
+    void serialize_body(SerializingStream& s) const override;
+    /** \brief Serialize type information */
+    void serialize_type(SerializingStream& s) const override;
+
+    /** \brief Deserializing constructor */
+    explicit ConstantMapped(DeserializingStream& s);
+
+  private:
+    /// Keeps the mapping alive
+    std::shared_ptr<MappedFile> file_;
+
+    /// Storage if the nonzeros could not be used in place
+    std::vector<double> owned_;
+
+    /// Nonzeros
+    const double* nz_;
+  };
+
   /// A zero-by-zero matrix
   class CASADI_EXPORT ZeroByZero : public ConstantMX {
   private:
@@ -44,6 +44,13 @@ namespace casadi {
 
     set_dep(z, x, y);
     set_sparsity(z.sparsity());
+    init_mapping();
+  }
+
+  void Multiplication::init_mapping() {
+    // The mapping refers to the nonzeros of the product, z must have the same pattern
+    Sparsity sp = Sparsity::mtimes(dep(1).sparsity(), dep(2).sparsity(), mapping_);
+    if (sp!=sparsity()) mapping_.reset();
   }
 
   std::string Multiplication::disp(const std::vector<std::string>& arg) const {
@@ -62,9 +69,23 @@ namespace casadi {
   template<typename T>
   int Multiplication::eval_gen(const T** arg, T** res, casadi_int* iw, T* w) const {
     if (arg[0]!=res[0]) copy(arg[0], arg[0]+dep(0).nnz(), res[0]);
-    casadi_mtimes(arg[1], dep(1).sparsity(),
-               arg[2], dep(2).sparsity(),
-               res[0], sparsity(), w, false);
+    if (mapping_) {
+      // Precomputed nonzero mapping, no work vector needed
+      casadi_int nz = nnz();
+      const casadi_int* offset = get_ptr(*mapping_);
+      const casadi_int* pairs = offset + nz + 1;
+      for (casadi_int k=0; k<nz; ++k) {
+        T r = res[0][k];
+        for (casadi_int i=offset[k]; i<offset[k+1]; ++i) {
+          r += arg[1][pairs[2*i]] * arg[2][pairs[2*i+1]];
+        }
+        res[0][k] = r;
+      }
+    } else {
+      casadi_mtimes(arg[1], dep(1).sparsity(),
+                 arg[2], dep(2).sparsity(),
+                 res[0], sparsity(), w, false);
+    }
     return 0;
   }
 
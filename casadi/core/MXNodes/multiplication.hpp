@@ -102,7 +102,13 @@ namespace casadi {
 
   protected:
     /** \brief Deserializing constructor */
-    explicit Multiplication(DeserializingStream& s) : MXNode(s) {}
+    explicit Multiplication(DeserializingStream& s) : MXNode(s) { init_mapping();}
+
+    /** \brief Get the nonzero mapping of the product, shared with identical products */
+    void init_mapping();
+
+    /// Nonzero mapping, see Sparsity::mtimes, null if not available
+    std::shared_ptr<const std::vector<casadi_int> > mapping_;
   };
 
 
@@ -30,6 +30,7 @@ namespace casadi {
 
   bool GlobalOptions::simplification_on_the_fly = true;
   bool GlobalOptions::hierarchical_sparsity = true;
+  casadi_int GlobalOptions::sparsity_threads = 1;
 
   std::string GlobalOptions::casadipath;
 
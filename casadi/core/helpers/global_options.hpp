@@ -62,6 +62,13 @@ namespace casadi {
 
       static bool hierarchical_sparsity;
 
+      /** \brief Number of threads for Jacobian sparsity propagation
+      * Independent sweeps are distributed over the threads, requires WITH_THREAD.
+      * For the hierarchical algorithm, these are the sweeps of each level.
+      * Default: 1
+      */
+      static casadi_int sparsity_threads;
+
       static casadi_int max_num_dir;
 
       static casadi_int start_index;
@@ -75,6 +82,10 @@ namespace casadi {
       static void setHierarchicalSparsity(bool flag) { hierarchical_sparsity = flag; }
       static bool getHierarchicalSparsity() { return hierarchical_sparsity; }
 
+      // Setter and getter for sparsity_threads
+      static void setSparsityThreads(casadi_int n) { sparsity_threads = n; }
+      static casadi_int getSparsityThreads() { return sparsity_threads; }
+
       static void setCasadiPath(const std::string & path) { casadipath = path; }
       static std::string getCasadiPath() { return casadipath; }
 
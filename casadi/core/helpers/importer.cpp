@@ -77,6 +77,10 @@ namespace casadi {
     return (*this)->has_function(symname);
   }
 
+  std::string Importer::library() const {
+    return (*this)->library();
+  }
+
   signal_t Importer::get_function(const std::string& symname) {
     return (*this)->get_function(symname);
   }
@@ -111,6 +111,9 @@ namespace casadi {
     // Check if symbol exists
     bool has_function(const std::string& symname) const;
 
+    /// Path of the compiled library, empty if not known
+    std::string library() const;
+
 #ifndef SWIG
     /// Get a function pointer for numerical evaluation
     signal_t get_function(const std::string& symname);
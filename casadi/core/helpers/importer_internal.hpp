@@ -97,6 +97,12 @@ namespace casadi {
     /// Get a function pointer for numerical evaluation
     bool has_function(const std::string& symname) const;
 
+    /** \brief Path of the compiled library, empty if not known
+        Compiler plugins must return the shared library they build for the
+        "jit_cache" Function option to take effect.
+     */
+    virtual std::string library() const { return "";}
+
     /** \brief Does an entry exist? */
     bool has_meta(const std::string& cmd, casadi_int ind=-1) const;
 
@@ -183,6 +189,9 @@ namespace casadi {
     // Dummy type
     signal_t get_function(const std::string& symname) override;
 
+    /// Path of the compiled library
+    std::string library() const override { return name_;}
+
     /// Can meta information be read?
     bool can_have_meta() const override { return false;}
 
@@ -0,0 +1,250 @@
+/*
+ *    This file is part of CasADi.
+ *
+ *    CasADi -- A symbolic framework for dynamic optimization.
+ *    Copyright (C) 2010-2014 Joel Andersson, Joris Gillis, Moritz Diehl,
+ *                            K.U. Leuven. All rights reserved.
+ *    Copyright (C) 2011-2014 Greg Horn
+ *
+ *    CasADi is free software; you can redistribute it and/or
+ *    modify it under the terms of the GNU Lesser General Public
+ *    License as published by the Free Software Foundation; either
+ *    version 3 of the License, or (at your option) any later version.
+ *
+ *    CasADi is distributed in the hope that it will be useful,
+ *    but WITHOUT ANY WARRANTY; without even the implied warranty of
+ *    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ *    Lesser General Public License for more details.
+ *
+ *    You should have received a copy of the GNU Lesser General Public
+ *    License along with CasADi; if not, write to the Free Software
+ *    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ */
+
+
+#include "jit_cache.hpp"
+#include "casadi_misc.hpp"
+#include "serializing_stream.hpp"
+
+#include <algorithm>
+#include <cstdio>
+#include <cstdint>
+#include <fstream>
+#include <sstream>
+#include <vector>
+#include <sys/stat.h>
+#include <sys/types.h>
+#ifdef _WIN32
+#include <direct.h>
+#include <sys/utime.h>
+#include <windows.h>
+#else // _WIN32
+#include <dirent.h>
+#include <utime.h>
+#endif // _WIN32
+
+using namespace std;
+namespace casadi {
+
+  JitCache::JitCache(const std::string& dir, casadi_int max_size, casadi_int max_entries)
+    : dir_(dir), max_size_(max_size), max_entries_(max_entries) {
+    casadi_assert(!dir_.empty(), "JitCache: No cache directory given");
+    // Create the directory if needed, failure is detected when writing
+#ifdef _WIN32
+    _mkdir(dir_.c_str());
+#else // _WIN32
+    mkdir(dir_.c_str(), 0755);
+#endif // _WIN32
+  }
+
+  std::string JitCache::library_suffix() {
+#if defined(_WIN32)
+    return ".dll";
+#elif defined(__APPLE__)
+    return ".dylib";
+#else
+    return ".so";
+#endif
+  }
+
+  std::string JitCache::path(const std::string& key, const std::string& suffix) const {
+    return dir_ + "/" + key + suffix;
+  }
+
+  std::string JitCache::key(const std::string& code, const std::string& compiler,
+                            const Dict& opts) {
+    // Collisions are caught by comparing the stored code
+    std::stringstream opts_ss;
+    SerializingStream(opts_ss).pack(opts);
+    return "jit_" + hash({code, compiler, opts_ss.str()});
+  }
+
+  std::string JitCache::hash(const std::vector<std::string>& parts) {
+    uint64_t h = 14695981039346656037ULL;
+    for (const std::string& s : parts) {
+      for (unsigned char c : s) {
+        h ^= c;
+        h *= 1099511628211ULL;
+      }
+      // Separator
+      h ^= 0xff;
+      h *= 1099511628211ULL;
+    }
+    std::stringstream ss;
+    ss << std::hex;
+    ss.width(16);
+    ss.fill('0');
+    ss << h;
+    return ss.str();
+  }
+
+  std::string JitCache::digest(const std::vector<std::string>& parts) {
+    // Multiplicative hashing with a xorshift, unrelated to FNV-1a
+    uint64_t h = 0x243f6a8885a308d3ULL;
+    for (const std::string& s : parts) {
+      for (unsigned char c : s) {
+        h = (h + c + 1) * 0x9e3779b97f4a7c15ULL;
+        h ^= h >> 29;
+      }
+      // Separator
+      h = (h + 0x100) * 0x9e3779b97f4a7c15ULL;
+      h ^= h >> 29;
+    }
+    std::stringstream ss;
+    ss << std::hex;
+    ss.width(16);
+    ss.fill('0');
+    ss << h;
+    return ss.str();
+  }
+
+  // Read a whole file, returns false if it cannot be opened
+  static bool read_file(const std::string& fname, std::string& content) {
+    ifstream f(fname, ios::binary);
+    if (!f.good()) return false;
+    stringstream ss;
+    ss << f.rdbuf();
+    content = ss.str();
+    return true;
+  }
+
+  // Write to a temporary file in the same directory and rename it into place
+  static bool write_file(const std::string& fname, const std::string& content) {
+    string tmp = temporary_file(fname + ".", ".tmp");
+    {
+      ofstream f(tmp, ios::binary | ios::trunc);
+      f << content;
+      if (!f.good()) {
+        remove(tmp.c_str());
+        return false;
+      }
+    }
+#ifdef _WIN32
+    // rename does not replace existing files on Windows
+    remove(fname.c_str());
+#endif // _WIN32
+    if (rename(tmp.c_str(), fname.c_str())) {
+      remove(tmp.c_str());
+      return false;
+    }
+    return true;
+  }
+
+  std::string JitCache::lookup(const std::string& key, const std::string& code) const {
+    string lib = path(key, library_suffix());
+    struct stat st;
+    if (stat(lib.c_str(), &st)) return "";
+    // Guard against hash collisions and partially written entries
+    string cached;
+    if (!read_file(path(key, ".c"), cached) || cached!=code) return "";
+    // Mark as recently used
+    utime(lib.c_str(), nullptr);
+    return lib;
+  }
+
+  std::string JitCache::insert(const std::string& key, const std::string& code,
+                               const std::string& library) const {
+    string binary;
+    if (!read_file(library, binary)) return "";
+    // Code first: a library without its code is never considered a hit
+    if (!write_file(path(key, ".c"), code)) return "";
+    string lib = path(key, library_suffix());
+    if (!write_file(lib, binary)) return "";
+    evict(key);
+    return lib;
+  }
+
+  bool JitCache::lookup_data(const std::string& key, std::string& data) const {
+    string fname = path(key, ".dat");
+    if (!read_file(fname, data)) return false;
+    // Mark as recently used
+    utime(fname.c_str(), nullptr);
+    return true;
+  }
+
+  bool JitCache::insert_data(const std::string& key, const std::string& data) const {
+    return write_file(path(key, ".dat"), data);
+  }
+
+  void JitCache::evict(const std::string& keep) const {
+    if (max_size_<=0 && max_entries_<=0) return;
+    string suffix = library_suffix();
+
+    // Collect all libraries in the cache directory
+    vector<string> keys;
+#ifdef _WIN32
+    WIN32_FIND_DATAA fd;
+    HANDLE h = FindFirstFileA((dir_ + "\\*" + suffix).c_str(), &fd);
+    if (h!=INVALID_HANDLE_VALUE) {
+      do {
+        keys.push_back(fd.cFileName);
+      } while (FindNextFileA(h, &fd));
+      FindClose(h);
+    }
+#else // _WIN32
+    DIR* d = opendir(dir_.c_str());
+    if (d==nullptr) return;
+    while (struct dirent* e = readdir(d)) {
+      keys.push_back(e->d_name);
+    }
+    closedir(d);
+#endif // _WIN32
+
+    // Size and last use of each entry
+    struct Entry {
+      string key;
+      casadi_int size;
+      time_t used;
+    };
+    vector<Entry> entries;
+    casadi_int total_size = 0;
+    for (const string& f : keys) {
+      if (f.size()<=suffix.size() || f.compare(0, 4, "jit_")
+          || f.compare(f.size()-suffix.size(), suffix.size(), suffix)) continue;
+      struct stat st;
+      if (stat(path(f, "").c_str(), &st)) continue;
+      Entry e = {f.substr(0, f.size()-suffix.size()), static_cast<casadi_int>(st.st_size),
+                 st.st_mtime};
+      entries.push_back(e);
+      total_size += e.size;
+    }
+
+    // Remove least recently used first
+    sort(entries.begin(), entries.end(),
+         [](const Entry& a, const Entry& b) { return a.used < b.used;});
+    casadi_int n_entries = entries.size();
+    for (const Entry& e : entries) {
+      bool too_large = max_size_>0 && total_size>max_size_;
+      bool too_many = max_entries_>0 && n_entries>max_entries_;
+      if (!too_large && !too_many) break;
+      if (e.key==keep) continue;
+      // The library may be in use by another process, then skip it
+      if (remove(path(e.key, suffix).c_str())) continue;
+      remove(path(e.key, ".c").c_str());
+      total_size -= e.size;
+      n_entries--;
+    }
+  }
+
+} // namespace casadi
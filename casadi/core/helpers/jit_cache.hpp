@@ -0,0 +1,114 @@
+/*
+ *    This file is part of CasADi.
+ *
+ *    CasADi -- A symbolic framework for dynamic optimization.
+ *    Copyright (C) 2010-2014 Joel Andersson, Joris Gillis, Moritz Diehl,
+ *                            K.U. Leuven. All rights reserved.
+ *    Copyright (C) 2011-2014 Greg Horn
+ *
+ *    CasADi is free software; you can redistribute it and/or
+ *    modify it under the terms of the GNU Lesser General Public
+ *    License as published by the Free Software Foundation; either
+ *    version 3 of the License, or (at your option) any later version.
+ *
+ *    CasADi is distributed in the hope that it will be useful,
+ *    but WITHOUT ANY WARRANTY; without even the implied warranty of
+ *    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ *    Lesser General Public License for more details.
+ *
+ *    You should have received a copy of the GNU Lesser General Public
+ *    License along with CasADi; if not, write to the Free Software
+ *    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ */
+
+
+#ifndef CASADI_JIT_CACHE_HPP
+#define CASADI_JIT_CACHE_HPP
+
+#include "generic_type.hpp"
+
+#include <string>
+#include <vector>
+
+/// \cond INTERNAL
+namespace casadi {
+
+  /** \brief On-disk cache of just-in-time compiled libraries
+
+      Entries are content-addressed: the key is a hash of the generated code,
+      the compiler plugin and the compiler options. Each entry consists of the
+      shared library and the code it was compiled from, the latter being used to
+      rule out hash collisions. The modification time of the library is updated
+      on every hit and the least recently used entries are evicted first.
+
+      Several processes may share a cache directory: entries are written to a
+      temporary file and renamed into place.
+
+      The cache can also hold small data entries, e.g. serialized sparsity
+      patterns, which are not subject to eviction.
+  */
+  class CASADI_EXPORT JitCache {
+  public:
+    /// Constructor
+    JitCache(const std::string& dir, casadi_int max_size, casadi_int max_entries);
+
+    /// Cache key of a piece of generated code
+    static std::string key(const std::string& code, const std::string& compiler,
+                           const Dict& opts);
+
+    /// 64-bit FNV-1a hash of a sequence of strings, as a hexadecimal string
+    static std::string hash(const std::vector<std::string>& parts);
+
+    /** \brief Second 64-bit hash of a sequence of strings, as a hexadecimal string
+        Independent of hash, for verifying entries found by a key made with hash
+     */
+    static std::string digest(const std::vector<std::string>& parts);
+
+    /** \brief Look up a compiled library
+        Returns the path of the library or an empty string if not cached
+     */
+    std::string lookup(const std::string& key, const std::string& code) const;
+
+    /** \brief Add a compiled library to the cache
+        Returns the path of the cached library or an empty string on failure
+     */
+    std::string insert(const std::string& key, const std::string& code,
+                       const std::string& library) const;
+
+    /** \brief Look up a data entry
+        Returns false if not cached
+     */
+    bool lookup_data(const std::string& key, std::string& data) const;
+
+    /** \brief Add a data entry
+        Returns false on failure
+     */
+    bool insert_data(const std::string& key, const std::string& data) const;
+
+    /** \brief Remove least recently used entries until within limits
+        The entry \a keep, typically the one just added, is never removed
+     */
+    void evict(const std::string& keep="") const;
+
+    /// File name extension of shared libraries
+    static std::string library_suffix();
+
+  private:
+    /// Path of a file in the cache directory
+    std::string path(const std::string& key, const std::string& suffix) const;
+
+    /// Cache directory
+    std::string dir_;
+
+    /// Maximum total size of the libraries in bytes, non-positive for no limit
+    casadi_int max_size_;
+
+    /// Maximum number of entries, non-positive for no limit
+    casadi_int max_entries_;
+  };
+
+} // namespace casadi
+/// \endcond
+
+#endif // CASADI_JIT_CACHE_HPP
@@ -0,0 +1,118 @@
+/*
+ *    This file is part of CasADi.
+ *
+ *    CasADi -- A symbolic framework for dynamic optimization.
+ *    Copyright (C) 2010-2014 Joel Andersson, Joris Gillis, Moritz Diehl,
+ *                            K.U. Leuven. All rights reserved.
+ *    Copyright (C) 2011-2014 Greg Horn
+ *
+ *    CasADi is free software; you can redistribute it and/or
+ *    modify it under the terms of the GNU Lesser General Public
+ *    License as published by the Free Software Foundation; either
+ *    version 3 of the License, or (at your option) any later version.
+ *
+ *    CasADi is distributed in the hope that it will be useful,
+ *    but WITHOUT ANY WARRANTY; without even the implied warranty of
+ *    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ *    Lesser General Public License for more details.
+ *
+ *    You should have received a copy of the GNU Lesser General Public
+ *    License along with CasADi; if not, write to the Free Software
+ *    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ */
+
+
+#include "mapped_file.hpp"
+#include "casadi_misc.hpp"
+
+#ifdef _WIN32
+#include <windows.h>
+#else // _WIN32
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif // _WIN32
+
+using namespace std;
+namespace casadi {
+
+  MappedFile::MappedFile(const std::string& filename)
+    : filename_(filename), data_(nullptr), size_(0), stream_(&buf_) {
+#ifdef _WIN32
+    file_ = CreateFileA(filename.c_str(), GENERIC_READ, FILE_SHARE_READ, nullptr,
+                        OPEN_EXISTING, FILE_ATTRIBUTE_NORMAL, nullptr);
+    casadi_assert(file_!=INVALID_HANDLE_VALUE, "Could not open file '" + filename + "'.");
+    LARGE_INTEGER size;
+    if (!GetFileSizeEx(file_, &size) || size.QuadPart==0) {
+      CloseHandle(file_);
+      casadi_error("Could not map file '" + filename + "': empty or unreadable.");
+    }
+    size_ = static_cast<size_t>(size.QuadPart);
+    mapping_ = CreateFileMappingA(file_, nullptr, PAGE_READONLY, 0, 0, nullptr);
+    if (mapping_!=nullptr) {
+      data_ = static_cast<const char*>(MapViewOfFile(mapping_, FILE_MAP_READ, 0, 0, 0));
+    }
+    if (data_==nullptr) {
+      if (mapping_!=nullptr) CloseHandle(mapping_);
+      CloseHandle(file_);
+      casadi_error("Could not map file '" + filename + "'. "
+                   "Error code (WIN32): " + str(GetLastError()));
+    }
+#else // _WIN32
+    int fd = open(filename.c_str(), O_RDONLY);
+    casadi_assert(fd!=-1, "Could not open file '" + filename + "'.");
+    struct stat st;
+    if (fstat(fd, &st) || st.st_size==0) {
+      close(fd);
+      casadi_error("Could not map file '" + filename + "': empty or unreadable.");
+    }
+    size_ = static_cast<size_t>(st.st_size);
+    void* p = mmap(nullptr, size_, PROT_READ, MAP_SHARED, fd, 0);
+    // The mapping stays valid after the descriptor is closed
+    close(fd);
+    casadi_assert(p!=MAP_FAILED, "Could not map file '" + filename + "'.");
+    data_ = static_cast<const char*>(p);
+#endif // _WIN32
+    buf_.set(data_, size_);
+  }
+
+  MappedFile::~MappedFile() {
+#ifdef _WIN32
+    UnmapViewOfFile(data_);
+    CloseHandle(mapping_);
+    CloseHandle(file_);
+#else // _WIN32
+    munmap(const_cast<char*>(data_), size_);
+#endif // _WIN32
+  }
+
+  void MappedFile::Buffer::set(const char* data, size_t size) {
+    // Pages are mapped read-only, the get area is never written to
+    char* p = const_cast<char*>(data);
+    setg(p, p, p + size);
+  }
+
+  MappedFile::Buffer::pos_type MappedFile::Buffer::seekoff(off_type off,
+      std::ios_base::seekdir dir, std::ios_base::openmode which) {
+    if (!(which & std::ios_base::in)) return pos_type(off_type(-1));
+    char* p;
+    if (dir==std::ios_base::beg) {
+      p = eback() + off;
+    } else if (dir==std::ios_base::cur) {
+      p = gptr() + off;
+    } else {
+      p = egptr() + off;
+    }
+    if (p<eback() || p>egptr()) return pos_type(off_type(-1));
+    setg(eback(), p, egptr());
+    return pos_type(p - eback());
+  }
+
+  MappedFile::Buffer::pos_type MappedFile::Buffer::seekpos(pos_type pos,
+      std::ios_base::openmode which) {
+    return seekoff(off_type(pos), std::ios_base::beg, which);
+  }
+
+} // namespace casadi
@@ -0,0 +1,97 @@
+/*
+ *    This file is part of CasADi.
+ *
+ *    CasADi -- A symbolic framework for dynamic optimization.
+ *    Copyright (C) 2010-2014 Joel Andersson, Joris Gillis, Moritz Diehl,
+ *                            K.U. Leuven. All rights reserved.
+ *    Copyright (C) 2011-2014 Greg Horn
+ *
+ *    CasADi is free software; you can redistribute it and/or
+ *    modify it under the terms of the GNU Lesser General Public
+ *    License as published by the Free Software Foundation; either
+ *    version 3 of the License, or (at your option) any later version.
+ *
+ *    CasADi is distributed in the hope that it will be useful,
+ *    but WITHOUT ANY WARRANTY; without even the implied warranty of
+ *    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ *    Lesser General Public License for more details.
+ *
+ *    You should have received a copy of the GNU Lesser General Public
+ *    License along with CasADi; if not, write to the Free Software
+ *    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ */
+
+
+#ifndef CASADI_MAPPED_FILE_HPP
+#define CASADI_MAPPED_FILE_HPP
+
+#include <casadi/core/casadi_export.h>
+
+#include <istream>
+#include <streambuf>
+#include <string>
+
+/// \cond INTERNAL
+namespace casadi {
+
+  /** \brief Read-only memory mapping of a file
+
+      The pages are shared with the page cache, such that processes mapping
+      the same file share physical memory. The file can be read through
+      stream() without copying it into a separate buffer.
+  */
+  class CASADI_EXPORT MappedFile {
+  public:
+    /// Map a file
+    explicit MappedFile(const std::string& filename);
+
+    /// Unmap
+    ~MappedFile();
+
+    /// Not copyable
+    MappedFile(const MappedFile&) = delete;
+    MappedFile& operator=(const MappedFile&) = delete;
+
+    /// Start of the mapped data
+    const char* data() const { return data_;}
+
+    /// Size in bytes
+    size_t size() const { return size_;}
+
+    /// Input stream reading from the mapping, starting at the beginning of the file
+    std::istream& stream() { return stream_;}
+
+  private:
+    /// Stream buffer on top of the mapping
+    class Buffer : public std::streambuf {
+    public:
+      void set(const char* data, size_t size);
+    protected:
+      pos_type seekoff(off_type off, std::ios_base::seekdir dir,
+                       std::ios_base::openmode which) override;
+      pos_type seekpos(pos_type pos, std::ios_base::openmode which) override;
+    };
+
+    /// File name, for error messages
+    std::string filename_;
+
+    /// Mapped data
+    const char* data_;
+    size_t size_;
+
+#ifdef _WIN32
+    /// File and mapping handles
+    void* file_;
+    void* mapping_;
+#endif // _WIN32
+
+    /// Stream reading from the mapping
+    Buffer buf_;
+    std::istream stream_;
+  };
+
+} // namespace casadi
+/// \endcond
+
+#endif // CASADI_MAPPED_FILE_HPP
@@ -87,6 +87,8 @@ namespace casadi {
     }
 
     std::string StringSerializer::encode() {
+      // Make pending compressed data decodable
+      stream_->flush();
       std::string ret = static_cast<std::stringstream*>(stream_.get())->str();
       static_cast<std::stringstream*>(stream_.get())->str("");
       stream_->clear();
@@ -34,15 +34,143 @@
 #include "sparsity_internal.hpp"
 #include "mx_node.hpp"
 #include "function_internal.hpp"
+#include "mapped_file.hpp"
+#ifdef CASADI_WITH_ZLIB
+#include <zlib.h>
+#endif // CASADI_WITH_ZLIB
+#include <cstdint>
 #include <iomanip>
 
 using namespace std;
 namespace casadi {
 
-    static casadi_int serialization_protocol_version = 3;
+    // Version 4: vectors of double and casadi_int are written as a single block
+    // Version 5: optional unencoded, aligned layout
+    // Version 6: optional compact integer coding and compression
+    // Version 7: ThreadMap options
+    static casadi_int serialization_protocol_version = 7;
+    // Oldest version that can still be read
+    static casadi_int serialization_protocol_version_min = 3;
     static casadi_int serialization_check = 123456789012345;
 
-    DeserializingStream::DeserializingStream(std::istream& in_s) : in(in_s), debug_(false) {
+#ifdef CASADI_WITH_ZLIB
+    /// Compresses everything written to it into another stream buffer
+    class DeflateBuffer : public std::streambuf {
+    public:
+      explicit DeflateBuffer(std::streambuf* sink) : sink_(sink) {
+        z_.zalloc = Z_NULL;
+        z_.zfree = Z_NULL;
+        z_.opaque = Z_NULL;
+        casadi_assert(deflateInit(&z_, Z_DEFAULT_COMPRESSION)==Z_OK,
+          "Failed to initialize zlib compression.");
+        setp(in_, in_ + sizeof(in_));
+      }
+
+      ~DeflateBuffer() override {
+        // End the compressed stream
+        process(Z_FINISH);
+        deflateEnd(&z_);
+      }
+
+    protected:
+      int overflow(int c) override {
+        if (!process(Z_NO_FLUSH)) return traits_type::eof();
+        if (c!=traits_type::eof()) {
+          *pptr() = traits_type::to_char_type(c);
+          pbump(1);
+        }
+        return traits_type::not_eof(c);
+      }
+
+      // Makes everything written so far decodable, e.g. by StringSerializer::encode
+      int sync() override {
+        return process(Z_SYNC_FLUSH) ? 0 : -1;
+      }
+
+    private:
+      bool process(int flush) {
+        z_.next_in = reinterpret_cast<Bytef*>(pbase());
+        z_.avail_in = static_cast<uInt>(pptr() - pbase());
+        int ret;
+        do {
+          z_.next_out = reinterpret_cast<Bytef*>(out_);
+          z_.avail_out = sizeof(out_);
+          ret = deflate(&z_, flush);
+          if (ret==Z_STREAM_ERROR) return false;
+          std::streamsize n = sizeof(out_) - z_.avail_out;
+          if (sink_->sputn(out_, n)!=n) return false;
+        } while (z_.avail_out==0 || (flush==Z_FINISH && ret!=Z_STREAM_END));
+        setp(in_, in_ + sizeof(in_));
+        return true;
+      }
+
+      std::streambuf* sink_;
+      z_stream z_;
+      char in_[16384];
+      char out_[16384];
+    };
+
+    /// Decompresses data read from another stream buffer
+    class InflateBuffer : public std::streambuf {
+    public:
+      explicit InflateBuffer(std::streambuf* src) : src_(src), end_(false) {
+        z_.zalloc = Z_NULL;
+        z_.zfree = Z_NULL;
+        z_.opaque = Z_NULL;
+        z_.next_in = Z_NULL;
+        z_.avail_in = 0;
+        casadi_assert(inflateInit(&z_)==Z_OK, "Failed to initialize zlib decompression.");
+        setg(out_, out_, out_);
+      }
+
+      ~InflateBuffer() override {
+        // Return unused input, if the source supports it
+        if (z_.avail_in>0) src_->pubseekoff(-static_cast<std::streamoff>(z_.avail_in),
+                                            std::ios_base::cur, std::ios_base::in);
+        inflateEnd(&z_);
+      }
+
+    protected:
+      int underflow() override {
+        if (gptr()<egptr()) return traits_type::to_int_type(*gptr());
+        while (!end_) {
+          if (z_.avail_in==0) {
+            // Input may arrive in pieces, e.g. through StringDeserializer::decode
+            std::streamsize n = src_->sgetn(in_, sizeof(in_));
+            if (n<=0) return traits_type::eof();
+            z_.next_in = reinterpret_cast<Bytef*>(in_);
+            z_.avail_in = static_cast<uInt>(n);
+          }
+          z_.next_out = reinterpret_cast<Bytef*>(out_);
+          z_.avail_out = sizeof(out_);
+          int ret = inflate(&z_, Z_NO_FLUSH);
+          if (ret==Z_STREAM_END) {
+            end_ = true;
+          } else if (ret!=Z_OK && ret!=Z_BUF_ERROR) {
+            // Corrupt data
+            return traits_type::eof();
+          }
+          std::ptrdiff_t n = sizeof(out_) - z_.avail_out;
+          if (n>0) {
+            setg(out_, out_, out_ + n);
+            return traits_type::to_int_type(*gptr());
+          }
+        }
+        return traits_type::eof();
+      }
+
+    private:
+      std::streambuf* src_;
+      bool end_;
+      z_stream z_;
+      char in_[16384];
+      char out_[16384];
+    };
+#endif // CASADI_WITH_ZLIB
+
+    DeserializingStream::DeserializingStream(std::istream& in_s) :
+        in(in_s), debug_(false), protocol_version_(serialization_protocol_version),
+        aligned_(false), compact_(false), read_(0), in_buf_(nullptr) {
 
       // Sanity check
       casadi_int check;
@@ -52,17 +180,57 @@ namespace casadi {
         "Expected " + str(serialization_check) + ", but got " + str(check) + ".");
 
       // API version check
-      casadi_int v;
-      unpack(v);
-      casadi_assert(v==serialization_protocol_version,
+      unpack(protocol_version_);
+      casadi_assert(protocol_version_>=serialization_protocol_version_min &&
+                    protocol_version_<=serialization_protocol_version,
         "Serialization protocol is not compatible. "
-        "Got version " + str(v) + ", while " +
+        "Got version " + str(protocol_version_) + ", while " +
+        str(serialization_protocol_version_min) + " to " +
         str(serialization_protocol_version) + " was expected.");
 
       bool debug;
       unpack(debug);
       debug_ = debug;
 
+      if (protocol_version_>=5) {
+        bool aligned;
+        unpack(aligned);
+        aligned_ = aligned;
+      }
+
+      if (protocol_version_>=6) {
+        bool compact;
+        unpack(compact);
+        std::string compression;
+        unpack(compression);
+        if (compression=="zlib") {
+#ifdef CASADI_WITH_ZLIB
+          // Everything after the header is compressed
+          in_buf_ = in.rdbuf();
+          zbuf_.reset(new InflateBuffer(in_buf_));
+          in.rdbuf(zbuf_.get());
+#else // CASADI_WITH_ZLIB
+          casadi_error("Stream is compressed with zlib, but CasADi was built without zlib "
+                       "support. Rebuild with WITH_ZLIB=ON.");
+#endif // CASADI_WITH_ZLIB
+        } else {
+          casadi_assert(compression.empty(),
+            "Unknown compression '" + compression + "'.");
+        }
+        compact_ = compact;
+      }
+    }
+
+    DeserializingStream::~DeserializingStream() {
+      if (zbuf_) {
+        in.rdbuf(in_buf_);
+        zbuf_.reset();
+      }
+    }
+
+    DeserializingStream::DeserializingStream(const std::shared_ptr<MappedFile>& file) :
+        DeserializingStream(file->stream()) {
+      mapped_ = file;
     }
 
     SerializingStream::SerializingStream(std::ostream& out_s) :
@@ -70,18 +238,31 @@ namespace casadi {
     }
 
     SerializingStream::SerializingStream(std::ostream& out_s, const Dict& opts) :
-        out(out_s), debug_(false) {
+        out(out_s), debug_(false), aligned_(false), compact_(false), written_(0),
+        out_buf_(nullptr) {
       // Sanity check
       pack(serialization_check);
       // API version check
       pack(casadi_int(serialization_protocol_version));
 
       bool debug = false;
+      bool aligned = false;
+      bool compact = false;
+      std::string compression;
 
       // Read options
       for (auto&& op : opts) {
         if (op.first=="debug") {
           debug = op.second;
+        } else if (op.first=="aligned") {
+          aligned = op.second;
+        } else if (op.first=="compact") {
+          compact = op.second;
+        } else if (op.first=="compression") {
+          compression = op.second.to_string();
+          if (compression=="none") compression.clear();
+          casadi_assert(compression.empty() || compression=="zlib",
+            "Unknown compression '" + compression + "'. Supported: 'none', 'zlib'.");
         } else {
           casadi_error("Unknown option: '" + op.first + "'.");
         }
@@ -89,6 +270,40 @@ namespace casadi {
 
       pack(debug);
       debug_ = debug;
+      pack(aligned);
+      aligned_ = aligned;
+      pack(compact);
+      pack(compression);
+      if (compression=="zlib") {
+#ifdef CASADI_WITH_ZLIB
+        // Everything after the header is compressed
+        out_buf_ = out.rdbuf();
+        zbuf_.reset(new DeflateBuffer(out_buf_));
+        out.rdbuf(zbuf_.get());
+#else // CASADI_WITH_ZLIB
+        casadi_error("Compression 'zlib' requires CasADi to be built with WITH_ZLIB=ON.");
+#endif // CASADI_WITH_ZLIB
+      }
+      compact_ = compact;
+    }
+
+    SerializingStream::~SerializingStream() {
+      if (zbuf_) {
+        out.rdbuf(out_buf_);
+        // Ends the compressed stream
+        zbuf_.reset();
+      }
+    }
+
+    void SerializingStream::align() {
+      if (!aligned_) return;
+      while (written_ % 8) pack(static_cast<char>(0));
+    }
+
+    void DeserializingStream::align() {
+      if (!aligned_) return;
+      char t;
+      while (read_ % 8) unpack(t);
     }
 
     void SerializingStream::decorate(char e) {
@@ -103,52 +318,127 @@ namespace casadi {
       }
     }
 
+    // Characters are encoded as two nibbles, offset by 'a'
+    static const unsigned char nibble_ref = 'a';
+
+    void SerializingStream::pack_block(const char* c, size_t n) {
+      if (aligned_) {
+        out.write(c, n);
+        written_ += n;
+        return;
+      }
+      written_ += 2*n;
+      // Same encoding as pack(char), but written in chunks of 4 KiB
+      char buf[8192];
+      while (n>0) {
+        size_t m = std::min(n, sizeof(buf)/2);
+        for (size_t j=0; j<m; ++j) {
+          unsigned char b = static_cast<unsigned char>(c[j]);
+          buf[2*j] = static_cast<char>(nibble_ref + (b % 16));
+          buf[2*j+1] = static_cast<char>(nibble_ref + (b >> 4));
+        }
+        out.write(buf, 2*m);
+        c += m;
+        n -= m;
+      }
+    }
+
+    void DeserializingStream::unpack_block(char* c, size_t n) {
+      if (aligned_) {
+        in.read(c, n);
+        casadi_assert(static_cast<size_t>(in.gcount())==n,
+          "DeserializingStream error: Unexpected end of stream.");
+        read_ += n;
+        return;
+      }
+      read_ += 2*n;
+      char buf[8192];
+      while (n>0) {
+        size_t m = std::min(n, sizeof(buf)/2);
+        in.read(buf, 2*m);
+        casadi_assert(static_cast<size_t>(in.gcount())==2*m,
+          "DeserializingStream error: Unexpected end of stream.");
+        for (size_t j=0; j<m; ++j) {
+          unsigned char lo = static_cast<unsigned char>(buf[2*j]) - nibble_ref;
+          unsigned char hi = static_cast<unsigned char>(buf[2*j+1]) - nibble_ref;
+          c[j] = static_cast<char>(lo + (hi << 4));
+        }
+        c += m;
+        n -= m;
+      }
+    }
+
+    // Compact integers: zigzag coding of the difference, as a base-128 varint
+    static void varint_append(std::string& buf, int64_t v, int64_t prev) {
+      uint64_t d = static_cast<uint64_t>(v) - static_cast<uint64_t>(prev);
+      uint64_t z = (d << 1) ^ (static_cast<int64_t>(d)<0 ? ~uint64_t(0) : 0);
+      while (z>=0x80) {
+        buf.push_back(static_cast<char>((z & 0x7f) | 0x80));
+        z >>= 7;
+      }
+      buf.push_back(static_cast<char>(z));
+    }
+
+    static int64_t varint_decode(uint64_t z, int64_t prev) {
+      uint64_t d = (z >> 1) ^ (~(z & 1) + 1);
+      return static_cast<int64_t>(static_cast<uint64_t>(prev) + d);
+    }
+
     void DeserializingStream::unpack(casadi_int& e) {
       assert_decoration('J');
+      if (compact_) {
+        uint64_t z = 0;
+        for (int shift=0; ; shift+=7) {
+          char c;
+          unpack(c);
+          casadi_assert(shift<64, "DeserializingStream error: Corrupt integer.");
+          z |= static_cast<uint64_t>(c & 0x7f) << shift;
+          if (!(c & 0x80)) break;
+        }
+        e = varint_decode(z, 0);
+        return;
+      }
       int64_t n;
-      char* c = reinterpret_cast<char*>(&n);
-
-      for (int j=0;j<8;++j) unpack(c[j]);
+      unpack_block(reinterpret_cast<char*>(&n), 8);
       e = n;
     }
 
     void SerializingStream::pack(casadi_int e) {
       decorate('J');
+      if (compact_) {
+        std::string buf;
+        varint_append(buf, e, 0);
+        pack_block(buf.data(), buf.size());
+        return;
+      }
       int64_t n = e;
-      const char* c = reinterpret_cast<const char*>(&n);
-      for (int j=0;j<8;++j) pack(c[j]);
+      pack_block(reinterpret_cast<const char*>(&n), 8);
     }
 
     void SerializingStream::pack(size_t e) {
       decorate('K');
       uint64_t n = e;
-      const char* c = reinterpret_cast<const char*>(&n);
-      for (int j=0;j<8;++j) pack(c[j]);
+      pack_block(reinterpret_cast<const char*>(&n), 8);
     }
 
     void DeserializingStream::unpack(size_t& e) {
       assert_decoration('K');
       uint64_t n;
-      char* c = reinterpret_cast<char*>(&n);
-
-      for (int j=0;j<8;++j) unpack(c[j]);
+      unpack_block(reinterpret_cast<char*>(&n), 8);
       e = n;
     }
 
     void DeserializingStream::unpack(int& e) {
       assert_decoration('i');
       int32_t n;
-      char* c = reinterpret_cast<char*>(&n);
-
-      for (int j=0;j<4;++j) unpack(c[j]);
+      unpack_block(reinterpret_cast<char*>(&n), 4);
       e = n;
     }
 
     void SerializingStream::pack(int e) {
       decorate('i');
       int32_t n = e;
-      const char* c = reinterpret_cast<const char*>(&n);
-      for (int j=0;j<4;++j) pack(c[j]);
+      pack_block(reinterpret_cast<const char*>(&n), 4);
     }
 
     void DeserializingStream::unpack(bool& e) {
@@ -164,7 +454,13 @@ namespace casadi {
     }
 
     void DeserializingStream::unpack(char& e) {
-      unsigned char ref = 'a';
+      if (aligned_) {
+        in.get(e);
+        read_++;
+        return;
+      }
+      read_ += 2;
+      unsigned char ref = nibble_ref;
       in.get(e);
       char t;
       in.get(t);
@@ -173,7 +469,13 @@ namespace casadi {
     }
 
     void SerializingStream::pack(char e) {
-      unsigned char ref = 'a';
+      if (aligned_) {
+        out.put(e);
+        written_++;
+        return;
+      }
+      written_ += 2;
+      unsigned char ref = nibble_ref;
       // Note: outputstreams work neatly with std::hex,
       // but inputstreams don't
       out.put(ref + (reinterpret_cast<unsigned char&>(e) % 16));
@@ -184,8 +486,7 @@ namespace casadi {
       decorate('s');
       int s = e.size();
       pack(s);
-      const char* c = e.c_str();
-      for (int j=0;j<s;++j) pack(c[j]);
+      pack_block(e.data(), s);
     }
 
     void DeserializingStream::unpack(std::string& e) {
@@ -193,23 +494,144 @@ namespace casadi {
       int s;
       unpack(s);
       e.resize(s);
-      for (int j=0;j<s;++j) unpack(e[j]);
+      if (s>0) unpack_block(&e[0], s);
     }
 
     void DeserializingStream::unpack(double& e) {
       assert_decoration('d');
-      char* c = reinterpret_cast<char*>(&e);
-      for (int j=0;j<8;++j) unpack(c[j]);
+      unpack_block(reinterpret_cast<char*>(&e), 8);
     }
 
     void SerializingStream::pack(double e) {
       decorate('d');
-      const char* c = reinterpret_cast<const char*>(&e);
-      for (int j=0;j<8;++j) pack(c[j]);
+      pack_block(reinterpret_cast<const char*>(&e), 8);
+    }
+
+    void SerializingStream::pack(const std::vector<double>& e) {
+      decorate('V');
+      pack(casadi_int(e.size()));
+      // Element type is checked once for the whole block
+      decorate('d');
+      align();
+      pack_block(reinterpret_cast<const char*>(e.data()), 8*e.size());
+    }
+
+    void DeserializingStream::unpack(std::vector<double>& e) {
+      if (protocol_version_<4) return unpack_elementwise(e);
+      assert_decoration('V');
+      casadi_int s;
+      unpack(s);
+      assert_decoration('d');
+      align();
+      e.resize(s);
+      unpack_block(reinterpret_cast<char*>(e.data()), 8*s);
+    }
+
+    const double* DeserializingStream::unpack_mapped(const std::string& descr,
+        std::vector<double>& e, casadi_int& n) {
+      // Copy unless the data lies in the mapped file, unencoded
+      if (!mapped_ || !aligned_ || zbuf_) {
+        unpack(descr, e);
+        n = e.size();
+        return e.data();
+      }
+      if (debug_) {
+        std::string d;
+        unpack(d);
+        casadi_assert(d==descr, "Mismatch: '" + descr + "' expected, got '" + d + "'.");
+      }
+      assert_decoration('V');
+      unpack(n);
+      assert_decoration('d');
+      align();
+      std::streamoff pos = in.tellg();
+      casadi_assert(pos>=0 && static_cast<size_t>(pos + 8*n)<=mapped_->size(),
+        "DeserializingStream error: Unexpected end of stream.");
+      const char* p = mapped_->data() + pos;
+      if (reinterpret_cast<uintptr_t>(p) % sizeof(double)) {
+        // Not usable in place
+        e.resize(n);
+        unpack_block(reinterpret_cast<char*>(e.data()), 8*n);
+        return e.data();
+      }
+      in.seekg(8*n, std::ios_base::cur);
+      read_ += 8*n;
+      return reinterpret_cast<const double*>(p);
+    }
+
+    void SerializingStream::pack(const std::vector<casadi_int>& e) {
+      decorate('V');
+      pack(casadi_int(e.size()));
+      decorate('J');
+      if (compact_) {
+        // Index vectors are mostly increasing: code the differences
+        std::string buf;
+        buf.reserve(e.size());
+        int64_t prev = 0;
+        for (casadi_int i : e) {
+          varint_append(buf, i, prev);
+          prev = i;
+        }
+        pack(casadi_int(buf.size()));
+        pack_block(buf.data(), buf.size());
+      } else if (sizeof(casadi_int)==8) {
+        pack_block(reinterpret_cast<const char*>(e.data()), 8*e.size());
+      } else {
+        std::vector<int64_t> n(e.begin(), e.end());
+        pack_block(reinterpret_cast<const char*>(n.data()), 8*n.size());
+      }
+    }
+
+    void DeserializingStream::unpack(std::vector<casadi_int>& e) {
+      if (protocol_version_<4) return unpack_elementwise(e);
+      assert_decoration('V');
+      casadi_int s;
+      unpack(s);
+      assert_decoration('J');
+      if (compact_) {
+        casadi_int nbytes;
+        unpack(nbytes);
+        std::string buf(nbytes, 0);
+        if (nbytes>0) unpack_block(&buf[0], nbytes);
+        e.resize(s);
+        size_t pos = 0;
+        int64_t prev = 0;
+        for (casadi_int& i : e) {
+          uint64_t z = 0;
+          for (int shift=0; ; shift+=7) {
+            casadi_assert(pos<buf.size() && shift<64,
+              "DeserializingStream error: Corrupt integer vector.");
+            unsigned char c = static_cast<unsigned char>(buf[pos++]);
+            z |= static_cast<uint64_t>(c & 0x7f) << shift;
+            if (!(c & 0x80)) break;
+          }
+          prev = varint_decode(z, prev);
+          i = prev;
+        }
+        casadi_assert(pos==buf.size(), "DeserializingStream error: Corrupt integer vector.");
+      } else if (sizeof(casadi_int)==8) {
+        e.resize(s);
+        unpack_block(reinterpret_cast<char*>(e.data()), 8*s);
+      } else {
+        std::vector<int64_t> n(s);
+        unpack_block(reinterpret_cast<char*>(n.data()), 8*s);
+        e.assign(n.begin(), n.end());
+      }
     }
 
     void SerializingStream::pack(const Sparsity& e) {
       decorate('S');
+      if (compact_ && shared_map_.find(e.get())==shared_map_.end()) {
+        // Patterns equal to an earlier one become references to it
+        std::vector<casadi_int> key = e.is_null() ? std::vector<casadi_int>() : e.compress();
+        auto it = sparsity_map_.find(key);
+        if (it==sparsity_map_.end()) {
+          shared_pack(e);
+          sparsity_map_[key] = shared_map_[e.get()];
+          return;
+        }
+        shared_map_[e.get()] = it->second;
+      }
       shared_pack(e);
     }
 
@@ -310,6 +732,16 @@ namespace casadi {
       " but can only read in version " + str(v) + ".");
   }
 
+  int DeserializingStream::version(const std::string& name, int min, int max) {
+    int load_version;
+    unpack(name+"::serialization::version", load_version);
+    casadi_assert(load_version>=min && load_version<=max,
+      "DeSerialization of " + name + " failed. "
+      "Object written in version " + str(load_version) +
+      " but can only read version " + str(min) + " to " + str(max) + ".");
+    return load_version;
+  }
+
   void SerializingStream::version(const std::string& name, int v) {
     pack(name+"::serialization::version", v);
   }
@@ -0,0 +1,113 @@
+/*
+ *    This file is part of CasADi.
+ *
+ *    CasADi -- A symbolic framework for dynamic optimization.
+ *    Copyright (C) 2010-2014 Joel Andersson, Joris Gillis, Moritz Diehl,
+ *                            K.U. Leuven. All rights reserved.
+ *    Copyright (C) 2011-2014 Greg Horn
+ *
+ *    CasADi is free software; you can redistribute it and/or
+ *    modify it under the terms of the GNU Lesser General Public
+ *    License as published by the Free Software Foundation; either
+ *    version 3 of the License, or (at your option) any later version.
+ *
+ *    CasADi is distributed in the hope that it will be useful,
+ *    but WITHOUT ANY WARRANTY; without even the implied warranty of
+ *    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ *    Lesser General Public License for more details.
+ *
+ *    You should have received a copy of the GNU Lesser General Public
+ *    License along with CasADi; if not, write to the Free Software
+ *    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ */
+
+
+
+#include "thread_pool.hpp"
+
+#ifdef CASADI_WITH_THREAD
+#ifdef CASADI_WITH_THREAD_MINGW
+#include <mingw.thread.h>
+#else // CASADI_WITH_THREAD_MINGW
+#include <thread>
+#endif // CASADI_WITH_THREAD_MINGW
+
+namespace casadi {
+
+  ThreadPool& ThreadPool::instance() {
+    // Never destroyed: the worker threads may already have been terminated
+    // when static objects are destroyed at exit
+    static ThreadPool* pool = new ThreadPool();
+    return *pool;
+  }
+
+  void ThreadPool::run(casadi_int n, void (*task)(void* data, casadi_int k), void* data) {
+    Job job;
+    job.task = task;
+    job.data = data;
+    job.n = n;
+    job.next = 0;
+    job.done = 0;
+    if (n>1) {
+      std::lock_guard<std::mutex> lock(mtx_);
+      // Start more threads if needed, the calling thread is one of the workers
+      for (; n_threads_<n-1; ++n_threads_) {
+        std::thread(&ThreadPool::work, this).detach();
+      }
+      jobs_.push_back(&job);
+    }
+    work_cv_.notify_all();
+
+    // Claim slots until none are left
+    std::unique_lock<std::mutex> lock(mtx_);
+    while (job.next<job.n) {
+      casadi_int k = claim(job);
+      lock.unlock();
+      finish(job, k);
+      lock.lock();
+    }
+
+    // Wait for the slots claimed by other threads
+    done_cv_.wait(lock, [&job]() { return job.done==job.n;});
+  }
+
+  casadi_int ThreadPool::claim(Job& job) {
+    casadi_int k = job.next++;
+    if (job.next==job.n) {
+      // Fully claimed, remove from queue
+      for (auto it=jobs_.begin(); it!=jobs_.end(); ++it) {
+        if (*it==&job) {
+          jobs_.erase(it);
+          break;
+        }
+      }
+    }
+    return k;
+  }
+
+  void ThreadPool::finish(Job& job, casadi_int k) {
+    // The job may be destroyed once done is incremented, read n before
+    casadi_int n = job.n;
+    job.task(job.data, k);
+    if (++job.done==n) {
+      std::lock_guard<std::mutex> lock(mtx_);
+      done_cv_.notify_all();
+    }
+  }
+
+  void ThreadPool::work() {
+    std::unique_lock<std::mutex> lock(mtx_);
+    while (true) {
+      work_cv_.wait(lock, [this]() { return !jobs_.empty();});
+      Job& job = *jobs_.front();
+      casadi_int k = claim(job);
+      lock.unlock();
+      finish(job, k);
+      lock.lock();
+    }
+  }
+
+} // namespace casadi
+
+#endif // CASADI_WITH_THREAD
@@ -0,0 +1,98 @@
+/*
+ *    This file is part of CasADi.
+ *
+ *    CasADi -- A symbolic framework for dynamic optimization.
+ *    Copyright (C) 2010-2014 Joel Andersson, Joris Gillis, Moritz Diehl,
+ *                            K.U. Leuven. All rights reserved.
+ *    Copyright (C) 2011-2014 Greg Horn
+ *
+ *    CasADi is free software; you can redistribute it and/or
+ *    modify it under the terms of the GNU Lesser General Public
+ *    License as published by the Free Software Foundation; either
+ *    version 3 of the License, or (at your option) any later version.
+ *
+ *    CasADi is distributed in the hope that it will be useful,
+ *    but WITHOUT ANY WARRANTY; without even the implied warranty of
+ *    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ *    Lesser General Public License for more details.
+ *
+ *    You should have received a copy of the GNU Lesser General Public
+ *    License along with CasADi; if not, write to the Free Software
+ *    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ */
+
+
+
+#ifndef CASADI_THREAD_POOL_HPP
+#define CASADI_THREAD_POOL_HPP
+
+#include "generic_type.hpp"
+
+#ifdef CASADI_WITH_THREAD
+#ifdef CASADI_WITH_THREAD_MINGW
+#include <mingw.mutex.h>
+#include <mingw.condition_variable.h>
+#else // CASADI_WITH_THREAD_MINGW
+#include <mutex>
+#include <condition_variable>
+#endif // CASADI_WITH_THREAD_MINGW
+#include <atomic>
+#include <deque>
+
+/// \cond INTERNAL
+namespace casadi {
+
+  /** \brief Process-wide pool of worker threads
+
+      A job consists of a number of slots, each of which is evaluated once by
+      whichever thread claims it. The thread submitting the job claims slots
+      as well, so a job completes even when all workers are busy, e.g. for a
+      ThreadMap called from within another ThreadMap.
+  */
+  class CASADI_EXPORT ThreadPool {
+  public:
+    // Get the pool
+    static ThreadPool& instance();
+
+    // Evaluate all slots of a job and wait for their completion
+    void run(casadi_int n, void (*task)(void* data, casadi_int k), void* data);
+
+  private:
+    // Job: call task(data, k) for every slot k in [0, n)
+    struct Job {
+      void (*task)(void* data, casadi_int k);
+      void* data;
+      casadi_int n;
+      // Next unclaimed slot, protected by the mutex of the pool
+      casadi_int next;
+      // Number of completed slots
+      std::atomic<casadi_int> done;
+    };
+
+    // Claim the next slot of a job, the mutex must be locked
+    casadi_int claim(Job& job);
+
+    // Evaluate a claimed slot, the job must not be accessed afterwards
+    void finish(Job& job, casadi_int k);
+
+    // Main loop of a worker thread
+    void work();
+
+    // Number of worker threads started
+    casadi_int n_threads_ = 0;
+
+    // Jobs with unclaimed slots
+    std::deque<Job*> jobs_;
+
+    // Synchronization
+    std::mutex mtx_;
+    std::condition_variable work_cv_, done_cv_;
+  };
+
+} // namespace casadi
+/// \endcond
+
+#endif // CASADI_WITH_THREAD
+
+#endif // CASADI_THREAD_POOL_HPP
@@ -30,6 +30,16 @@
 #include "sparse_storage_impl.hpp"
 #include "serializing_stream.hpp"
 #include <climits>
+#include <deque>
+#include <map>
+#include <memory>
+#ifdef CASADI_WITH_THREAD
+#ifdef CASADI_WITH_THREAD_MINGW
+#include <mingw.mutex.h>
+#else // CASADI_WITH_THREAD_MINGW
+#include <mutex>
+#endif // CASADI_WITH_THREAD_MINGW
+#endif //CASADI_WITH_THREAD
 
 #define CASADI_THROW_ERROR(FNAME, WHAT) \
 throw CasadiException("Error in Sparsity::" FNAME " at " + CASADI_WHERE + ":\n"\
@@ -403,13 +413,135 @@ namespace casadi {
     return (*this)->combine(y, true, true);
   }
 
-  Sparsity Sparsity::mtimes(const Sparsity& x, const Sparsity& y) {
+  /// \cond INTERNAL
+  // Memoized product of two sparsity patterns
+  struct SparsityProduct {
+    // Factors, owned so that the key pointers cannot be reused
+    Sparsity x, y;
+    // Product
+    Sparsity z;
+    // Nonzero mapping, null if not computed or too large
+    std::shared_ptr<const std::vector<casadi_int> > mapping;
+    bool mapped = false;
+  };
+
+  // Memo table of products, the oldest entries are evicted first
+  struct SparsityProductMemo {
+    typedef std::pair<const SparsityInternal*, const SparsityInternal*> Key;
+    std::map<Key, SparsityProduct> table;
+    std::deque<Key> order;
+#ifdef CASADI_WITH_THREAD
+    // Protects the table
+    std::mutex mtx;
+#endif // CASADI_WITH_THREAD
+    // Total number of entries in the nonzero mappings
+    casadi_int mapping_size = 0;
+    // Statistics
+    casadi_int hits = 0, misses = 0;
+  };
+  /// \endcond
+
+  // Maximum number of memoized products
+  static const casadi_int sparsity_product_memo_size = 256;
+
+  // Maximum number of multiplications in a product with a nonzero mapping
+  static const casadi_int sparsity_product_max_mapping = 65536;
+
+  // Maximum total number of entries in the memoized nonzero mappings
+  static const casadi_int sparsity_product_max_total_mapping = 1048576;
+
+  static SparsityProductMemo& sparsity_product_memo() {
+    // Never destroyed, like the cache of patterns
+    static SparsityProductMemo* ret = new SparsityProductMemo();
+    return *ret;
+  }
+
+  // Product of two patterns, with the nonzero mapping if requested
+  static Sparsity memo_mtimes(const Sparsity& x, const Sparsity& y,
+                              std::shared_ptr<const std::vector<casadi_int> >* mapping) {
     // Check matching dimensions
     casadi_assert(x.size2()==y.size1(),
       "Matrix product with incompatible dimensions. Lhs is "
       + x.dim() + " and rhs is " + y.dim() + ".");
 
-    return x->_mtimes(y);
+    SparsityProductMemo& memo = sparsity_product_memo();
+    SparsityProductMemo::Key key(x.get(), y.get());
+    Sparsity z;
+    {
+#ifdef CASADI_WITH_THREAD
+      std::lock_guard<std::mutex> lock(memo.mtx);
+#endif // CASADI_WITH_THREAD
+      std::map<SparsityProductMemo::Key, SparsityProduct>::const_iterator it
+        = memo.table.find(key);
+      if (it==memo.table.end()) {
+        memo.misses++;
+      } else {
+        memo.hits++;
+        if (!mapping) return it->second.z;
+        if (it->second.mapped) {
+          *mapping = it->second.mapping;
+          return it->second.z;
+        }
+        z = it->second.z;
+      }
+    }
+
+    // Calculate outside of the lock
+    if (z.is_null()) z = x->_mtimes(y);
+    std::shared_ptr<const std::vector<casadi_int> > m;
+    if (mapping) {
+      const casadi_int* x_colind = x.colind();
+      const casadi_int* y_row = y.row();
+      casadi_int n_mult = 0;
+      for (casadi_int k=0; k<y.nnz(); ++k) n_mult += x_colind[y_row[k]+1] - x_colind[y_row[k]];
+      if (n_mult<=sparsity_product_max_mapping) {
+        m = std::make_shared<const std::vector<casadi_int> >(x->mtimes_mapping(y, z));
+      }
+      *mapping = m;
+    }
+
+    // Store, evicted entries are destroyed after releasing the lock
+    std::vector<SparsityProduct> evicted;
+    {
+#ifdef CASADI_WITH_THREAD
+      std::lock_guard<std::mutex> lock(memo.mtx);
+#endif // CASADI_WITH_THREAD
+      std::map<SparsityProductMemo::Key, SparsityProduct>::iterator it = memo.table.find(key);
+      if (it==memo.table.end()) {
+        SparsityProduct& e = memo.table[key];
+        e.x = x;
+        e.y = y;
+        e.z = z;
+        e.mapping = m;
+        e.mapped = mapping!=nullptr;
+        memo.order.push_back(key);
+      } else if (mapping && !it->second.mapped) {
+        it->second.mapping = m;
+        it->second.mapped = true;
+      } else {
+        return z;
+      }
+      if (m) memo.mapping_size += m->size();
+      // Evict the oldest entries, bounding both the count and the mapping memory
+      while (memo.order.size()>sparsity_product_memo_size
+             || (memo.mapping_size>sparsity_product_max_total_mapping && memo.order.size()>1)) {
+        it = memo.table.find(memo.order.front());
+        if (it->second.mapping) memo.mapping_size -= it->second.mapping->size();
+        evicted.push_back(std::move(it->second));
+        memo.table.erase(it);
+        memo.order.pop_front();
+      }
+    }
+    return z;
+  }
+
+  Sparsity Sparsity::mtimes(const Sparsity& x, const Sparsity& y) {
+    return memo_mtimes(x, y, nullptr);
+  }
+
+  Sparsity Sparsity::mtimes(const Sparsity& x, const Sparsity& y,
+                            std::shared_ptr<const std::vector<casadi_int> >& mapping) {
+    return memo_mtimes(x, y, &mapping);
   }
 
   bool Sparsity::is_stacked(const Sparsity& y, casadi_int n) const {
@@ -497,11 +629,79 @@ namespace casadi {
     }
   }
 
-  Sparsity::CachingMap& Sparsity::getCache() {
-    static CachingMap ret;
+  /// \cond INTERNAL
+  // One shard of the cache of sparsity patterns
+  struct SparsityCacheShard {
+    // Cached patterns by hash key, not owning
+    typedef std::unordered_multimap<std::size_t, SparsityInternal*> CachingMap;
+    CachingMap cache;
+#ifdef CASADI_WITH_THREAD
+    // Protects the shard
+    std::mutex mtx;
+#endif // CASADI_WITH_THREAD
+    // Statistics
+    casadi_int hits = 0, misses = 0, collisions = 0;
+  };
+  /// \endcond
+
+  // Number of shards, lookups of patterns in different shards do not contend
+  static const casadi_int sparsity_cache_n_shards = 64;
+
+  static SparsityCacheShard* sparsity_cache_shards() {
+    // Never destroyed, since cached patterns can outlive other static objects
+    static SparsityCacheShard* ret = new SparsityCacheShard[sparsity_cache_n_shards];
     return ret;
   }
 
+  static SparsityCacheShard& sparsity_cache_shard(std::size_t h) {
+    return sparsity_cache_shards()[(h ^ (h >> 17)) % sparsity_cache_n_shards];
+  }
+
+  void Sparsity::uncache(const SparsityInternal* node) {
+    SparsityCacheShard& shard = sparsity_cache_shard(node->cache_key_);
+#ifdef CASADI_WITH_THREAD
+    std::lock_guard<std::mutex> lock(shard.mtx);
+#endif // CASADI_WITH_THREAD
+    pair<SparsityCacheShard::CachingMap::iterator, SparsityCacheShard::CachingMap::iterator> eq
+      = shard.cache.equal_range(node->cache_key_);
+    for (SparsityCacheShard::CachingMap::iterator i=eq.first; i!=eq.second; ++i) {
+      if (i->second==node) {
+        shard.cache.erase(i);
+        return;
+      }
+    }
+  }
+
+  Dict Sparsity::cache_stats() {
+    casadi_int size = 0, hits = 0, misses = 0, collisions = 0;
+    SparsityCacheShard* shards = sparsity_cache_shards();
+    for (casadi_int k=0; k<sparsity_cache_n_shards; ++k) {
+#ifdef CASADI_WITH_THREAD
+      std::lock_guard<std::mutex> lock(shards[k].mtx);
+#endif // CASADI_WITH_THREAD
+      size += shards[k].cache.size();
+      hits += shards[k].hits;
+      misses += shards[k].misses;
+      collisions += shards[k].collisions;
+    }
+    Dict stats;
+    stats["size"] = size;
+    stats["shards"] = sparsity_cache_n_shards;
+    stats["hits"] = hits;
+    stats["misses"] = misses;
+    stats["collisions"] = collisions;
+    stats["hit_rate"] = hits+misses==0 ? 0. : static_cast<double>(hits)/(hits+misses);
+    SparsityProductMemo& memo = sparsity_product_memo();
+#ifdef CASADI_WITH_THREAD
+    std::lock_guard<std::mutex> lock(memo.mtx);
+#endif // CASADI_WITH_THREAD
+    stats["products"] = static_cast<casadi_int>(memo.table.size());
+    stats["product_hits"] = memo.hits;
+    stats["product_misses"] = memo.misses;
+    stats["product_mapping_size"] = memo.mapping_size;
+    return stats;
+  }
+
   const Sparsity& Sparsity::getScalar() {
     static ScalarSparsity ret;
     return ret;
@@ -594,6 +794,10 @@ namespace casadi {
     return parent;
   }
 
+  std::vector<casadi_int> Sparsity::supernodes() const {
+    return (*this)->supernodes().offset;
+  }
+
   Sparsity Sparsity::ldl(std::vector<casadi_int>& p, bool amd) const {
     casadi_assert(is_symmetric(),
                  "LDL factorization requires a symmetric matrix");
@@ -613,11 +817,10 @@ namespace casadi {
     p = range(n);
     // Work vector
     std::vector<casadi_int> w(3*n);
-    // Elimination tree
-    std::vector<casadi_int> parent(n);
-    // Calculate colind in L (strictly lower entries only)
-    std::vector<casadi_int> L_colind(1+n);
-    SparsityInternal::ldl_colind(*this, get_ptr(parent), get_ptr(L_colind), get_ptr(w));
+    // Elimination tree and colind in L (strictly lower entries only), cached
+    const SparsityInternal::Supernodes& sn = (*this)->supernodes();
+    std::vector<casadi_int> parent = sn.parent;
+    std::vector<casadi_int> L_colind = sn.l_colind;
     // Get rows in L (strictly lower entries only)
     std::vector<casadi_int> L_row(L_colind.back());
     SparsityInternal::ldl_row(*this, get_ptr(parent), get_ptr(L_colind), get_ptr(L_row),
@@ -742,6 +945,26 @@ namespace casadi {
     return (*this)->largest_first();
   }
 
+  Sparsity Sparsity::acyclic_coloring(casadi_int ordering, casadi_int cutoff) const {
+    return (*this)->acyclic_coloring(ordering, cutoff);
+  }
+
+  std::vector<casadi_int> Sparsity::coloring_ordering(casadi_int ordering) const {
+    return (*this)->coloring_ordering(ordering);
+  }
+
+  std::vector<casadi_int> Sparsity::smallest_last() const {
+    return (*this)->smallest_last();
+  }
+
+  std::vector<casadi_int> Sparsity::incidence_degree() const {
+    return (*this)->incidence_degree();
+  }
+
+  std::vector<casadi_int> Sparsity::dynamic_largest_first() const {
+    return (*this)->dynamic_largest_first();
+  }
+
   Sparsity Sparsity::pmult(const std::vector<casadi_int>& p, bool permute_rows,
                             bool permute_columns, bool invert_permutation) const {
     return (*this)->pmult(p, permute_rows, permute_columns, invert_permutation);
@@ -849,92 +1072,45 @@ namespace casadi {
     // Hash the pattern
     std::size_t h = hash_sparsity(nrow, ncol, colind, row);
 
-    // Get a reference to the cache
-    CachingMap& cache = getCache();
-
-    // Record the current number of buckets (for garbage collection below)
-    casadi_int bucket_count_before = cache.bucket_count();
-
-    // WORKAROUND, functions do not appear to work when bucket_count==0
-    if (bucket_count_before>0) {
+    // Owning reference, assigned only after the shard has been unlocked,
+    // since releasing a pattern may need to lock the shard again
+    Sparsity ret;
+    {
+      SparsityCacheShard& shard = sparsity_cache_shard(h);
+#ifdef CASADI_WITH_THREAD
+      std::lock_guard<std::mutex> lock(shard.mtx);
+#endif // CASADI_WITH_THREAD
 
       // Find the range of patterns equal to the key (normally only zero or one)
-      pair<CachingMap::iterator, CachingMap::iterator> eq = cache.equal_range(h);
+      pair<SparsityCacheShard::CachingMap::iterator, SparsityCacheShard::CachingMap::iterator>
+        eq = shard.cache.equal_range(h);
 
       // Loop over maching patterns
-      for (CachingMap::iterator i=eq.first; i!=eq.second; ++i) {
-
-        // Get a weak reference to the cached sparsity pattern
-        WeakRef& wref = i->second;
-
-        // Check if the pattern still exists
-        if (wref.alive()) {
-
-          // Get an owning reference to the cached pattern
-          Sparsity ref = shared_cast<Sparsity>(wref.shared());
-
-          // Check if the pattern matches
-          if (ref.is_equal(nrow, ncol, colind, row)) {
-
-            // Found match!
-            own(ref.get());
-            return;
-
-          } else { // There is a hash rowision (unlikely, but possible)
-            // Leave the pattern alone, continue to the next matching pattern
-            continue;
-          }
+      for (SparsityCacheShard::CachingMap::iterator i=eq.first; i!=eq.second; ++i) {
+        if (i->second->is_equal(nrow, ncol, colind, row)) {
+          // Found match, unless the pattern is being destroyed by another thread
+          if (ret.own_if_alive(i->second)) break;
         } else {
-
-          // Check if one of the other cache entries indeed has a matching sparsity
-          CachingMap::iterator j=i;
-          j++; // Start at the next matching key
-          for (; j!=eq.second; ++j) {
-            if (j->second.alive()) {
-
-              // Recover cached sparsity
-              Sparsity ref = shared_cast<Sparsity>(j->second.shared());
-
-              // Match found if sparsity matches
-              if (ref.is_equal(nrow, ncol, colind, row)) {
-                own(ref.get());
-                return;
-              }
-            }
-          }
-
-          // The cached entry has been deleted, create a new one
-          own(new SparsityInternal(nrow, ncol, colind, row));
-
-          // Cache this pattern
-          wref = *this;
-
-          // Return
-          return;
+          // There is a hash collision (unlikely, but possible)
+          shard.collisions++;
         }
       }
-    }
-
-    // No matching sparsity pattern could be found, create a new one
-    own(new SparsityInternal(nrow, ncol, colind, row));
 
-    // Cache this pattern
-    cache.insert(std::pair<std::size_t, WeakRef>(h, *this));
+      if (ret.is_null()) {
+        // No matching sparsity pattern could be found, create a new one
+        SparsityInternal* node = new SparsityInternal(nrow, ncol, colind, row);
+        node->cached_ = true;
+        node->cache_key_ = h;
+        ret.own(node);
 
-    // Garbage collection (currently only supported for unordered_multimap)
-    casadi_int bucket_count_after = cache.bucket_count();
-
-    // We we increased the number of buckets, take time to garbage-collect deleted references
-    if (bucket_count_before!=bucket_count_after) {
-      CachingMap::const_iterator i=cache.begin();
-      while (i!=cache.end()) {
-        if (!i->second.alive()) {
-          i = cache.erase(i);
-        } else {
-          i++;
-        }
+        // Cache this pattern, removed again by its destructor
+        shard.cache.insert(std::make_pair(h, node));
+        shard.misses++;
+      } else {
+        shard.hits++;
       }
     }
+    *this = ret;
   }
 
   Sparsity Sparsity::tril(const Sparsity& x, bool includeDiagonal) {
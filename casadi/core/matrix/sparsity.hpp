@@ -39,6 +39,7 @@
 #include <vector>
 #include <list>
 #include <limits>
+#include <memory>
 #include <unordered_map>
 
 namespace casadi {
@@ -629,10 +630,35 @@ namespace casadi {
     */
     void removeDuplicates(std::vector<casadi_int>& SWIG_INOUT(mapping));
 
-    typedef std::unordered_multimap<std::size_t, WeakRef> CachingMap;
+    /** \brief Statistics of the cache of sparsity patterns
+     *
+     * The returned dictionary contains the number of cached patterns ("size"),
+     * the number of shards of the cache ("shards"), the number of lookups that
+     * found ("hits") or did not find ("misses") an existing pattern, the number
+     * of hash collisions with a different pattern ("collisions") and the
+     * resulting "hit_rate". The memo table of matrix products is described by
+     * "products", "product_hits" and "product_misses", the total number of
+     * entries in the memoized nonzero mappings by "product_mapping_size".
+     */
+    static Dict cache_stats();
 
-    /// Cached sparsity patterns
-    static CachingMap& getCache();
+    /// \cond INTERNAL
+    /// Remove a pattern from the cache, called when a cached pattern is destroyed
+    static void uncache(const SparsityInternal* node);
+
+#ifndef SWIG
+    /** \brief Sparsity of a matrix product, with a nonzero mapping
+     *
+     * Products are memoized for pairs of patterns, so repeated products are cheap.
+     * \a mapping is shared between identical products and contains, for each nonzero of
+     * the product, offsets into a list of (x, y) nonzero index pairs: nnz+1 offsets
+     * followed by the pairs. The contributions are listed in the order used by
+     * casadi_mtimes. \a mapping is null if the product needs too many multiplications.
+     */
+    static Sparsity mtimes(const Sparsity& x, const Sparsity& y,
+                           std::shared_ptr<const std::vector<casadi_int> >& mapping);
+#endif // SWIG
+    /// \endcond
 
     /// (Dense) scalar
     static const Sparsity& getScalar();
@@ -664,6 +690,14 @@ namespace casadi {
     */
     Sparsity ldl(std::vector<casadi_int>& SWIG_OUTPUT(p), bool amd=true) const;
 
+    /** \brief Fundamental supernodes of the symbolic LDL factorization
+        Groups of consecutive columns of L, without reordering, that form a chain in
+        the elimination tree and share the pattern below the diagonal block.
+        Returns the first column of each supernode, followed by the number of columns.
+        The result is cached with the pattern.
+    */
+    std::vector<casadi_int> supernodes() const;
+
     /** \brief Symbolic QR factorization
         Returns the sparsity pattern of V (compact representation of Q) and R
         as well as vectors needed for the numerical factorization and solution.
@@ -736,7 +770,8 @@ namespace casadi {
       Fill-reducing ordering applied to the sparsity pattern of a linear system
       prior to factorization.
       The system must be symmetric, for an unsymmetric matrix A, first form the square
-      of the pattern, A'*A.
+      of the pattern, A'*A. Columns with identical patterns are ordered together.
+      The ordering is cached with the pattern.
 
       The implementation is a modified version of cs_amd in CSparse
       Copyright(c) Timothy A. Davis, 2006-2009
@@ -774,7 +809,9 @@ namespace casadi {
           A. H. GEBREMEDHIN, F. MANNE, A. POTHEN
           SIAM Rev., 47(4), 629–705 (2006)
 
-        Ordering options: None (0), largest first (1)
+        Ordering options: None (0), largest first (1), smallest last (2),
+        incidence degree (3), dynamic largest first (4). A negative value tries all
+        orderings and keeps the coloring with the fewest colors.
     */
     Sparsity star_coloring(casadi_int ordering = 1,
                             casadi_int cutoff = std::numeric_limits<casadi_int>::max()) const;
@@ -786,14 +823,47 @@ namespace casadi {
           A. H. GEBREMEDHIN, A. TARAFDAR, F. MANNE, A. POTHEN
           SIAM J. SCI. COMPUT. Vol. 29, No. 3, pp. 1042–1072 (2007)
 
-        Ordering options: None (0), largest first (1)
+        Ordering options: see star_coloring
     */
     Sparsity star_coloring2(casadi_int ordering = 1,
                             casadi_int cutoff = std::numeric_limits<casadi_int>::max()) const;
 
+    /** \brief Perform an acyclic coloring of a symmetric matrix:
+        Every cycle in the graph uses at least three colors.
+        Algorithm 3.1 in
+          NEW ACYCLIC AND STAR COLORING ALGORITHMS WITH APPLICATION TO COMPUTING HESSIANS
+          A. H. GEBREMEDHIN, A. TARAFDAR, F. MANNE, A. POTHEN
+          SIAM J. SCI. COMPUT. Vol. 29, No. 3, pp. 1042–1072 (2007)
+
+        Uses at most as many colors as a star coloring, but the Hessian must be
+        recovered by substitution rather than directly.
+
+        Ordering options: see star_coloring
+    */
+    Sparsity acyclic_coloring(casadi_int ordering = 1,
+                              casadi_int cutoff = std::numeric_limits<casadi_int>::max()) const;
+
+    /** \brief Get a vertex ordering for coloring
+        Ordering options: see star_coloring. Returns the columns in the order
+        they are to be colored. */
+    std::vector<casadi_int> coloring_ordering(casadi_int ordering) const;
+
     /** \brief Order the columns by decreasing degree */
     std::vector<casadi_int> largest_first() const;
 
+    /** \brief Smallest-last ordering of the columns
+        Repeatedly removes a column of minimal degree from the graph, the
+        columns are colored in the reverse order of removal */
+    std::vector<casadi_int> smallest_last() const;
+
+    /** \brief Incidence-degree ordering of the columns
+        Repeatedly picks a column with the most already ordered neighbors */
+    std::vector<casadi_int> incidence_degree() const;
+
+    /** \brief Dynamic largest-first ordering of the columns
+        Repeatedly picks a column of maximal degree in the graph of unordered columns */
+    std::vector<casadi_int> dynamic_largest_first() const;
+
     /** \brief Permute rows and/or columns
         Multiply the sparsity with a permutation matrix from the left and/or from the right
         P * A * trans(P), A * trans(P) or A * trans(P) with P defined by an index vector
@@ -130,6 +130,26 @@ namespace casadi {
     }
   }
 
+  casadi_int SparsityInternal::supernodes(const casadi_int* parent, const casadi_int* l_colind,
+      casadi_int n, casadi_int* offset, casadi_int* w) {
+    casadi_int c, ns=0;
+    // Number of children in the elimination tree
+    casadi_int* nchild=w;
+    for (c=0; c<n; ++c) nchild[c] = 0;
+    for (c=0; c<n; ++c) {
+      if (parent[c]!=-1) nchild[parent[c]]++;
+    }
+    // Start a new supernode unless column c continues the one of column c-1
+    for (c=0; c<n; ++c) {
+      if (c==0 || parent[c-1]!=c || nchild[c]!=1
+          || l_colind[c]-l_colind[c-1]!=l_colind[c+1]-l_colind[c]+1) {
+        offset[ns++] = c;
+      }
+    }
+    offset[ns] = n;
+    return ns;
+  }
+
   casadi_int SparsityInternal::
   leaf(casadi_int i, casadi_int j, const casadi_int* first, casadi_int* maxfirst,
        casadi_int* prevleaf, casadi_int* ancestor, casadi_int* jleaf) {
@@ -455,7 +475,8 @@ namespace casadi {
   SparsityInternal::
   SparsityInternal(casadi_int nrow, casadi_int ncol,
       const casadi_int* colind, const casadi_int* row) :
-    sp_(2 + ncol+1 + colind[ncol]), btf_(nullptr) {
+    sp_(2 + ncol+1 + colind[ncol]), btf_(nullptr), supernodes_(nullptr), amd_(nullptr),
+    cached_(false), cache_key_(0) {
     sp_[0] = nrow;
     sp_[1] = ncol;
     std::copy(colind, colind+ncol+1, sp_.begin()+2);
@@ -463,7 +484,11 @@ namespace casadi {
   }
 
   SparsityInternal::~SparsityInternal() {
+    // Must happen first, concurrent cache lookups may still inspect the pattern
+    if (cached_) Sparsity::uncache(this);
     delete btf_;
+    delete supernodes_;
+    delete amd_;
   }
 
   const SparsityInternal::Btf& SparsityInternal::btf() const {
@@ -475,6 +500,30 @@ namespace casadi {
     return *btf_;
   }
 
+  const SparsityInternal::Supernodes& SparsityInternal::supernodes() const {
+#ifdef CASADI_WITH_THREAD
+    std::call_once(supernodes_once_, [this]() { init_supernodes(); });
+#else // CASADI_WITH_THREAD
+    if (!supernodes_) init_supernodes();
+#endif // CASADI_WITH_THREAD
+    return *supernodes_;
+  }
+
+  void SparsityInternal::init_supernodes() const {
+    casadi_assert(is_symmetric(), "Supernodes require a symmetric matrix");
+    casadi_int n = size2();
+    Supernodes* s = new SparsityInternal::Supernodes();
+    s->parent.resize(n);
+    s->l_colind.resize(n+1);
+    s->offset.resize(n+1);
+    vector<casadi_int> w(n);
+    ldl_colind(get_ptr(sp_), get_ptr(s->parent), get_ptr(s->l_colind), get_ptr(w));
+    casadi_int ns = supernodes(get_ptr(s->parent), get_ptr(s->l_colind),
+                               n, get_ptr(s->offset), get_ptr(w));
+    s->offset.resize(ns+1);
+    supernodes_ = s;
+  }
+
 
   casadi_int SparsityInternal::numel() const {
     return size1()*size2();
@@ -658,41 +707,29 @@ namespace casadi {
     return nb;
   }
 
-  std::vector<casadi_int> SparsityInternal::amd() const {
-    /*
-    Modified version of cs_amd in CSparse
-    Copyright(c) Timothy A. Davis, 2006-2009
-    Licensed as a derivative work under the GNU LGPL
-    */
-    casadi_assert(is_symmetric(), "AMD requires a symmetric matrix");
-    // Get sparsity
-    casadi_int n=size2();
-    vector<casadi_int> colind = get_colind();
-    vector<casadi_int> row = get_row();
-    // Drop diagonal entries
-    casadi_int nnz = 0; // number of nonzeros after pruning
-    casadi_int col_begin, col_end=0;
-    for (casadi_int c=0; c<n; ++c) {
-      // Get the range of nonzeros for the column, before pruning
-      col_begin = col_end;
-      col_end = colind[c+1];
-      // Loop over nonzeros
-      for (casadi_int k=col_begin; k<col_end; ++k) {
-        if (row[k]!=c) {
-          row[nnz++] = row[k];
-        }
-      }
-      colind[c+1] = nnz;
-    }
+  /* Approximate minimal degree ordering of a quotient graph with n nodes.
+     Node i stands for nv[i] indistinguishable columns, n_total in total.
+     colind and row hold the adjacency without diagonal entries, with elbow room at the
+     end of row. Returns the nodes in elimination order.
+     Modified version of cs_amd in CSparse
+     Copyright(c) Timothy A. Davis, 2006-2009
+     Licensed as a derivative work under the GNU LGPL
+  */
+  static std::vector<casadi_int> amd_quotient(casadi_int n, casadi_int n_total,
+                                              std::vector<casadi_int>& colind,
+                                              std::vector<casadi_int>& row,
+                                              std::vector<casadi_int>& nv) {
+    // Number of nonzeros, row has elbow room after these
+    casadi_int nnz = colind[n];
     // dense threshold
-    casadi_int dense = static_cast<casadi_int>(10*sqrt(static_cast<double>(n)));
+    casadi_int dense = static_cast<casadi_int>(10*sqrt(static_cast<double>(n_total)));
     dense = std::max(casadi_int(16), dense);
-    dense = std::min(n-2, dense);
+    dense = std::min(n_total-2, dense);
     // Allocate result
     vector<casadi_int> P(n+1);
-    // Work vectors
-    vector<casadi_int> len(n+1), nv(n+1), next(n+1), head(n+1), elen(n+1), degree(n+1),
-                w(n+1), hhead(n+1);
+    // Work vectors, degree lists are indexed by the degree in columns
+    vector<casadi_int> len(n+1), next(n+1), head(n_total+1), elen(n+1),
+                degree(n+1), w(n+1), hhead(n+1);
     // Number of elements
     casadi_int nel = 0;
     // Minimal degree
@@ -705,23 +742,22 @@ namespace casadi {
     casadi_uint h;
     // Flip
     #define FLIP(i) (-(i)-2)
-    // Elbow room
-    //casadi_int t = nnz + nnz/5 + 2*n;
     // Initialize quotient graph
     for (casadi_int k = 0; k<n; ++k) len[k] = colind[k+1] - colind[k];
     len[n] = 0;
     casadi_int nzmax = row.size();
+    for (casadi_int i=0; i<head.size(); ++i) head[i] = -1; // degree list i is empty
     for (casadi_int i=0; i<=n; ++i) {
-      head[i] = -1;                     // degree list i is empty
       P[i] = -1;
       next[i] = -1;
       hhead[i] = -1;                    // hash list i is empty
-      nv[i] = 1;                        // node i is just one node
       w[i] = 1;                         // node i is alive
       elen[i] = 0;                      // Ek of node i is empty
-      degree[i] = len[i];               // degree of node i
+      degree[i] = 0;                    // degree of node i
+      for (casadi_int k=colind[i]; k<colind[i]+len[i]; ++k) degree[i] += nv[row[k]];
     }
-    casadi_int mark = wclear(0, 0, get_ptr(w), n); // clear w
+    nv[n] = 1;
+    casadi_int mark = SparsityInternal::wclear(0, 0, get_ptr(w), n); // clear w
     elen[n] = -2;                           // n is a dead element
     colind[n] = -1;                         // n is a root of assembly tree
     w[n] = 0;                               // n is a dead element
@@ -730,25 +766,25 @@ namespace casadi {
       d = degree[i];
       if (d == 0) {                        // node i is empty
         elen[i] = -2;                      // element i is dead
-        nel++;
+        nel += nv[i];
         colind[i] = -1;                    // i is a root of assembly tree
         w[i] = 0;
       } else if (d > dense) {              // node i is dense
+        nel += nv[i];
+        nv[n] += nv[i];
         nv[i] = 0;                         // absorb i into element n
         elen[i] = -1;                      // node i is dead
-        nel++;
         colind[i] = FLIP(n);
-        nv[n]++;
       } else {
         if (head[d] != -1) P[head[d]] = i;
         next[i] = head[d];                 // put node i in degree list d
         head[d] = i;
       }
     }
-    while (nel < n) {                        // while (selecting pivots) do
+    while (nel < n_total) {                  // while (selecting pivots) do
       // Select node of minimum approximate degree
       casadi_int k;
-      for (k = -1; mindeg < n && (k = head[mindeg]) == -1; mindeg++) {}
+      for (k = -1; mindeg < n_total && (k = head[mindeg]) == -1; mindeg++) {}
       if (next[k] != -1) P[next[k]] = -1;
       head[mindeg] = next[k];          // remove k from degree list
       casadi_int elenk = elen[k];             // elenk = |Ek|
@@ -816,7 +852,7 @@ namespace casadi {
       len[k] = pk2 - pk1;
       elen[k] = -2;                     // k is now an element
       // Find set differences
-      mark = wclear(mark, lemax, get_ptr(w), n);  // clear w if necessary
+      mark = SparsityInternal::wclear(mark, lemax, get_ptr(w), n);  // clear w if necessary
       for (casadi_int pk = pk1; pk < pk2; pk++) {   // scan 1: find |Le\Lk|
         casadi_int i = row[pk];
         casadi_int eln;
@@ -885,7 +921,7 @@ namespace casadi {
       }                          // scan2 is done
       degree[k] = dk;          // finalize |Lk|
       lemax = std::max(lemax, dk);
-      mark = wclear(mark+lemax, lemax, get_ptr(w), n);  // clear w
+      mark = SparsityInternal::wclear(mark+lemax, lemax, get_ptr(w), n);  // clear w
       // Supernode detection
       for (casadi_int pk = pk1; pk < pk2; pk++) {
         casadi_int i = row[pk];
@@ -925,7 +961,7 @@ namespace casadi {
         if ((nvi = -nv[i]) <= 0) continue; // skip if i is dead
         nv[i] = nvi;                      // restore nv[i]
         d = degree[i] + dk - nvi;         // compute external degree(i)
-        d = std::min(d, n - nel - nvi);
+        d = std::min(d, n_total - nel - nvi);
         if (head[d] != -1) P[head[d]] = i;
         next[i] = head[d];               // put i back in degree list
         P[i] = -1;
@@ -957,7 +993,7 @@ namespace casadi {
       }
     }
     for (casadi_int k = 0, i = 0; i <= n; i++) {     // postorder the assembly tree
-      if (colind[i] == -1) k = postorder_dfs(i, k, get_ptr(head), get_ptr(next),
+      if (colind[i] == -1) k = SparsityInternal::postorder_dfs(i, k, get_ptr(head), get_ptr(next),
                                              get_ptr(P), get_ptr(w));
     }
     P.resize(n);
@@ -965,6 +1001,131 @@ namespace casadi {
     #undef FLIP
   }
 
+
+  // Mix the bits of an index, for order independent hashing of a set of indices
+  static inline std::size_t hash_mix(casadi_int i) {
+    // Finalizer of splitmix64
+    uint64_t z = static_cast<uint64_t>(i) + 0x9e3779b97f4a7c15ULL;
+    z = (z ^ (z >> 30)) * 0xbf58476d1ce4e5b9ULL;
+    z = (z ^ (z >> 27)) * 0x94d049bb133111ebULL;
+    return static_cast<std::size_t>(z ^ (z >> 31));
+  }
+
+  void SparsityInternal::amd(std::vector<casadi_int>& p) const {
+    casadi_assert(is_symmetric(), "AMD requires a symmetric matrix");
+    // Get sparsity
+    casadi_int n=size2();
+    const casadi_int* colind = this->colind();
+    const casadi_int* row = this->row();
+
+    // Hash of the pattern of each column, including the diagonal
+    vector<std::size_t> hash(n);
+    vector<casadi_int> count(n);
+    for (casadi_int c=0; c<n; ++c) {
+      hash[c] = hash_mix(c);
+      count[c] = 1;
+      for (casadi_int k=colind[c]; k<colind[c+1]; ++k) {
+        if (row[k]!=c) {
+          hash[c] += hash_mix(row[k]);
+          count[c]++;
+        }
+      }
+    }
+
+    // Lists of columns with the same hash bucket, in increasing order
+    vector<casadi_int> bucket(n, -1), next(n);
+    for (casadi_int c=n-1; c>=0; --c) {
+      next[c] = bucket[hash[c] % n];
+      bucket[hash[c] % n] = c;
+    }
+
+    // Merge indistinguishable columns, i.e. with the same pattern including the diagonal
+    vector<casadi_int> rep(n, -1), mark(n, -1);
+    for (casadi_int i=0; i<n; ++i) {
+      if (rep[i]>=0) continue;
+      rep[i] = i;
+      bool marked = false;
+      for (casadi_int j=next[i]; j>=0; j=next[j]) {
+        if (rep[j]>=0 || hash[j]!=hash[i] || count[j]!=count[i]) continue;
+        // Mark the pattern of i
+        if (!marked) {
+          mark[i] = i;
+          for (casadi_int el=colind[i]; el<colind[i+1]; ++el) mark[row[el]] = i;
+          marked = true;
+        }
+        // Compare with the pattern of j
+        bool same = mark[j]==i;
+        for (casadi_int el=colind[j]; same && el<colind[j+1]; ++el) same = mark[row[el]]==i;
+        if (same) rep[j] = i;
+      }
+    }
+
+    // Nodes of the quotient graph
+    vector<casadi_int> node(n, -1), nv;
+    for (casadi_int c=0; c<n; ++c) {
+      if (rep[c]==c) {
+        node[c] = nv.size();
+        nv.push_back(0);
+      }
+      nv[node[rep[c]]]++;
+    }
+    casadi_int nc = nv.size();
+    nv.push_back(0);
+
+    // Adjacency of the quotient graph, without diagonal entries
+    vector<casadi_int> q_colind(nc+1, 0), q_row;
+    q_row.reserve(nnz());
+    fill(mark.begin(), mark.end(), -1);
+    for (casadi_int c=0; c<n; ++c) {
+      if (rep[c]!=c) continue;
+      casadi_int i = node[c];
+      mark[i] = i;
+      for (casadi_int k=colind[c]; k<colind[c+1]; ++k) {
+        casadi_int j = node[rep[row[k]]];
+        if (mark[j]!=i) {
+          mark[j] = i;
+          q_row.push_back(j);
+        }
+      }
+      q_colind[i+1] = q_row.size();
+    }
+
+    // Elbow room, as in cs_amd
+    casadi_int q_nnz = q_row.size();
+    q_row.resize(q_nnz + q_nnz/5 + 2*nc);
+
+    // Order the quotient graph
+    vector<casadi_int> q_p = amd_quotient(nc, n, q_colind, q_row, nv);
+
+    // Expand, the columns of a node are ordered consecutively
+    vector<casadi_int> members(n), offset(nc+1, 0);
+    for (casadi_int c=0; c<n; ++c) offset[node[rep[c]]+1]++;
+    for (casadi_int i=0; i<nc; ++i) offset[i+1] += offset[i];
+    vector<casadi_int> pos(offset.begin(), offset.end()-1);
+    for (casadi_int c=0; c<n; ++c) members[pos[node[rep[c]]]++] = c;
+    p.clear();
+    p.reserve(n);
+    for (casadi_int i : q_p) {
+      p.insert(p.end(), members.begin()+offset[i], members.begin()+offset[i+1]);
+    }
+  }
+
+  const std::vector<casadi_int>& SparsityInternal::amd() const {
+#ifdef CASADI_WITH_THREAD
+    std::call_once(amd_once_, [this]() {
+      std::vector<casadi_int>* p = new std::vector<casadi_int>();
+      amd(*p);
+      amd_ = p;
+    });
+#else // CASADI_WITH_THREAD
+    if (!amd_) {
+      amd_ = new std::vector<casadi_int>();
+      amd(*amd_);
+    }
+#endif // CASADI_WITH_THREAD
+    return *amd_;
+  }
+
   void SparsityInternal::bfs(casadi_int n, std::vector<casadi_int>& wi, std::vector<casadi_int>& wj,
                               std::vector<casadi_int>& queue, const std::vector<casadi_int>& imatch,
                               const std::vector<casadi_int>& jmatch, casadi_int mark) const {
@@ -1779,6 +1940,54 @@ namespace casadi {
     return Sparsity::triplet(d1, d2, row, col);
   }
 
+  std::vector<casadi_int> SparsityInternal::
+  mtimes_mapping(const Sparsity& y, const Sparsity& z) const {
+    // Direct access to the vectors
+    const casadi_int* x_row = row();
+    const casadi_int* x_colind = colind();
+    const casadi_int* y_row = y.row();
+    const casadi_int* y_colind = y.colind();
+    const casadi_int* z_row = z.row();
+    const casadi_int* z_colind = z.colind();
+    casadi_int nz = z.nnz();
+
+    // Offsets for each nonzero of z, followed by the (x, y) pairs
+    vector<casadi_int> ret(nz+1, 0);
+
+    // Nonzero of z for each row in the current column, -1 if none
+    vector<casadi_int> loc(size1(), -1);
+
+    // Count the contributions, then list them, in the order of casadi_mtimes
+    vector<casadi_int> pos;
+    for (casadi_int pass=0; pass<2; ++pass) {
+      for (casadi_int cc=0; cc<y.size2(); ++cc) {
+        for (casadi_int kk=z_colind[cc]; kk<z_colind[cc+1]; ++kk) loc[z_row[kk]] = kk;
+        for (casadi_int kk=y_colind[cc]; kk<y_colind[cc+1]; ++kk) {
+          casadi_int rr = y_row[kk];
+          for (casadi_int kk1=x_colind[rr]; kk1<x_colind[rr+1]; ++kk1) {
+            casadi_int el = loc[x_row[kk1]];
+            if (el<0) continue;
+            if (pass==0) {
+              ret[el+1]++;
+            } else {
+              casadi_int i = nz+1 + 2*pos[el]++;
+              ret[i] = kk1;
+              ret[i+1] = kk;
+            }
+          }
+        }
+        for (casadi_int kk=z_colind[cc]; kk<z_colind[cc+1]; ++kk) loc[z_row[kk]] = -1;
+      }
+      if (pass==0) {
+        // Cumsum to get the offsets
+        for (casadi_int el=0; el<nz; ++el) ret[el+1] += ret[el];
+        pos.assign(ret.begin(), ret.begin()+nz);
+        ret.resize(nz+1 + 2*ret[nz]);
+      }
+    }
+    return ret;
+  }
+
   bool SparsityInternal::is_scalar(bool scalar_and_dense) const {
     return size2()==1 && size1()==1 && (!scalar_and_dense || nnz()==1);
   }
@@ -2992,19 +3201,7 @@ namespace casadi {
     const casadi_int* colind = this->colind();
     const casadi_int* row = this->row();
     if (ordering!=0) {
-      casadi_assert_dev(ordering==1);
-
-      // Ordering
-      vector<casadi_int> ord = largest_first();
-
-      // Create a new sparsity pattern
-      Sparsity sp_permuted = pmult(ord, true, true, true);
-
-      // Star coloring for the permuted matrix
-      Sparsity ret_permuted = sp_permuted.star_coloring2(0);
-
-      // Permute result back
-      return ret_permuted.pmult(ord, true, false, false);
+      return ordered_coloring(&SparsityInternal::star_coloring2, ordering, cutoff);
     }
 
     // Allocate temporary vectors
@@ -3242,19 +3439,7 @@ namespace casadi {
 
     // Reorder, if necessary
     if (ordering!=0) {
-      casadi_assert_dev(ordering==1);
-
-      // Ordering
-      vector<casadi_int> ord = largest_first();
-
-      // Create a new sparsity pattern
-      Sparsity sp_permuted = pmult(ord, true, true, true);
-
-      // Star coloring for the permuted matrix
-      Sparsity ret_permuted = sp_permuted.star_coloring(0);
-
-      // Permute result back
-      return ret_permuted.pmult(ord, true, false, false);
+      return ordered_coloring(&SparsityInternal::star_coloring, ordering, cutoff);
     }
 
     // Allocate temporary vectors
@@ -3347,6 +3532,202 @@ namespace casadi {
     return Sparsity::triplet(size2(), num_colors, range(color.size()), color);
   }
 
+  // Find the root of the set containing e, with path halving
+  static casadi_int disjoint_find(std::vector<casadi_int>& parent, casadi_int e) {
+    while (parent[e]!=e) {
+      parent[e] = parent[parent[e]];
+      e = parent[e];
+    }
+    return e;
+  }
+
+  // Merge the sets containing e1 and e2, union by rank
+  static void disjoint_union(std::vector<casadi_int>& parent, std::vector<casadi_int>& rank,
+                             casadi_int e1, casadi_int e2) {
+    e1 = disjoint_find(parent, e1);
+    e2 = disjoint_find(parent, e2);
+    if (e1==e2) return;
+    if (rank[e1]<rank[e2]) swap(e1, e2);
+    parent[e2] = e1;
+    if (rank[e1]==rank[e2]) rank[e1]++;
+  }
+
+  Sparsity SparsityInternal::acyclic_coloring(casadi_int ordering, casadi_int cutoff) const {
+    if (!is_square()) {
+      casadi_message("AcyclicColoring requires a square matrix, got " + dim() + ".");
+    }
+
+    // Reorder, if necessary
+    if (ordering!=0) {
+      return ordered_coloring(&SparsityInternal::acyclic_coloring, ordering, cutoff);
+    }
+
+    const casadi_int* colind = this->colind();
+    const casadi_int* row = this->row();
+
+    // Index of the edge {i, j} for each off-diagonal nonzero, -1 on the diagonal
+    vector<casadi_int> edge(nnz(), -1);
+    casadi_int n_edge = 0;
+    for (casadi_int i=0; i<size2(); ++i) {
+      for (casadi_int el=colind[i]; el<colind[i+1]; ++el) {
+        casadi_int j = row[el];
+        if (j<=i) continue;
+        // Locate the transposed nonzero
+        const casadi_int* r = lower_bound(row+colind[j], row+colind[j+1], i);
+        casadi_assert(r!=row+colind[j+1] && *r==i,
+          "AcyclicColoring requires a symmetric sparsity pattern");
+        edge[el] = edge[r-row] = n_edge++;
+      }
+    }
+
+    // Each set of edges is a two-colored tree
+    vector<casadi_int> parent(n_edge), rank(n_edge);
+
+    // First vertex and neighbor reaching a tree when coloring a vertex
+    vector<casadi_int> first_visit_v(n_edge, -1), first_visit_w(n_edge, -1);
+
+    // Allocate temporary vectors
+    vector<casadi_int> forbiddenColors;
+    forbiddenColors.reserve(size2());
+    vector<casadi_int> color(size2(), -1);
+
+    // Last vertex with an edge to a given color and that edge
+    vector<casadi_int> color_edge_v, color_edge;
+
+    for (casadi_int i=0; i<size2(); ++i) {
+
+      // Colors of neighbors are forbidden
+      for (casadi_int w_el=colind[i]; w_el<colind[i+1]; ++w_el) {
+        casadi_int w = row[w_el];
+        if (color[w]!=-1) forbiddenColors[color[w]] = i;
+      }
+
+      // Forbid colors that would close a two-colored cycle
+      for (casadi_int w_el=colind[i]; w_el<colind[i+1]; ++w_el) {
+        casadi_int w = row[w_el];
+        if (color[w]==-1) continue;
+        for (casadi_int x_el=colind[w]; x_el<colind[w+1]; ++x_el) {
+          casadi_int x = row[x_el];
+          if (x==w || color[x]==-1 || forbiddenColors[color[x]]==i) continue;
+          casadi_int e = edge[x_el];
+          if (e<0) continue;
+          casadi_int r = disjoint_find(parent, e);
+          if (first_visit_v[r]!=i) {
+            // First visit to the tree containing the edge {w, x}
+            first_visit_v[r] = i;
+            first_visit_w[r] = w;
+          } else if (first_visit_w[r]!=w) {
+            // Tree reached via two different neighbors
+            forbiddenColors[color[x]] = i;
+          }
+        }
+      }
+
+      // color[v] <- min {c > 0 : forbiddenColors[c] = v}
+      bool new_color = true;
+      for (casadi_int color_i=0; color_i<forbiddenColors.size(); ++color_i) {
+        // Break if color is ok
+        if (forbiddenColors[color_i]!=i) {
+          color[i] = color_i;
+          new_color = false;
+          break;
+        }
+      }
+
+      // New color if reached end
+      if (new_color) {
+        color[i] = forbiddenColors.size();
+        forbiddenColors.push_back(-1);
+        color_edge_v.push_back(-1);
+        color_edge.push_back(-1);
+
+        // Cutoff if too many colors
+        if (forbiddenColors.size()>cutoff) {
+          return Sparsity();
+        }
+      }
+
+      // New edges to colored neighbors
+      for (casadi_int w_el=colind[i]; w_el<colind[i+1]; ++w_el) {
+        casadi_int w = row[w_el], e = edge[w_el];
+        if (e<0 || color[w]==-1) continue;
+        parent[e] = e;
+        rank[e] = 0;
+      }
+
+      // Merge the trees joined by the new edges
+      for (casadi_int w_el=colind[i]; w_el<colind[i+1]; ++w_el) {
+        casadi_int w = row[w_el], e = edge[w_el];
+        if (e<0 || color[w]==-1) continue;
+
+        // Edges to neighbors with the same color
+        if (color_edge_v[color[w]]!=i) {
+          color_edge_v[color[w]] = i;
+          color_edge[color[w]] = e;
+        } else {
+          disjoint_union(parent, rank, e, color_edge[color[w]]);
+        }
+
+        // Edges from w to other vertices with the color of v
+        for (casadi_int x_el=colind[w]; x_el<colind[w+1]; ++x_el) {
+          casadi_int x = row[x_el];
+          if (x==i || color[x]!=color[i] || edge[x_el]<0) continue;
+          disjoint_union(parent, rank, e, edge[x_el]);
+        }
+      }
+    }
+
+    // Number of colors used
+    casadi_int num_colors = forbiddenColors.size();
+
+    // Return sparsity in sparse triplet format
+    return Sparsity::triplet(size2(), num_colors, range(color.size()), color);
+  }
+
+  Sparsity SparsityInternal::
+  ordered_coloring(Sparsity (SparsityInternal::*coloring)(casadi_int, casadi_int) const,
+                   casadi_int ordering, casadi_int cutoff) const {
+    // Try all orderings, keep the fewest colors
+    if (ordering<0) {
+      // Largest first first, so that ties keep the default
+      const casadi_int orderings[] = {1, 2, 3, 4, 0};
+      Sparsity best;
+      for (casadi_int ord : orderings) {
+        Sparsity r = (this->*coloring)(ord, cutoff);
+        if (r.is_null()) continue;
+        best = r;
+        if (r.size2()<=1) break;
+        // Later orderings need to use fewer colors
+        cutoff = r.size2()-1;
+      }
+      return best;
+    }
+
+    // Ordering
+    vector<casadi_int> ord = coloring_ordering(ordering);
+
+    // Create a new sparsity pattern
+    Sparsity sp_permuted = pmult(ord, true, true, true);
+
+    // Coloring for the permuted matrix
+    Sparsity ret_permuted = (sp_permuted.get()->*coloring)(0, cutoff);
+    if (ret_permuted.is_null()) return ret_permuted;
+
+    // Permute result back
+    return ret_permuted.pmult(ord, true, false, false);
+  }
+
+  std::vector<casadi_int> SparsityInternal::coloring_ordering(casadi_int ordering) const {
+    switch (ordering) {
+      case 0: return range(size2());
+      case 1: return largest_first();
+      case 2: return smallest_last();
+      case 3: return incidence_degree();
+      case 4: return dynamic_largest_first();
+      default: casadi_error("Unknown ordering: " + str(ordering));
+    }
+  }
+
   std::vector<casadi_int> SparsityInternal::largest_first() const {
     vector<casadi_int> degree = get_colind();
     casadi_int max_degree = 0;
@@ -3382,6 +3763,94 @@ namespace casadi {
     return reverse_ordering;
   }
 
+  // Number of neighbors of each vertex in the adjacency graph, excluding itself
+  static std::vector<casadi_int> graph_degree(const casadi_int* colind, const casadi_int* row,
+                                              casadi_int n) {
+    std::vector<casadi_int> degree(n);
+    for (casadi_int v=0; v<n; ++v) {
+      degree[v] = colind[v+1]-colind[v];
+      for (casadi_int el=colind[v]; el<colind[v+1]; ++el) {
+        if (row[el]==v) degree[v]--;
+      }
+    }
+    return degree;
+  }
+
+  /* Greedy vertex ordering using a bucket queue: repeatedly takes an unordered vertex
+     with maximal (or minimal) key and adds delta to the keys of its unordered neighbors.
+     Ties are broken in the order of init. Keys must stay in [0, n]. */
+  static std::vector<casadi_int> bucket_ordering(const casadi_int* colind, const casadi_int* row,
+                                                 const std::vector<casadi_int>& init,
+                                                 std::vector<casadi_int> key,
+                                                 bool pick_max, casadi_int delta) {
+    casadi_int n = key.size();
+
+    // A doubly linked list of vertices for each key
+    std::vector<casadi_int> head(n+1, -1), next(n), prev(n);
+    for (auto it=init.rbegin(); it!=init.rend(); ++it) {
+      casadi_int v = *it;
+      prev[v] = -1;
+      next[v] = head[key[v]];
+      if (next[v]>=0) prev[next[v]] = v;
+      head[key[v]] = v;
+    }
+
+    std::vector<bool> ordered(n, false);
+    std::vector<casadi_int> ret;
+    ret.reserve(n);
+    casadi_int b = pick_max ? n : 0;
+    for (casadi_int k=0; k<n; ++k) {
+      // Locate a nonempty bucket
+      while (head[b]<0) b += pick_max ? -1 : 1;
+
+      // Take the first vertex
+      casadi_int v = head[b];
+      head[b] = next[v];
+      if (head[b]>=0) prev[head[b]] = -1;
+      ordered[v] = true;
+      ret.push_back(v);
+
+      // Move the unordered neighbors to new buckets
+      for (casadi_int el=colind[v]; el<colind[v+1]; ++el) {
+        casadi_int w = row[el];
+        if (ordered[w]) continue;
+        if (prev[w]>=0) {
+          next[prev[w]] = next[w];
+        } else {
+          head[key[w]] = next[w];
+        }
+        if (next[w]>=0) prev[next[w]] = prev[w];
+        key[w] += delta;
+        prev[w] = -1;
+        next[w] = head[key[w]];
+        if (next[w]>=0) prev[next[w]] = w;
+        head[key[w]] = w;
+        if (pick_max ? key[w]>b : key[w]<b) b = key[w];
+      }
+    }
+    return ret;
+  }
+
+  std::vector<casadi_int> SparsityInternal::smallest_last() const {
+    // Remove vertices of minimal degree, color them in reverse order
+    vector<casadi_int> ret = bucket_ordering(colind(), row(), range(size2()),
+                                             graph_degree(colind(), row(), size2()), false, -1);
+    reverse(ret.begin(), ret.end());
+    return ret;
+  }
+
+  std::vector<casadi_int> SparsityInternal::incidence_degree() const {
+    // Most ordered neighbors first, ties by decreasing degree
+    return bucket_ordering(colind(), row(), largest_first(),
+                           vector<casadi_int>(size2(), 0), true, 1);
+  }
+
+  std::vector<casadi_int> SparsityInternal::dynamic_largest_first() const {
+    // Largest degree among the unordered vertices first
+    return bucket_ordering(colind(), row(), range(size2()),
+                           graph_degree(colind(), row(), size2()), true, -1);
+  }
+
   Sparsity SparsityInternal::pmult(const std::vector<casadi_int>& p, bool permute_rows,
                                    bool permute_columns, bool invert_permutation) const {
     // Invert p, possibly
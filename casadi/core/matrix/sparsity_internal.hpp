@@ -33,6 +33,13 @@
 
 #include "sparsity.hpp"
 #include "shared_object_internal.hpp"
+#ifdef CASADI_WITH_THREAD
+#ifdef CASADI_WITH_THREAD_MINGW
+#include <mingw.mutex.h>
+#else // CASADI_WITH_THREAD_MINGW
+#include <mutex>
+#endif // CASADI_WITH_THREAD_MINGW
+#endif //CASADI_WITH_THREAD
 /// \cond INTERNAL
 
 namespace casadi {
@@ -63,6 +70,34 @@ namespace casadi {
     */
     mutable Btf* btf_;
 
+    /** \brief Structure to hold the supernodes of an LDL^T factorization */
+    struct Supernodes {
+      /// Elimination tree
+      std::vector<casadi_int> parent;
+      /// Column offsets of the L factor, strictly lower entries only
+      std::vector<casadi_int> l_colind;
+      /// First column of each supernode, followed by the number of columns
+      std::vector<casadi_int> offset;
+    };
+
+    /* \brief The supernodes and the AMD ordering for the sparsity
+      Calculated on first call, then cached
+    */
+    mutable Supernodes* supernodes_;
+    mutable std::vector<casadi_int>* amd_;
+#ifdef CASADI_WITH_THREAD
+    // Patterns are shared between threads, the caches are filled only once
+    mutable std::once_flag supernodes_once_, amd_once_;
+#endif // CASADI_WITH_THREAD
+
+    /// Is the pattern registered in the cache of sparsity patterns
+    bool cached_;
+
+    /// Hash key of the pattern in the cache
+    std::size_t cache_key_;
+
+    friend class Sparsity;
+
   public:
     /// Construct a sparsity pattern from arrays
     SparsityInternal(casadi_int nrow, casadi_int ncol,
@@ -118,11 +153,15 @@ namespace casadi {
     casadi_int scc(std::vector<casadi_int>& p, std::vector<casadi_int>& r) const;
 
     /** \brief Approximate minimal degree preordering
+      * Indistinguishable columns are merged into a quotient graph before ordering.
       * The implementation is a modified version of cs_amd in CSparse
       * Copyright(c) Timothy A. Davis, 2006-2009
       * Licensed as a derivative work under the GNU LGPL
       */
-    std::vector<casadi_int> amd() const;
+    void amd(std::vector<casadi_int>& p) const;
+
+    /// Get cached approximate minimal degree preordering
+    const std::vector<casadi_int>& amd() const;
 
     /** \brief Calculate the elimination tree for a matrix
       * len[w] >= ata ? ncol + nrow : ncol
@@ -153,6 +192,21 @@ namespace casadi {
       */
     static void postorder(const casadi_int* parent, casadi_int n, casadi_int* post, casadi_int* w);
 
+    /** \brief Find the fundamental supernodes of an LDL^T factorization
+      * Column c+1 joins the supernode of column c if c is its only child in the
+      * elimination tree and the columns of L have the same pattern below c+1.
+      * len[w] >= n
+      * len[offset] >= n+1, returns the number of supernodes
+      */
+    static casadi_int supernodes(const casadi_int* parent, const casadi_int* l_colind,
+                                 casadi_int n, casadi_int* offset, casadi_int* w);
+
+    /// Get cached supernodes of the LDL^T factorization of a symmetric matrix
+    const Supernodes& supernodes() const;
+
+    /// Calculate the cached supernodes
+    void init_supernodes() const;
+
     /** \brief Needed by casadi_qr_colind
       * Ref: Chapter 4, Direct Methods for Sparse Linear Systems by Tim Davis
       * Modified version of cs_leaf in CSparse
@@ -486,6 +540,9 @@ namespace casadi {
     /// Sparsity pattern for a matrix-matrix product (details in public class)
     Sparsity _mtimes(const Sparsity& y) const;
 
+    /// Nonzero mapping for the matrix product with pattern z (details in public class)
+    std::vector<casadi_int> mtimes_mapping(const Sparsity& y, const Sparsity& z) const;
+
     ///@{
     /// Union of two sparsity patterns
     Sparsity combine(const Sparsity& y, bool f0x_is_zero, bool function0_is_zero,
@@ -603,9 +660,34 @@ namespace casadi {
      */
     Sparsity star_coloring2(casadi_int ordering, casadi_int cutoff) const;
 
+    /** \brief A greedy acyclic coloring algorithm
+     * See description in public class.
+     */
+    Sparsity acyclic_coloring(casadi_int ordering, casadi_int cutoff) const;
+
+    /** \brief Apply a vertex ordering before a symmetric coloring
+     *
+     * Colors the permuted pattern with \a coloring and permutes the result back.
+     * A negative \a ordering tries all orderings and keeps the fewest colors.
+     */
+    Sparsity ordered_coloring(Sparsity (SparsityInternal::*coloring)(casadi_int, casadi_int) const,
+                              casadi_int ordering, casadi_int cutoff) const;
+
+    /// Get a vertex ordering for coloring, see description in public class
+    std::vector<casadi_int> coloring_ordering(casadi_int ordering) const;
+
     /// Order the columns by decreasing degree
     std::vector<casadi_int> largest_first() const;
 
+    /// Smallest-last ordering of the columns
+    std::vector<casadi_int> smallest_last() const;
+
+    /// Incidence-degree ordering of the columns
+    std::vector<casadi_int> incidence_degree() const;
+
+    /// Dynamic largest-first ordering of the columns
+    std::vector<casadi_int> dynamic_largest_first() const;
+
     /// Permute rows and/or columns
     Sparsity pmult(const std::vector<casadi_int>& p, bool permute_rows=true, bool permute_cols=true,
                    bool invert_permutation=false) const;
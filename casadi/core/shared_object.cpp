@@ -54,6 +54,21 @@ namespace casadi {
     count_up();
   }
 
+  bool SharedObject::own_if_alive(SharedObjectInternal* node_) {
+#ifdef CASADI_WITH_THREAD
+    casadi_int c = node_->count.load();
+    do {
+      if (c==0) return false;
+    } while (!node_->count.compare_exchange_weak(c, c+1));
+#else // CASADI_WITH_THREAD
+    if (node_->count==0) return false;
+    node_->count++;
+#endif // CASADI_WITH_THREAD
+    count_down();
+    node = node_;
+    return true;
+  }
+
   void SharedObject::assign(SharedObjectInternal* node_) {
     node = node_;
   }
@@ -103,6 +103,14 @@ namespace casadi {
     /// Assign the node to a node class pointer (or null)
     void own(SharedObjectInternal* node);
 
+    /** \brief Assign the node only if it is still referenced elsewhere
+     *
+     * Returns false and leaves the object untouched if the reference count of
+     * the node has already dropped to zero, i.e. if it is being destroyed.
+     * Used when looking up nodes in caches that do not own their entries.
+     */
+    bool own_if_alive(SharedObjectInternal* node);
+
     /** \brief Assign the node to a node class pointer without reference counting
      *
      * improper use will cause memory leaks!
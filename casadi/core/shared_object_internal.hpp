@@ -27,6 +27,9 @@
 #define CASADI_SHARED_OBJECT_INTERNAL_HPP
 
 #include "shared_object.hpp"
+#ifdef CASADI_WITH_THREAD
+#include <atomic>
+#endif // CASADI_WITH_THREAD
 
 namespace casadi {
 
@@ -84,7 +87,11 @@ namespace casadi {
 
   private:
     /// Number of references pointing to the object
+#ifdef CASADI_WITH_THREAD
+    std::atomic<casadi_int> count;
+#else // CASADI_WITH_THREAD
     casadi_int count;
+#endif // CASADI_WITH_THREAD
 
     /// Weak pointer (non-owning) object for the object
     WeakRef* weak_ref_;
@@ -26,6 +26,11 @@
 #ifndef CASADI_MEM_H
 #define CASADI_MEM_H
 
+/* Atomic intrinsics for the pool lock, outside of the extern "C" block */
+#if defined(_MSC_VER)
+#include <intrin.h>
+#endif
+
 #ifdef __cplusplus
 extern "C" {
 #endif
@@ -54,6 +59,13 @@ typedef int (*casadi_work_t)(casadi_int* sz_arg, casadi_int* sz_res,
                              casadi_int* sz_iw, casadi_int* sz_w);
 typedef int (*casadi_eval_t)(const casadi_real** arg, casadi_real** res,
                              casadi_int* iw, casadi_real* w, void* mem);
+typedef void* (*casadi_checkout_t)(void);
+typedef void (*casadi_release_t)(void* mem);
+
+/* Alignment of the work arrays, the size of a cache line */
+#ifndef CASADI_MEM_ALIGN
+#define CASADI_MEM_ALIGN 64
+#endif
 
 /* Structure to hold meta information about an input or output */
 typedef struct {
@@ -100,6 +112,9 @@ typedef struct {
   casadi_sparsity_t sparsity_out;
   casadi_work_t work;
   casadi_eval_t eval;
+  /* Optional, check out and release a memory object for eval */
+  casadi_checkout_t checkout;
+  casadi_release_t release;
 } casadi_functions;
 
 /* Memory needed for evaluation */
@@ -115,6 +130,9 @@ typedef struct {
   casadi_real* w;
   void* mem;
 
+  /* Single allocation holding all dynamic arrays, if any */
+  void* block;
+
   /* Meta information */
   casadi_int n_in, n_out;
   casadi_io* in;
@@ -148,8 +166,8 @@ inline void casadi_init(casadi_mem* mem, casadi_functions* f) {
     assert(flag==0);
   }
 
-  /* TODO: Check out a memory object */
-  mem->mem = 0;
+  /* Check out a memory object */
+  mem->mem = f->checkout ? f->checkout() : 0;
 
   /* No io structs allocated */
   mem->in = 0;
@@ -160,13 +178,15 @@ inline void casadi_init(casadi_mem* mem, casadi_functions* f) {
   mem->res = 0;
   mem->iw = 0;
   mem->w = 0;
+  mem->block = 0;
 }
 
 /* Free claimed static memory */
 inline void casadi_deinit(casadi_mem* mem) {
   assert(mem!=0);
 
-  /* TODO: Release a memory object */
+  /* Release the memory object */
+  if (mem->f->release) mem->f->release(mem->mem);
 
   /* Decrease reference counter */
   if (mem->f->decref) mem->f->decref();
@@ -197,24 +217,39 @@ inline void casadi_init_arrays(casadi_mem* mem) {
   }
 }
 
-/* Allocate dynamic memory */
+/* Round up to a multiple of CASADI_MEM_ALIGN */
+inline size_t casadi_mem_align(size_t sz) {
+  return (sz + CASADI_MEM_ALIGN - 1) & ~(size_t)(CASADI_MEM_ALIGN - 1);
+}
+
+/* Allocate dynamic memory, all arrays in one block with cache aligned offsets */
 #ifndef CASADI_STATIC
 inline int casadi_alloc_arrays(casadi_mem* mem) {
-  /* Allocate io memory */
-  mem->in = (casadi_io*)malloc(mem->n_in*sizeof(casadi_io));
-  if (mem->n_in!=0 && mem->in==0) return 1;
-  mem->out = (casadi_io*)malloc(mem->n_out*sizeof(casadi_io));
-  if (mem->n_out!=0 && mem->out==0) return 1;
-
-  /* Allocate work vectors */
-  mem->arg = (const casadi_real**)malloc(mem->sz_arg*sizeof(const casadi_real*));
-  if (mem->sz_arg!=0 && mem->arg==0) return 1;
-  mem->res = (casadi_real**)malloc(mem->sz_res*sizeof(casadi_real*));
-  if (mem->sz_res!=0 && mem->res==0) return 1;
-  mem->iw = (casadi_int*)malloc(mem->sz_iw*sizeof(casadi_int));
-  if (mem->sz_iw!=0 && mem->iw==0) return 1;
-  mem->w = (casadi_real*)malloc(mem->sz_w*sizeof(casadi_real));
-  if (mem->sz_w!=0 && mem->w==0) return 1;
+  size_t off_iw, off_arg, off_res, off_in, off_out, sz;
+  char* base;
+
+  /* Offsets, largest alignment requirement first */
+  off_iw = casadi_mem_align(mem->sz_w*sizeof(casadi_real));
+  off_arg = off_iw + casadi_mem_align(mem->sz_iw*sizeof(casadi_int));
+  off_res = off_arg + casadi_mem_align(mem->sz_arg*sizeof(const casadi_real*));
+  off_in = off_res + casadi_mem_align(mem->sz_res*sizeof(casadi_real*));
+  off_out = off_in + casadi_mem_align(mem->n_in*sizeof(casadi_io));
+  sz = off_out + mem->n_out*sizeof(casadi_io);
+
+  /* Allocate, with room for aligning the start */
+  mem->block = malloc(sz + CASADI_MEM_ALIGN);
+  if (mem->block==0) return 1;
+  base = (char*)casadi_mem_align((size_t)mem->block);
+
+  /* Work vectors */
+  mem->w = (casadi_real*)base;
+  mem->iw = (casadi_int*)(base + off_iw);
+  mem->arg = (const casadi_real**)(base + off_arg);
+  mem->res = (casadi_real**)(base + off_res);
+
+  /* io memory */
+  mem->in = (casadi_io*)(base + off_in);
+  mem->out = (casadi_io*)(base + off_out);
 
   return 0;
 }
@@ -225,6 +260,13 @@ inline int casadi_alloc_arrays(casadi_mem* mem) {
 inline void casadi_free_arrays(casadi_mem* mem) {
   assert(mem!=0);
 
+  /* Arrays allocated by casadi_alloc_arrays */
+  if (mem->block) {
+    free(mem->block);
+    mem->block = 0;
+    return;
+  }
+
   /* Free io meta data */
   if (mem->in) free(mem->in);
   if (mem->out) free(mem->out);
@@ -282,6 +324,95 @@ inline void casadi_free(casadi_mem* mem) {
 }
 #endif /* CASADI_STATIC */
 
+/* Spinlock protecting a pool. For compilers without GCC or MSVC atomics,
+   define casadi_pool_lock and casadi_pool_unlock before including this file,
+   or define CASADI_POOL_NO_LOCK if a pool is only used by a single thread */
+#ifndef casadi_pool_lock
+#if defined(CASADI_POOL_NO_LOCK)
+#define casadi_pool_lock(pool)
+#define casadi_pool_unlock(pool)
+#elif defined(_MSC_VER)
+#define casadi_pool_lock(pool) while (_InterlockedExchange(&(pool)->lock, 1)) {}
+#define casadi_pool_unlock(pool) _InterlockedExchange(&(pool)->lock, 0)
+#elif defined(__GNUC__)
+#define casadi_pool_lock(pool) while (__sync_lock_test_and_set(&(pool)->lock, 1)) {}
+#define casadi_pool_unlock(pool) __sync_lock_release(&(pool)->lock)
+#else
+#error "No atomics to lock a casadi_pool: define casadi_pool_lock/unlock or CASADI_POOL_NO_LOCK"
+#endif
+#endif /* casadi_pool_lock */
+
+/* Pool of memory structs, reused for concurrent evaluations */
+typedef struct {
+  /* Function pointers */
+  casadi_functions* f;
+
+  /* Stack of idle memory structs */
+  casadi_mem** idle;
+  casadi_int n_idle, sz_idle;
+
+  /* Lock */
+  volatile long lock;
+} casadi_pool;
+
+/* Initialize a pool */
+inline void casadi_pool_init(casadi_pool* pool, casadi_functions* f) {
+  assert(pool!=0);
+  assert(f!=0);
+  pool->f = f;
+  pool->idle = 0;
+  pool->n_idle = pool->sz_idle = 0;
+  pool->lock = 0;
+}
+
+/* Check out a memory struct, only allocates if none is idle */
+#ifndef CASADI_STATIC
+inline casadi_mem* casadi_checkout(casadi_pool* pool) {
+  casadi_mem* mem = 0;
+  assert(pool!=0);
+  casadi_pool_lock(pool);
+  if (pool->n_idle>0) mem = pool->idle[--pool->n_idle];
+  casadi_pool_unlock(pool);
+  /* Allocate outside the lock */
+  return mem ? mem : casadi_alloc(pool->f);
+}
+#endif /* CASADI_STATIC */
+
+/* Return a memory struct to the pool */
+#ifndef CASADI_STATIC
+inline void casadi_release(casadi_pool* pool, casadi_mem* mem) {
+  casadi_mem** idle;
+  assert(pool!=0);
+  assert(mem!=0);
+  casadi_pool_lock(pool);
+  if (pool->n_idle==pool->sz_idle) {
+    /* Grow the stack, happens only when more structs are in use than ever before */
+    idle = (casadi_mem**)realloc(pool->idle, 2*(pool->sz_idle+1)*sizeof(casadi_mem*));
+    if (idle==0) {
+      casadi_pool_unlock(pool);
+      casadi_free(mem);
+      return;
+    }
+    pool->idle = idle;
+    pool->sz_idle = 2*(pool->sz_idle+1);
+  }
+  pool->idle[pool->n_idle++] = mem;
+  casadi_pool_unlock(pool);
+}
+#endif /* CASADI_STATIC */
+
+/* Free the idle memory structs of a pool, all others must have been released */
+#ifndef CASADI_STATIC
+inline void casadi_pool_free(casadi_pool* pool) {
+  casadi_int i;
+  assert(pool!=0);
+  for (i=0; i<pool->n_idle; ++i) casadi_free(pool->idle[i]);
+  if (pool->idle) free(pool->idle);
+  pool->idle = 0;
+  pool->n_idle = pool->sz_idle = 0;
+}
+#endif /* CASADI_STATIC */
+
 #ifdef __cplusplus
 }
 #endif
@@ -26,6 +26,8 @@
 #ifndef CASADI_SERIALIZING_STREAM_HPP
 #define CASADI_SERIALIZING_STREAM_HPP
 
+#include <map>
+#include <memory>
 #include <set>
 #include <sstream>
 #include <unordered_map>
@@ -42,6 +44,7 @@ namespace casadi {
   class SharedObject;
   class SharedObjectInternal;
   class SXNode;
+  class MappedFile;
   class UniversalNodeOwner {
   public:
     UniversalNodeOwner() = delete;
@@ -68,6 +71,12 @@ namespace casadi {
     /// Constructor
     DeserializingStream(std::istream &in_s);
 
+    /// Read from a memory-mapped file
+    DeserializingStream(const std::shared_ptr<MappedFile>& file);
+
+    /// Destructor
+    ~DeserializingStream();
+
     //@{
     /** \brief Reconstruct an object from the input stream
     *
@@ -93,13 +102,11 @@ namespace casadi {
     void unpack(std::string& e);
     void unpack(double& e);
     void unpack(char& e);
+    void unpack(std::vector<double>& e);
+    void unpack(std::vector<casadi_int>& e);
     template <class T>
     void unpack(std::vector<T>& e) {
-      assert_decoration('V');
-      casadi_int s;
-      unpack(s);
-      e.resize(s);
-      for (T& i : e) unpack(i);
+      unpack_elementwise(e);
     }
 
     template <class K, class V>
@@ -136,9 +143,41 @@ namespace casadi {
     //@}
 
     void version(const std::string& name, int v);
+    int version(const std::string& name, int min, int max);
+
+    /** \brief Reconstruct a vector of doubles, in place if possible
+     *
+     * Returns a pointer into the mapped file if the stream reads from one and
+     * was written with the "aligned" option. Otherwise, the data is copied into
+     * \a e and a pointer to its data is returned. \a n is set to the length.
+     */
+    const double* unpack_mapped(const std::string& descr, std::vector<double>& e,
+                                casadi_int& n);
+
+    /// Mapped file the stream reads from, null if none
+    const std::shared_ptr<MappedFile>& mapped_file() const { return mapped_;}
+
+    /// Protocol version the stream was written in
+    casadi_int protocol_version() const { return protocol_version_;}
 
   private:
 
+    /// Unpack a vector one element at a time
+    template <class T>
+    void unpack_elementwise(std::vector<T>& e) {
+      assert_decoration('V');
+      casadi_int s;
+      unpack(s);
+      e.resize(s);
+      for (T& i : e) unpack(i);
+    }
+
+    /// Unpack a block of n bytes with a single read per chunk
+    void unpack_block(char* c, size_t n);
+
+    /// Skip padding up to the next multiple of 8 bytes
+    void align();
+
     /* \brief Unpacks a shared object
     * 
     * Also treats SXNode, which is not actually a SharedObjectInternal
@@ -177,6 +216,19 @@ namespace casadi {
     std::istream& in;
     /// Debug mode?
     bool debug_;
+    /// Protocol version of the stream
+    casadi_int protocol_version_;
+    /// Unencoded layout with aligned blocks?
+    bool aligned_;
+    /// Compact integer coding?
+    bool compact_;
+    /// Number of bytes read so far
+    size_t read_;
+    /// Mapped file the stream reads from
+    std::shared_ptr<MappedFile> mapped_;
+    /// Decompressing buffer and the buffer of the stream it replaces
+    std::unique_ptr<std::streambuf> zbuf_;
+    std::streambuf* in_buf_;
   };
 
   /** \brief Helper class for Serialization
@@ -191,6 +243,9 @@ namespace casadi {
     SerializingStream(std::ostream& out);
     SerializingStream(std::ostream& out, const Dict& opts);
 
+    /// Destructor, ends a compressed stream
+    ~SerializingStream();
+
     // @{
     /** \brief Serializes an object to the output stream  */
     void pack(const Sparsity& e);
@@ -212,6 +267,8 @@ namespace casadi {
     void pack(double e);
     void pack(const std::string& e);
     void pack(char e);
+    void pack(const std::vector<double>& e);
+    void pack(const std::vector<casadi_int>& e);
     template <class T>
     void pack(const std::vector<T>& e) {
       decorate('V');
@@ -248,6 +305,12 @@ namespace casadi {
      */
     void decorate(char e);
 
+    /// Pack a block of n bytes with a single write per chunk
+    void pack_block(const char* c, size_t n);
+
+    /// Pad up to the next multiple of 8 bytes
+    void align();
+
     /* \brief Packs a shared object
     * 
     * Also treats SXNode, which is not actually a SharedObjectInternal
@@ -273,6 +336,17 @@ namespace casadi {
     std::ostream& out;
     /// Debug mode?
     bool debug_;
+    /// Unencoded layout with aligned blocks?
+    bool aligned_;
+    /// Compact integer coding?
+    bool compact_;
+    /// Number of bytes written so far
+    size_t written_;
+    /// Compressing buffer and the buffer of the stream it replaces
+    std::unique_ptr<std::streambuf> zbuf_;
+    std::streambuf* out_buf_;
+    /// Sparsity patterns written so far, by content
+    std::map<std::vector<casadi_int>, casadi_int> sparsity_map_;
   };
 
   template <>
@@ -25,6 +25,11 @@
 
 #include "timing.hpp"
 
+#include <algorithm>
+#include <atomic>
+#include <iomanip>
+#include <sstream>
+
 namespace casadi {
 
   using namespace std::chrono;
@@ -55,4 +60,148 @@ namespace casadi {
     n_call +=1;
   }
 
+  // Small consecutive index of the calling thread
+  static casadi_int thread_index() {
+    static std::atomic<casadi_int> n_threads(0);
+    thread_local casadi_int ind = n_threads++;
+    return ind;
+  }
+
+  // Print a string as a JSON string literal
+  static void print_json(std::ostream& stream, const std::string& str) {
+    stream << "\"";
+    for (char c : str) {
+      if (c=='"' || c=='\\') {
+        stream << '\\' << c;
+      } else if (static_cast<unsigned char>(c) < 0x20) {
+        stream << "\\u" << std::hex << std::setw(4) << std::setfill('0')
+               << static_cast<int>(c) << std::dec << std::setfill(' ');
+      } else {
+        stream << c;
+      }
+    }
+    stream << "\"";
+  }
+
+  CallProfile::CallProfile(casadi_int max_events) : max_events_(max_events) {
+    reset();
+  }
+
+  void CallProfile::reset() {
+    casadi_assert(!busy(), "Cannot reset a profile while timing a call");
+    nodes_.clear();
+    events_.clear();
+    // Root node
+    nodes_.push_back({nullptr, "", -1, {}, 0, 0, 0, 0});
+    current_ = 0;
+  }
+
+  CallProfile*& CallProfile::active() {
+    thread_local CallProfile* ret = nullptr;
+    return ret;
+  }
+
+  casadi_int CallProfile::child(casadi_int parent, const void* key, const std::string& name) {
+    for (casadi_int c : nodes_[parent].children) {
+      if (nodes_[c].key==key) return c;
+    }
+    casadi_int c = nodes_.size();
+    nodes_.push_back({key, name, parent, {}, 0, 0, 0, 0});
+    nodes_[parent].children.push_back(c);
+    return c;
+  }
+
+  void CallProfile::enter(const void* key, const std::string& name, casadi_int w_bytes) {
+    current_ = child(current_, key, name);
+    Node& n = nodes_[current_];
+    n.w_bytes = std::max(n.w_bytes, w_bytes);
+    start_.push_back(steady_clock::now());
+  }
+
+  void CallProfile::leave() {
+    time_point<steady_clock> stop = steady_clock::now();
+    time_point<steady_clock> start = start_.back();
+    start_.pop_back();
+    double t = duration<double>(stop - start).count();
+    Node& n = nodes_[current_];
+    n.n_call++;
+    n.t_wall += t;
+    nodes_[n.parent].t_children += t;
+    if (events_.size() < max_events_) {
+      events_.push_back({current_, thread_index(),
+                         duration<double, std::micro>(start.time_since_epoch()).count(), 1e6*t});
+    }
+    current_ = n.parent;
+  }
+
+  void CallProfile::merge(const CallProfile& p) {
+    casadi_assert(!p.busy(), "Cannot merge a profile while it is timing a call");
+    std::vector<casadi_int> node_map(p.nodes_.size(), -1);
+    node_map[0] = current_;
+    merge(p, 0, current_, node_map);
+    for (const Event& e : p.events_) {
+      if (events_.size() >= max_events_) break;
+      events_.push_back({node_map[e.node], e.thread, e.t_start, e.t_wall});
+    }
+  }
+
+  void CallProfile::merge(const CallProfile& p, casadi_int p_node, casadi_int node,
+                          std::vector<casadi_int>& node_map) {
+    for (casadi_int p_c : p.nodes_[p_node].children) {
+      const Node& p_n = p.nodes_[p_c];
+      casadi_int c = child(node, p_n.key, p_n.name);
+      Node& n = nodes_[c];
+      n.n_call += p_n.n_call;
+      n.t_wall += p_n.t_wall;
+      n.t_children += p_n.t_children;
+      n.w_bytes = std::max(n.w_bytes, p_n.w_bytes);
+      node_map[p_c] = c;
+      merge(p, p_c, c, node_map);
+    }
+  }
+
+  std::string CallProfile::to_json() const {
+    std::stringstream ss;
+    ss << std::setprecision(9);
+    to_json(ss, 0);
+    return ss.str();
+  }
+
+  void CallProfile::to_json(std::ostream& stream, casadi_int node) const {
+    const Node& n = nodes_[node];
+    if (node > 0) {
+      stream << "{\"name\": ";
+      print_json(stream, n.name);
+      stream << ", \"n_call\": " << n.n_call
+             << ", \"t_wall\": " << n.t_wall
+             << ", \"t_self\": " << n.t_wall - n.t_children
+             << ", \"w_bytes\": " << n.w_bytes
+             << ", \"children\": ";
+    }
+    stream << "[";
+    for (casadi_int k=0; k<n.children.size(); ++k) {
+      if (k>0) stream << ", ";
+      to_json(stream, n.children[k]);
+    }
+    stream << "]";
+    if (node > 0) stream << "}";
+  }
+
+  std::string CallProfile::to_trace() const {
+    std::stringstream ss;
+    ss << std::fixed << std::setprecision(3);
+    ss << "{\"traceEvents\": [";
+    for (casadi_int k=0; k<events_.size(); ++k) {
+      const Event& e = events_[k];
+      if (k>0) ss << ",";
+      ss << "\n{\"name\": ";
+      print_json(ss, nodes_[e.node].name);
+      ss << ", \"ph\": \"X\", \"pid\": 0, \"tid\": " << e.thread
+         << ", \"ts\": " << e.t_start << ", \"dur\": " << e.t_wall
+         << ", \"args\": {\"w_bytes\": " << nodes_[e.node].w_bytes << "}}";
+    }
+    ss << "\n], \"displayTimeUnit\": \"ms\"}";
+    return ss.str();
+  }
+
 } // namespace casadi
@@ -30,6 +30,8 @@
 
 #include <chrono>
 #include <ctime>
+#include <string>
+#include <vector>
 
 namespace casadi {
   /// \cond INTERNAL
@@ -80,6 +82,110 @@ namespace casadi {
       /// Accumulated proc time [s] since last reset
       double t_proc;
   };
+
+  /**
+  Hierarchical call tree of timed evaluations
+
+  Every node aggregates the calls of one callee along one call path. Only wall
+  time is recorded, reading the processor clock is too expensive for
+  fine-grained nested calls. Individual calls are kept as events (up to a
+  maximum number) for export in the Chrome trace-event format.
+
+  CallProfile p;
+  p.enter(f, "f", 0);
+  ....
+  p.leave();
+
+  */
+  class CASADI_EXPORT CallProfile {
+    public:
+      /// Node in the call tree
+      struct Node {
+        /// Identity of the callee
+        const void* key;
+        /// Name of the callee
+        std::string name;
+        /// Parent node, -1 for the root
+        casadi_int parent;
+        /// Child nodes
+        std::vector<casadi_int> children;
+        /// Accumulated number of calls
+        casadi_int n_call;
+        /// Accumulated wall time [s], including child calls
+        double t_wall;
+        /// Accumulated wall time [s] spent in child calls
+        double t_children;
+        /// Size of the work vectors [bytes]
+        casadi_int w_bytes;
+      };
+
+      /// A single call
+      struct Event {
+        /// Node in the call tree
+        casadi_int node;
+        /// Calling thread
+        casadi_int thread;
+        /// Start time [us]
+        double t_start;
+        /// Duration [us]
+        double t_wall;
+      };
+
+      /// Constructor
+      explicit CallProfile(casadi_int max_events=100000);
+
+      /// Clear the call tree and the events
+      void reset();
+
+      /// Start timing a call below the current node
+      void enter(const void* key, const std::string& name, casadi_int w_bytes);
+
+      /// Stop timing the current call
+      void leave();
+
+      /// Is a call being timed
+      bool busy() const { return !start_.empty();}
+
+      /// Add the calls recorded in another (idle) profile
+      void merge(const CallProfile& p);
+
+      /// Call tree as a JSON array, one element per top-level callee
+      std::string to_json() const;
+
+      /// Events in the Chrome trace-event format
+      std::string to_trace() const;
+
+      /// Nodes of the call tree, the first element is the root
+      const std::vector<Node>& nodes() const { return nodes_;}
+
+      /// Recorded events
+      const std::vector<Event>& events() const { return events_;}
+
+      /// Profile recording the evaluations of the current thread, if any
+      static CallProfile*& active();
+
+    private:
+      /// Find or add a child node
+      casadi_int child(casadi_int parent, const void* key, const std::string& name);
+
+      /// Merge the subtree of another profile
+      void merge(const CallProfile& p, casadi_int p_node, casadi_int node,
+                 std::vector<casadi_int>& node_map);
+
+      /// Print a subtree as JSON
+      void to_json(std::ostream& stream, casadi_int node) const;
+
+      /// Call tree
+      std::vector<Node> nodes_;
+
+      /// Events, at most max_events_
+      std::vector<Event> events_;
+      casadi_int max_events_;
+
+      /// Node and start time of the calls being timed
+      casadi_int current_;
+      std::vector<std::chrono::time_point<std::chrono::steady_clock> > start_;
+  };
 /// \endcond
 } // namespace casadi
 
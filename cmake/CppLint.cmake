@@ -22,6 +22,19 @@
 # Daniel's script and hacked it a bit, mostly changing paths and filters
 
 find_package(PythonInterp)
+include(ProcessorCount)
+
+# number of worker processes for cpplint.py
+ProcessorCount(CPPLINT_JOBS)
+if(CPPLINT_JOBS EQUAL 0)
+  set(CPPLINT_JOBS 1)
+endif()
+
+# lint results of unchanged files are reused from here
+set(CPPLINT_CACHE_DIR "${CMAKE_BINARY_DIR}/cpplint_cache")
+
+# socket of the cpplint.py server shared by all lint targets
+set(CPPLINT_SOCKET "${CMAKE_BINARY_DIR}/cpplint.sock")
 
 set(STYLE_FILTER)
 
@@ -80,11 +93,14 @@ function(add_style_check_target TARGET_NAME SOURCES_LIST0)# PROJECT)
     COMMAND "${CMAKE_COMMAND}" -E chdir
             "${CMAKE_CURRENT_SOURCE_DIR}"
             "${PYTHON_EXECUTABLE}"
-            "${CMAKE_SOURCE_DIR}/misc/cpplint.py"
+            "${CMAKE_SOURCE_DIR}/misc/cpplint_client.py"
+            "--socket=${CPPLINT_SOCKET}"
             "--filter=${STYLE_FILTER}"
             "--counting=detailed"
             "--extensions=cpp,hpp,h"
             "--linelength=100"
+            "--jobs=${CPPLINT_JOBS}"
+            "--cache=${CPPLINT_CACHE_DIR}"
 #            "--project=${PROJECT}"
             ${SOURCES_LIST}
     DEPENDS ${SOURCES_LIST}
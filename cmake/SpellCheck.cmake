@@ -1,5 +1,8 @@
 find_package(PythonInterp)
 
+# findings for unchanged files are reused from here
+set(SPELLCHECK_CACHE_DIR "${CMAKE_BINARY_DIR}/spellcheck_cache")
+
 function(add_spell_check_target TARGET_NAME SOURCES_LIST)# PROJECT)
 
   if(NOT PYTHONINTERP_FOUND)
@@ -15,8 +18,9 @@ function(add_spell_check_target TARGET_NAME SOURCES_LIST)# PROJECT)
             "${CMAKE_SOURCE_DIR}/misc"
             "${PYTHON_EXECUTABLE}"
             "spellcheck.py"
+            "--cache=${SPELLCHECK_CACHE_DIR}"
             ${CMAKE_CURRENT_SOURCE_DIR} ${SOURCES_LIST}
-    DEPENDS ${SOURCES_LIST}
+    DEPENDS ${SOURCES_LIST} "${CMAKE_SOURCE_DIR}/misc/casadi.dic"
     COMMENT "Spellchecking ${TARGET_NAME}"
     VERBATIM)
 
@@ -0,0 +1,108 @@
+/*
+ *
+ *    Copyright (C) 2019 Jonas Koenemann
+ *
+ *    This program is free software; you can redistribute it and/or
+ *    modify it under the terms of the GNU General Public
+ *    License as published by the Free Software Foundation; either
+ *    version 3 of the License, or (at your option) any later version.
+ *
+ *    This program is distributed in the hope that it will be useful,
+ *    but WITHOUT ANY WARRANTY; without even the implied warranty of
+ *    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ *    General Public License for more details.
+ *
+ *    You should have received a copy of the GNU General Public
+ *    License along with this program;
+ *    if not, write to the Free Software
+ *    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ */
+
+
+// Compares the orderings of the symmetric colorings on Hessian-like patterns
+// usage: benchmark_coloring [size]
+//
+// Built with "make benchmark_coloring", it is not part of the default build.
+
+#include <casadi/casadi.hpp>
+#include <algorithm>
+#include <chrono>
+#include <cstdlib>
+#include <iomanip>
+#include <iostream>
+#include <random>
+
+using namespace casadi;
+
+// Banded pattern, as in a discretized ODE
+Sparsity banded(casadi_int n) {
+  return Sparsity::banded(n, 3);
+}
+
+// Arrow pattern: block diagonal with dense last rows and columns, as with global parameters
+Sparsity arrow(casadi_int n) {
+  std::vector<casadi_int> row, col;
+  for (casadi_int k=0; k<n; ++k) {
+    for (casadi_int j=k-k%4; j<k-k%4+4 && j<n; ++j) {
+      row.push_back(k);
+      col.push_back(j);
+    }
+    for (casadi_int j=std::max(n-5, casadi_int(0)); j<n; ++j) {
+      row.push_back(k);
+      col.push_back(j);
+    }
+  }
+  Sparsity sp = Sparsity::triplet(n, n, row, col);
+  return sp + sp.T();
+}
+
+// KKT-like pattern [H, J'; J, 0] with random sparse H and J
+Sparsity kkt(casadi_int n) {
+  std::mt19937 gen(1);
+  casadi_int nx = 2*n/3, ng = n-nx;
+  std::uniform_int_distribution<casadi_int> x(0, nx-1);
+  std::vector<casadi_int> row, col;
+  for (casadi_int k=0; k<nx; ++k) {
+    row.push_back(k);
+    col.push_back(k);
+    for (casadi_int i=0; i<2; ++i) {
+      row.push_back(x(gen));
+      col.push_back(k);
+    }
+  }
+  for (casadi_int k=0; k<ng; ++k) {
+    for (casadi_int i=0; i<3; ++i) {
+      row.push_back(nx + k);
+      col.push_back(x(gen));
+    }
+  }
+  Sparsity sp = Sparsity::triplet(n, n, row, col);
+  return sp + sp.T();
+}
+
+void benchmark(const std::string& name, const Sparsity& sp) {
+  const char* orderings[] = {"auto", "none", "largest first", "smallest last",
+                             "incidence degree", "dynamic largest first"};
+  std::cout << name << ": " << sp.size2() << " columns, " << sp.nnz() << " nonzeros" << std::endl;
+  for (casadi_int ordering=-1; ordering<=4; ++ordering) {
+    auto start = std::chrono::steady_clock::now();
+    Sparsity star = sp.star_coloring(ordering);
+    auto mid = std::chrono::steady_clock::now();
+    Sparsity acyclic = sp.acyclic_coloring(ordering);
+    auto stop = std::chrono::steady_clock::now();
+    std::cout << "  " << std::left << std::setw(22) << orderings[ordering+1]
+              << "star: " << std::setw(4) << star.size2() << " colors "
+              << std::setw(10) << std::chrono::duration<double>(mid-start).count() << " s   "
+              << "acyclic: " << std::setw(4) << acyclic.size2() << " colors "
+              << std::chrono::duration<double>(stop-mid).count() << " s" << std::endl;
+  }
+}
+
+int main(int argc, char** argv) {
+  casadi_int n = argc>1 ? std::atol(argv[1]) : 10000;
+  benchmark("banded", banded(n));
+  benchmark("arrow", arrow(n));
+  benchmark("kkt", kkt(n));
+  return 0;
+}
@@ -0,0 +1,95 @@
+/*
+ *
+ *    Copyright (C) 2019 Jonas Koenemann
+ *
+ *    This program is free software; you can redistribute it and/or
+ *    modify it under the terms of the GNU General Public
+ *    License as published by the Free Software Foundation; either
+ *    version 3 of the License, or (at your option) any later version.
+ *
+ *    This program is distributed in the hope that it will be useful,
+ *    but WITHOUT ANY WARRANTY; without even the implied warranty of
+ *    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ *    General Public License for more details.
+ *
+ *    You should have received a copy of the GNU General Public
+ *    License along with this program;
+ *    if not, write to the Free Software
+ *    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ */
+
+
+// Compares the interpreters of SXFunction for numerical evaluation
+// usage: benchmark_sx_interpreter [number of nodes] [number of evaluations]
+//
+// Built with "make benchmark_sx_interpreter", it is not part of the default build.
+
+#include <casadi/casadi.hpp>
+#include <chrono>
+#include <cstdlib>
+#include <iostream>
+
+using namespace casadi;
+
+// Mix of cheap operations, as in a discretized dynamic system, with some sines
+SX expression(const SX& x, casadi_int n_nodes) {
+  std::vector<SXElem> s = x.nonzeros();
+  casadi_int n = s.size();
+  for (casadi_int k=0; s.size()<n_nodes/2; ++k) {
+    SXElem a = s[s.size()-n];
+    SXElem b = s[s.size()-n+1];
+    switch (k % 4) {
+      case 0: s.push_back(a*b + 0.5); break;
+      case 1: s.push_back(a - 0.1*b); break;
+      case 2: s.push_back(sq(a) + b); break;
+      default: s.push_back(sin(a)*b);
+    }
+  }
+  return SX(std::vector<SXElem>(s.end()-n, s.end()));
+}
+
+// Seconds per evaluation
+double timing(const Function& f, const std::vector<double>& x, std::vector<double>& r,
+              casadi_int n_eval) {
+  std::vector<const double*> arg(f.sz_arg(), nullptr);
+  std::vector<double*> res(f.sz_res(), nullptr);
+  std::vector<casadi_int> iw(f.sz_iw());
+  std::vector<double> w(f.sz_w());
+  arg[0] = x.data();
+  res[0] = r.data();
+  casadi_int mem = f.checkout();
+  auto start = std::chrono::steady_clock::now();
+  for (casadi_int i=0; i<n_eval; ++i) {
+    f(arg.data(), res.data(), iw.data(), w.data(), mem);
+  }
+  auto stop = std::chrono::steady_clock::now();
+  f.release(mem);
+  return std::chrono::duration<double>(stop-start).count()/n_eval;
+}
+
+int main(int argc, char** argv) {
+  casadi_int n_nodes = argc>1 ? std::atol(argv[1]) : 1000000;
+  casadi_int n_eval = argc>2 ? std::atol(argv[2]) : 20;
+
+  SX x = SX::sym("x", 100);
+  SX y = expression(x, n_nodes);
+  std::vector<double> x0(x.nnz());
+  for (casadi_int i=0; i<x0.size(); ++i) x0[i] = 0.01*static_cast<double>(i);
+
+  std::vector<double> r_switch(y.nnz()), r_bytecode(y.nnz());
+  Function f_switch("f", {x}, {y}, {{"interpreter", "switch"}});
+  Function f_bytecode("f", {x}, {y}, {{"interpreter", "bytecode"}});
+  std::cout << f_switch.n_instructions() << " instructions" << std::endl;
+
+  double t_switch = timing(f_switch, x0, r_switch, n_eval);
+  double t_bytecode = timing(f_bytecode, x0, r_bytecode, n_eval);
+  std::cout << "switch:   " << t_switch << " s" << std::endl;
+  std::cout << "bytecode: " << t_bytecode << " s (" << t_switch/t_bytecode << "x)" << std::endl;
+
+  if (r_switch!=r_bytecode) {
+    std::cerr << "Results differ" << std::endl;
+    return 1;
+  }
+  return 0;
+}
@@ -46,22 +46,33 @@ same line, but it is far from perfect (in either direction).
 """
 
 import codecs
+import collections
 import copy
 import getopt
+import hashlib
+import json
 import math  # for log
+import multiprocessing
 import os
 import re
+import signal
+import socket
 import sre_compile
 import string
+import StringIO
 import sys
+import tempfile
+import timeit
 import unicodedata
 
 
 _USAGE = """
 Syntax: cpplint.py [--verbose=#] [--output=vs7] [--filter=-x,+y,...]
                    [--counting=total|toplevel|detailed] [--root=subdir]
-                   [--linelength=digits]
+                   [--linelength=digits] [--jobs=#] [--cache=dir]
+                   [--profile=file]
         <file> [file] ...
+        cpplint.py --server=socket
 
   The style guidelines this tries to follow are those in
     http://google-styleguide.googlecode.com/svn/trunk/cppguide.xml
@@ -137,6 +148,42 @@ Syntax: cpplint.py [--verbose=#] [--output=vs7] [--filter=-x,+y,...]
 
       Examples:
         --extensions=hpp,cpp
+
+    jobs=#
+      Number of worker processes used to lint the files.  The default is 1,
+      i.e. all files are linted in the main process.  Output is always
+      reported in the order in which the files were given.
+
+      Examples:
+        --jobs=8
+
+    cache=dir
+      Directory where the results of linting a file are stored.  Results are
+      keyed by the file name, its contents and the settings above, so a file
+      that did not change since the last run is not linted again and its
+      previous result is reported instead.
+
+      Examples:
+        --cache=build/cpplint_cache
+
+    profile=file
+      Measure the time spent in the individual checks.  When all files are
+      linted, a summary sorted by cumulative time is printed, and the time and
+      number of calls per check and per file are written to file as JSON.
+      Files whose result is taken from the cache are not profiled.
+
+      Examples:
+        --profile=cpplint_profile.json
+
+  Server mode:
+
+    server=socket
+      Instead of linting, serve lint requests on the given Unix socket, so
+      that the module does not need to be loaded for every run.  Each request
+      is linted in a forked process, with the flags and files of the request.
+      The server exits when it has been idle for a while or when this script
+      changes.  Requests are sent by misc/cpplint_client.py, which takes the
+      same arguments as this script and starts the server if needed.
 """
 
 # We categorize each error message we print.  Here are the categories.
@@ -455,6 +502,27 @@ _line_length = 80
 # This is set by --extensions flag.
 _valid_extensions = set(['cc', 'h', 'cpp', 'cu', 'cuh'])
 
+# The number of worker processes used to lint files.
+# This is set by --jobs flag.
+_jobs = 1
+
+# The directory holding cached lint results, or None to disable caching.
+# This is set by --cache flag.
+_cache_dir = None
+
+# Bump this whenever the format of a cache entry changes.
+_CACHE_VERSION = 1
+
+# The file to which check timings are written, or None to disable profiling.
+# This is set by --profile flag.
+_profile_file = None
+
+# The _CheckProfiler collecting check timings while profiling is enabled.
+_check_profiler = None
+
+# Seconds without requests after which the server mode exits.
+_SERVER_IDLE_TIMEOUT = 900
+
 def ParseNolintSuppressions(filename, raw_line, linenum, error):
   """Updates the global list of error-suppressions.
 
@@ -684,6 +752,8 @@ class _CppLintState(object):
     self.error_count = 0    # global count of reported errors
     # filters to apply when emitting error messages
     self.filters = _DEFAULT_FILTERS[:]
+    # number of times a category was matched against all filters
+    self.filter_evaluations = 0
     self.counting = 'total'  # In what way are we counting errors?
     self.errors_by_category = {}  # string to int dict storing error counts
 
@@ -692,6 +762,18 @@ class _CppLintState(object):
     # "vs7" - format that Microsoft Visual Studio 7 can parse
     self.output_format = 'emacs'
 
+  @property
+  def filters(self):
+    """The error-message filters, as a list."""
+    return self._filters
+
+  @filters.setter
+  def filters(self, filters):
+    self._filters = filters
+    # Whether a category is filtered out, memoized per category.  Cleared
+    # whenever the filters change.
+    self._category_filtered = {}
+
   def SetOutputFormat(self, output_format):
     """Sets the output format for errors."""
     self.output_format = output_format
@@ -721,15 +803,47 @@ class _CppLintState(object):
                   E.g. "-,+whitespace,-whitespace/indent,whitespace/badfilter"
     """
     # Default filters always have less priority than the flag ones.
-    self.filters = _DEFAULT_FILTERS[:]
+    new_filters = _DEFAULT_FILTERS[:]
     for filt in filters.split(','):
       clean_filt = filt.strip()
       if clean_filt:
-        self.filters.append(clean_filt)
-    for filt in self.filters:
+        new_filters.append(clean_filt)
+    for filt in new_filters:
       if not (filt.startswith('+') or filt.startswith('-')):
         raise ValueError('Every filter in --filters must start with + or -'
                          ' (%s does not)' % filt)
+    self.filters = new_filters
+
+  def IsFiltered(self, category):
+    """Returns whether the filters suppress errors of the given category.
+
+    The filters are only evaluated the first time a category is seen, later
+    calls are a dictionary lookup.
+
+    Args:
+      category: The category of an error, e.g. "whitespace/indent".
+
+    Returns:
+      True if errors of this category should not be printed.
+    """
+    try:
+      return self._category_filtered[category]
+    except KeyError:
+      pass
+
+    self.filter_evaluations += 1
+    is_filtered = False
+    for one_filter in self._filters:
+      if one_filter.startswith('-'):
+        if category.startswith(one_filter[1:]):
+          is_filtered = True
+      elif one_filter.startswith('+'):
+        if category.startswith(one_filter[1:]):
+          is_filtered = False
+      else:
+        assert False  # should have been checked for in SetFilter.
+    self._category_filtered[category] = is_filtered
+    return is_filtered
 
   def ResetErrorCounts(self):
     """Sets the module's error statistic back to zero."""
@@ -746,6 +860,20 @@ class _CppLintState(object):
         self.errors_by_category[category] = 0
       self.errors_by_category[category] += 1
 
+  def MergeErrorCounts(self, error_count, errors_by_category):
+    """Adds error statistics collected elsewhere, e.g. by a worker process.
+
+    Args:
+      error_count: The number of errors reported.
+      errors_by_category: A list of (category, count) pairs, in the order in
+                          which the categories were first encountered.
+    """
+    self.error_count += error_count
+    for category, count in errors_by_category:
+      if category not in self.errors_by_category:
+        self.errors_by_category[category] = 0
+      self.errors_by_category[category] += count
+
   def PrintErrorCounts(self):
     """Print a summary of errors by category, and the total."""
     for category, count in self.errors_by_category.iteritems():
@@ -800,6 +928,11 @@ def _SetFilters(filters):
   _cpplint_state.SetFilters(filters)
 
 
+def _FilterEvaluations():
+  """Returns how often a category was matched against the filters."""
+  return _cpplint_state.filter_evaluations
+
+
 class _FunctionState(object):
   """Tracks current function name and the number of lines in its body."""
 
@@ -962,17 +1095,7 @@ def _ShouldPrintError(category, confidence, linenum):
   if confidence < _cpplint_state.verbose_level:
     return False
 
-  is_filtered = False
-  for one_filter in _Filters():
-    if one_filter.startswith('-'):
-      if category.startswith(one_filter[1:]):
-        is_filtered = True
-    elif one_filter.startswith('+'):
-      if category.startswith(one_filter[1:]):
-        is_filtered = False
-    else:
-      assert False  # should have been checked for in SetFilter.
-  if is_filtered:
+  if _cpplint_state.IsFiltered(category):
     return False
 
   return True
@@ -1075,37 +1198,7 @@ def CleanseRawStrings(raw_lines):
   delimiter = None
   lines_without_raw_strings = []
   for line in raw_lines:
-    if delimiter:
-      # Inside a raw string, look for the end
-      end = line.find(delimiter)
-      if end >= 0:
-        # Found the end of the string, match leading space for this
-        # line and resume copying the original lines, and also insert
-        # a "" on the last line.
-        leading_space = Match(r'^(\s*)\S', line)
-        line = leading_space.group(1) + '""' + line[end + len(delimiter):]
-        delimiter = None
-      else:
-        # Haven't found the end yet, append a blank line.
-        line = ''
-
-    else:
-      # Look for beginning of a raw string.
-      # See 2.14.15 [lex.string] for syntax.
-      matched = Match(r'^(.*)\b(?:R|u8R|uR|UR|LR)"([^\s\\()]*)\((.*)$', line)
-      if matched:
-        delimiter = ')' + matched.group(2) + '"'
-
-        end = matched.group(3).find(delimiter)
-        if end >= 0:
-          # Raw string ended on same line
-          line = (matched.group(1) + '""' +
-                  matched.group(3)[end + len(delimiter):])
-          delimiter = None
-        else:
-          # Start of a multi-line raw string
-          line = matched.group(1) + '""'
-
+    (line, delimiter) = _CleanseRawStringsInLine(line, delimiter)
     lines_without_raw_strings.append(line)
 
   # TODO(unknown): if delimiter is not None here, we might want to
@@ -1113,6 +1206,52 @@ def CleanseRawStrings(raw_lines):
   return lines_without_raw_strings
 
 
+def _CleanseRawStringsInLine(line, delimiter):
+  """Removes C++11 raw strings from a single line.
+
+  Args:
+    line: A raw line.
+    delimiter: The delimiter ending the raw string the line starts in, or
+               None if the line does not start inside a raw string.
+
+  Returns:
+    A tuple (line, delimiter) with the cleansed line and the delimiter of the
+    raw string that continues on the next line, if any.
+  """
+  if delimiter:
+    # Inside a raw string, look for the end
+    end = line.find(delimiter)
+    if end >= 0:
+      # Found the end of the string, match leading space for this
+      # line and resume copying the original lines, and also insert
+      # a "" on the last line.
+      leading_space = Match(r'^(\s*)\S', line)
+      line = leading_space.group(1) + '""' + line[end + len(delimiter):]
+      delimiter = None
+    else:
+      # Haven't found the end yet, append a blank line.
+      line = ''
+
+  elif 'R"' in line:
+    # Look for beginning of a raw string.
+    # See 2.14.15 [lex.string] for syntax.
+    matched = Match(r'^(.*)\b(?:R|u8R|uR|UR|LR)"([^\s\\()]*)\((.*)$', line)
+    if matched:
+      delimiter = ')' + matched.group(2) + '"'
+
+      end = matched.group(3).find(delimiter)
+      if end >= 0:
+        # Raw string ended on same line
+        line = (matched.group(1) + '""' +
+                matched.group(3)[end + len(delimiter):])
+        delimiter = None
+      else:
+        # Start of a multi-line raw string
+        line = matched.group(1) + '""'
+
+  return (line, delimiter)
+
+
 def FindNextMultiLineCommentStart(lines, lineix):
   """Find the beginning marker for a multiline comment."""
   while lineix < len(lines):
@@ -1170,6 +1309,8 @@ def CleanseComments(line):
   if commentpos != -1 and not IsCppString(line[:commentpos]):
     line = line[:commentpos].rstrip()
   # get rid of /* ... */
+  if '/*' not in line:
+    return line
   return _RE_PATTERN_CLEANSE_LINE_C_COMMENTS.sub('', line)
 
 
@@ -1187,12 +1328,23 @@ class CleansedLines(object):
     self.lines = []
     self.raw_lines = lines
     self.num_lines = len(lines)
-    self.lines_without_raw_strings = CleanseRawStrings(lines)
-    for linenum in range(len(self.lines_without_raw_strings)):
-      self.lines.append(CleanseComments(
-          self.lines_without_raw_strings[linenum]))
-      elided = self._CollapseStrings(self.lines_without_raw_strings[linenum])
-      self.elided.append(CleanseComments(elided))
+    self.lines_without_raw_strings = []
+    # All views are built in a single pass over the lines.  This is
+    # equivalent to CleanseRawStrings followed by CleanseComments and
+    # _CollapseStrings on every line, but skips the work that cannot change
+    # a line, e.g. collapsing strings on a line without quotes.
+    delimiter = None
+    for line in lines:
+      (line, delimiter) = _CleanseRawStringsInLine(line, delimiter)
+      self.lines_without_raw_strings.append(line)
+      cleansed = CleanseComments(line) if '/' in line else line
+      self.lines.append(cleansed)
+      elided = self._CollapseStrings(line)
+      if elided is line:
+        self.elided.append(cleansed)
+      else:
+        self.elided.append(CleanseComments(elided) if '/' in elided
+                           else elided)
 
   def NumLines(self):
     """Returns the number of lines represented."""
@@ -1210,12 +1362,18 @@ class CleansedLines(object):
     Returns:
       The line with collapsed strings.
     """
-    if not _RE_PATTERN_INCLUDE.match(elided):
-      # Remove escaped characters first to make quote/single quote collapsing
-      # basic.  Things that look like escaped characters shouldn't occur
-      # outside of strings and chars.
+    # Each substitution is only attempted if the line contains the character
+    # its pattern starts with, which avoids most regexp calls.
+    if '#' in elided and _RE_PATTERN_INCLUDE.match(elided):
+      return elided
+    # Remove escaped characters first to make quote/single quote collapsing
+    # basic.  Things that look like escaped characters shouldn't occur
+    # outside of strings and chars.
+    if '\\' in elided:
       elided = _RE_PATTERN_CLEANSE_LINE_ESCAPES.sub('', elided)
+    if "'" in elided:
       elided = _RE_PATTERN_CLEANSE_LINE_SINGLE_QUOTES.sub("''", elided)
+    if '"' in elided:
       elided = _RE_PATTERN_CLEANSE_LINE_DOUBLE_QUOTES.sub('""', elided)
     return elided
 
@@ -4344,32 +4502,87 @@ def FilesBelongToSameModule(filename_cc, filename_h):
   return files_belong_to_same_module, common_path
 
 
-def UpdateIncludeState(filename, include_state, io=codecs):
-  """Fill up the include_state with new includes found from the file.
+# Maximum number of headers whose includes are kept by _CachedHeaderIncludes.
+_HEADER_INCLUDES_CACHE_SIZE = 1024
+
+# {(filename, mtime): [(include, linenum)]}, least recently used first.
+_header_includes_cache = collections.OrderedDict()
+
+
+def _ReadHeaderIncludes(filename, io=codecs):
+  """Returns the includes found in a header.
 
   Args:
     filename: the name of the header to read.
-    include_state: an _IncludeState instance in which the headers are inserted.
     io: The io factory to use to read the file. Provided for testability.
 
   Returns:
-    True if a header was succesfully added. False otherwise.
+    A list of (include, linenum) tuples, or None if the header cannot be read.
   """
   headerfile = None
   try:
     headerfile = io.open(filename, 'r', 'utf8', 'replace')
   except IOError:
-    return False
+    return None
+  includes = []
   linenum = 0
   for line in headerfile:
     linenum += 1
     clean_line = CleanseComments(line)
     match = _RE_PATTERN_INCLUDE.search(clean_line)
     if match:
-      include = match.group(2)
-      # The value formatting is cute, but not really used right now.
-      # What matters here is that the key is in include_state.
-      include_state.setdefault(include, '%s:%d' % (filename, linenum))
+      includes.append((match.group(2), linenum))
+  return includes
+
+
+def _CachedHeaderIncludes(filename):
+  """Like _ReadHeaderIncludes, but reads every version of a header only once.
+
+  Headers are identified by their name and modification time, and the
+  _HEADER_INCLUDES_CACHE_SIZE most recently used ones are kept.
+
+  Args:
+    filename: the name of the header to read.
+
+  Returns:
+    A list of (include, linenum) tuples, or None if the header cannot be read.
+  """
+  try:
+    key = (filename, os.path.getmtime(filename))
+  except OSError:
+    return None
+  includes = _header_includes_cache.pop(key, None)
+  if includes is None:
+    includes = _ReadHeaderIncludes(filename)
+    if includes is None:
+      return None
+  _header_includes_cache[key] = includes
+  if len(_header_includes_cache) > _HEADER_INCLUDES_CACHE_SIZE:
+    _header_includes_cache.popitem(last=False)
+  return includes
+
+
+def UpdateIncludeState(filename, include_state, io=codecs):
+  """Fill up the include_state with new includes found from the file.
+
+  Args:
+    filename: the name of the header to read.
+    include_state: an _IncludeState instance in which the headers are inserted.
+    io: The io factory to use to read the file. Provided for testability.
+
+  Returns:
+    True if a header was succesfully added. False otherwise.
+  """
+  if io is codecs:
+    includes = _CachedHeaderIncludes(filename)
+  else:
+    includes = _ReadHeaderIncludes(filename, io)
+  if includes is None:
+    return False
+  for include, linenum in includes:
+    # The value formatting is cute, but not really used right now.
+    # What matters here is that the key is in include_state.
+    include_state.setdefault(include, '%s:%d' % (filename, linenum))
   return True
 
 
@@ -4490,6 +4703,128 @@ def CheckMakePairUsesDeduction(filename, clean_lines, linenum, error):
           ' OR use pair directly OR if appropriate, construct a pair directly')
 
 
+# The checks whose time is measured by _CheckProfiler.  These are the checks
+# called directly by ProcessLine and ProcessFileData.
+_PROFILED_CHECKS = [
+    'CheckForCopyright',
+    'CheckForHeaderGuard',
+    'RemoveMultiLineComments',
+    'ParseNolintSuppressions',
+    'CheckForFunctionLengths',
+    'CheckForMultilineCommentsAndStrings',
+    'CheckStyle',
+    'CheckLanguage',
+    'CheckForNonConstReference',
+    'CheckForNonStandardConstructs',
+    'CheckVlogArguments',
+    'CheckPosixThreading',
+    'CheckInvalidIncrement',
+    'CheckMakePairUsesDeduction',
+    'CheckForIncludeWhatYouUse',
+    'CheckForBadCharacters',
+    'CheckForNewlineAtEOF',
+    ]
+
+
+class _CheckProfiler(object):
+  """Measures the cumulative time and number of calls of each check.
+
+  Timings are collected for the file currently being linted and are moved to
+  the per-file statistics by EndFile.
+  """
+
+  def __init__(self):
+    # check name to [calls, seconds], for the file being linted
+    self.current = {}
+    # file name to a dict of check name to [calls, seconds]
+    self.files = {}
+
+  def Wrap(self, check_fn, name=None):
+    """Returns check_fn with the time spent in it recorded under name."""
+    if name is None:
+      name = check_fn.__name__
+    current = self.current
+
+    def ProfiledCheck(*args, **kwargs):
+      start = timeit.default_timer()
+      try:
+        return check_fn(*args, **kwargs)
+      finally:
+        stats = current.setdefault(name, [0, 0.0])
+        stats[0] += 1
+        stats[1] += timeit.default_timer() - start
+
+    ProfiledCheck.__name__ = check_fn.__name__
+    return ProfiledCheck
+
+  def EndFile(self):
+    """Returns the timings of the file just linted, and resets them.
+
+    Returns:
+      A list of (check name, calls, seconds) tuples.
+    """
+    stats = [(name, calls, seconds)
+             for name, (calls, seconds) in self.current.iteritems()]
+    self.current.clear()
+    return stats
+
+  def AddFile(self, filename, stats):
+    """Adds the timings returned by EndFile, possibly in another process."""
+    file_stats = self.files.setdefault(filename, {})
+    for name, calls, seconds in stats:
+      entry = file_stats.setdefault(name, [0, 0.0])
+      entry[0] += calls
+      entry[1] += seconds
+
+  def CheckTotals(self):
+    """Returns a dict of check name to [calls, seconds] over all files."""
+    totals = {}
+    for file_stats in self.files.itervalues():
+      for name, (calls, seconds) in file_stats.iteritems():
+        entry = totals.setdefault(name, [0, 0.0])
+        entry[0] += calls
+        entry[1] += seconds
+    return totals
+
+  def PrintReport(self, max_files=10):
+    """Prints the checks and the slowest files, sorted by cumulative time."""
+    totals = self.CheckTotals()
+    sys.stderr.write('Check profile (cumulative seconds, calls, check):\n')
+    for name, (calls, seconds) in sorted(totals.iteritems(),
+                                         key=lambda x: -x[1][1]):
+      sys.stderr.write('%10.3f %10d  %s\n' % (seconds, calls, name))
+    file_times = [(sum(seconds for (calls, seconds) in stats.itervalues()),
+                   filename) for filename, stats in self.files.iteritems()]
+    file_times.sort(reverse=True)
+    sys.stderr.write('Slowest files (cumulative seconds, file):\n')
+    for seconds, filename in file_times[:max_files]:
+      sys.stderr.write('%10.3f  %s\n' % (seconds, filename))
+
+  def WriteJson(self, filename):
+    """Writes the timings per check and per file to a JSON file."""
+    def ToDict(stats):
+      return dict((name, {'calls': calls, 'seconds': seconds})
+                  for name, (calls, seconds) in stats.iteritems())
+    with open(filename, 'w') as f:
+      json.dump({'checks': ToDict(self.CheckTotals()),
+                 'files': dict((name, ToDict(stats))
+                               for name, stats in self.files.iteritems())},
+                f, indent=2, sort_keys=True)
+
+
+def _EnableCheckProfiler():
+  """Starts measuring the time spent in the checks of _PROFILED_CHECKS."""
+  global _check_profiler
+  if _check_profiler:
+    return
+  _check_profiler = _CheckProfiler()
+  module = globals()
+  for name in _PROFILED_CHECKS:
+    module[name] = _check_profiler.Wrap(module[name])
+  _NestingState.Update = _check_profiler.Wrap(_NestingState.Update.im_func,
+                                              '_NestingState.Update')
+
+
 def ProcessLine(filename, file_extension, clean_lines, line,
                 include_state, function_state, nesting_state, error,
                 extra_check_functions=[]):
@@ -4549,6 +4884,10 @@ def ProcessFileData(filename, file_extension, lines, error,
   lines = (['// marker so line numbers and indices both start at 1'] + lines +
            ['// marker so line numbers end in a known way'])
 
+  if _check_profiler:
+    extra_check_functions = [_check_profiler.Wrap(check_fn)
+                             for check_fn in extra_check_functions]
+
   include_state = _IncludeState()
   function_state = _FunctionState()
   nesting_state = _NestingState()
@@ -4645,6 +4984,331 @@ def ProcessFile(filename, vlevel, extra_check_functions=[]):
   # sys.stderr.write('Done processing %s\n' % filename)
 
 
+def _LintSettings():
+  """Returns the module settings that influence the result of linting a file.
+
+  Returns:
+    A dict that can be passed to _ApplyLintSettings, e.g. in a worker process.
+  """
+  return {
+      'verbose_level': _cpplint_state.verbose_level,
+      'filters': _cpplint_state.filters,
+      'counting': _cpplint_state.counting,
+      'output_format': _cpplint_state.output_format,
+      'root': _root,
+      'line_length': _line_length,
+      'valid_extensions': sorted(_valid_extensions),
+      'cache_dir': _cache_dir,
+      'profile': _check_profiler is not None,
+      }
+
+
+def _ApplyLintSettings(settings):
+  """Restores module settings returned by _LintSettings."""
+  global _root, _line_length, _valid_extensions, _cache_dir
+  _cpplint_state.verbose_level = settings['verbose_level']
+  _cpplint_state.filters = settings['filters']
+  _cpplint_state.counting = settings['counting']
+  _cpplint_state.output_format = settings['output_format']
+  _root = settings['root']
+  _line_length = settings['line_length']
+  _valid_extensions = set(settings['valid_extensions'])
+  _cache_dir = settings['cache_dir']
+  if settings['profile']:
+    _EnableCheckProfiler()
+
+
+def _InitLintWorker(settings, header_includes):
+  """Prepares a worker process of ProcessFiles.
+
+  Args:
+    settings: The module settings, as returned by _LintSettings.
+    header_includes: A snapshot of the parsed headers, as a list of items of
+                     _header_includes_cache.
+  """
+  _ApplyLintSettings(settings)
+  for key, includes in header_includes:
+    _header_includes_cache[key] = includes
+
+
+def _CacheKey(filename):
+  """Returns the key under which the lint result of a file is cached.
+
+  The key covers the linter itself, the settings, the file name (header guards
+  depend on it), the file contents and the contents of the headers of the same
+  module, which build/include_what_you_use reads as well.
+
+  Args:
+    filename: The name of the file to lint.
+
+  Returns:
+    A hex digest, or None if the file cannot be cached.
+  """
+  if filename == '-':
+    return None
+  try:
+    with open(filename, 'rb') as f:
+      data = f.read()
+    with open(os.path.splitext(os.path.abspath(__file__))[0] + '.py',
+              'rb') as f:
+      linter = f.read()
+  except IOError:
+    return None
+  settings = _LintSettings()
+  del settings['cache_dir']
+  del settings['profile']
+  digest = hashlib.sha1()
+  digest.update(json.dumps([_CACHE_VERSION, settings], sort_keys=True))
+  digest.update(hashlib.sha1(linter).hexdigest())
+  digest.update(os.path.abspath(filename))
+  digest.update(data)
+  abs_filename = re.sub(r'_flymake\.cc$', '.cc', FileInfo(filename).FullName())
+  for line in data.splitlines():
+    match = _RE_PATTERN_INCLUDE.match(line)
+    if not match:
+      continue
+    header = match.group(2)
+    (same_module, common_path) = FilesBelongToSameModule(abs_filename, header)
+    if not same_module:
+      continue
+    digest.update(common_path + header)
+    try:
+      with open(common_path + header, 'rb') as f:
+        digest.update(hashlib.sha1(f.read()).hexdigest())
+    except IOError:
+      digest.update('-')
+  return digest.hexdigest()
+
+
+def _ReadCacheEntry(key):
+  """Returns a cached lint result, or None if there is none."""
+  try:
+    with open(os.path.join(_cache_dir, key + '.json'), 'r') as f:
+      entry = json.load(f)
+  except (IOError, ValueError):
+    return None
+  return (entry['output'], entry['error_count'], entry['errors_by_category'],
+          [])
+
+
+def _WriteCacheEntry(key, result):
+  """Stores a lint result in the cache, ignoring failures."""
+  output, error_count, errors_by_category, _ = result
+  try:
+    if not os.path.isdir(_cache_dir):
+      os.makedirs(_cache_dir)
+    # Write to a temporary file first so that concurrent runs never see
+    # partially written entries.
+    (fd, tmpname) = tempfile.mkstemp(dir=_cache_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+      json.dump({'output': output,
+                 'error_count': error_count,
+                 'errors_by_category': errors_by_category}, f)
+    os.rename(tmpname, os.path.join(_cache_dir, key + '.json'))
+  except (IOError, OSError):
+    pass
+
+
+def _LintFile(filename):
+  """Lints a single file, collecting its output instead of printing it.
+
+  Args:
+    filename: The name of the file to lint.
+
+  Returns:
+    A tuple (output, error_count, errors_by_category, profile), where output
+    is the text that linting wrote to stderr, errors_by_category is a list of
+    (category, count) pairs in the order the categories were encountered and
+    profile holds the check timings if profiling is enabled.
+  """
+  key = _CacheKey(filename) if _cache_dir else None
+  if key:
+    result = _ReadCacheEntry(key)
+    if result:
+      return result
+
+  saved_stderr = sys.stderr
+  saved_counts = (_cpplint_state.error_count,
+                  _cpplint_state.errors_by_category)
+  sys.stderr = StringIO.StringIO()
+  _cpplint_state.ResetErrorCounts()
+  # Keep track of the order in which categories appear so that merging the
+  # counts reproduces the summary of a serial run.
+  _cpplint_state.errors_by_category = collections.OrderedDict()
+  try:
+    ProcessFile(filename, _cpplint_state.verbose_level)
+    result = (sys.stderr.getvalue(), _cpplint_state.error_count,
+              _cpplint_state.errors_by_category.items(),
+              _check_profiler.EndFile() if _check_profiler else [])
+  finally:
+    sys.stderr = saved_stderr
+    (_cpplint_state.error_count,
+     _cpplint_state.errors_by_category) = saved_counts
+
+  if key:
+    _WriteCacheEntry(key, result)
+  return result
+
+
+def ProcessFiles(filenames):
+  """Lints a list of files, possibly in parallel and using the cache.
+
+  Errors are reported in the order of filenames, and are added to the
+  module's error statistics.
+
+  Args:
+    filenames: The names of the files to lint.
+  """
+  if _jobs > 1 and len(filenames) > 1:
+    # Parse the headers being linted up front and hand them to the workers,
+    # so that they are not read again for every file implementing them.
+    # Only build/include_what_you_use reads them; if it is filtered out, the
+    # workers parse whatever else they need lazily.
+    if not _cpplint_state.IsFiltered('build/include_what_you_use'):
+      for filename in filenames:
+        if filename.endswith('.h'):
+          _CachedHeaderIncludes(FileInfo(filename).FullName())
+    pool = multiprocessing.Pool(min(_jobs, len(filenames)), _InitLintWorker,
+                                (_LintSettings(),
+                                 _header_includes_cache.items()))
+    results = pool.imap(_LintFile, filenames)
+  else:
+    pool = None
+    results = (_LintFile(filename) for filename in filenames)
+
+  try:
+    for filename, result in zip(filenames, results):
+      output, error_count, errors_by_category, profile = result
+      sys.stderr.write(output)
+      _cpplint_state.MergeErrorCounts(error_count, errors_by_category)
+      if profile:
+        _check_profiler.AddFile(filename, profile)
+  finally:
+    if pool:
+      pool.close()
+      pool.join()
+
+
+
+def _SendMessage(conn, message):
+  """Sends a JSON message, terminated by a newline, over a socket."""
+  conn.sendall(json.dumps(message) + '\n')
+
+
+class _SocketStream(object):
+  """A file-like object forwarding everything written as server messages."""
+
+  def __init__(self, conn):
+    self._conn = conn
+
+  def write(self, text):
+    if text:
+      _SendMessage(self._conn, {'stderr': text})
+
+  def flush(self):
+    pass
+
+
+def _BindServerSocket(socket_path):
+  """Returns a socket listening on socket_path.
+
+  Returns:
+    The socket, or None if another server is already listening on the path.
+  """
+  server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  try:
+    server.bind(socket_path)
+  except socket.error:
+    # The socket file exists.  Remove it, unless a server is still using it.
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+      probe.connect(socket_path)
+      server.close()
+      return None
+    except socket.error:
+      os.unlink(socket_path)
+      server.bind(socket_path)
+    finally:
+      probe.close()
+  server.listen(16)
+  return server
+
+
+def _ServeRequest(conn):
+  """Lints the files of one request, in a process forked by RunServer.
+
+  The request is a JSON object with the working directory ('cwd') and the
+  command line arguments ('args').  The output is sent back as 'stderr'
+  messages, followed by an 'exit' message with the exit status.
+
+  Args:
+    conn: The socket connected to the client.
+  """
+  request = json.loads(conn.makefile('r').readline())
+  os.chdir(request['cwd'])
+  sys.argv = [sys.argv[0]] + request['args']
+  sys.stderr = _SocketStream(conn)
+  try:
+    _LintMain(request['args'])
+    status = 0
+  except SystemExit as e:
+    status = e.code
+  # sys.exit is also called with a message, e.g. by PrintUsage
+  if isinstance(status, basestring):
+    sys.stderr.write(status + '\n')
+    status = 1
+  _SendMessage(conn, {'exit': int(status or 0)})
+
+
+def RunServer(socket_path):
+  """Serves lint requests on a Unix socket.
+
+  The module, with all its compiled regular expressions, is loaded once and
+  every request is handled by a forked copy of this process, so requests
+  cannot affect each other's settings.
+
+  Args:
+    socket_path: The path of the Unix socket to listen on.
+  """
+  server = _BindServerSocket(socket_path)
+  if not server:
+    return
+  script = os.path.abspath(__file__)
+  script_mtime = os.path.getmtime(script)
+  # Forked children are reaped automatically.
+  signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+  server.settimeout(_SERVER_IDLE_TIMEOUT)
+  stale_conn = None
+  try:
+    while True:
+      try:
+        (conn, _) = server.accept()
+      except socket.timeout:
+        break
+      conn.settimeout(None)
+      if os.path.getmtime(script) != script_mtime:
+        stale_conn = conn
+        break
+      if os.fork() == 0:
+        server.close()
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        try:
+          _ServeRequest(conn)
+        finally:
+          conn.close()
+          os._exit(0)
+      conn.close()
+  finally:
+    os.unlink(socket_path)
+    server.close()
+
+  if stale_conn:
+    # The socket is released, so the client can now start a server running
+    # the changed script.
+    _SendMessage(stale_conn, {'stale': True})
+    stale_conn.close()
+
+
 def PrintUsage(message):
   """Prints a brief usage string and exits, optionally with an error message.
 
@@ -4684,7 +5348,10 @@ def ParseArguments(args):
                                                  'filter=',
                                                  'root=',
                                                  'linelength=',
-                                                 'extensions='])
+                                                 'extensions=',
+                                                 'jobs=',
+                                                 'cache=',
+                                                 'profile='])
   except getopt.GetoptError:
     PrintUsage('Invalid arguments.')
 
@@ -4725,6 +5392,20 @@ def ParseArguments(args):
           _valid_extensions = set(val.split(','))
       except ValueError:
           PrintUsage('Extensions must be comma seperated list.')
+    elif opt == '--jobs':
+      global _jobs
+      try:
+          _jobs = int(val)
+      except ValueError:
+          PrintUsage('Number of jobs must be digits.')
+      if _jobs < 1:
+        PrintUsage('Number of jobs must be at least 1.')
+    elif opt == '--cache':
+      global _cache_dir
+      _cache_dir = val
+    elif opt == '--profile':
+      global _profile_file
+      _profile_file = val
 
   if not filenames:
     PrintUsage('No files were specified.')
@@ -4737,8 +5418,9 @@ def ParseArguments(args):
   return filenames
 
 
-def main():
-  filenames = ParseArguments(sys.argv[1:])
+def _LintMain(args):
+  """Lints the files given by the command line arguments and exits."""
+  filenames = ParseArguments(args)
   # Filter files we don't want to lint.
   # This should really be done in cmake.
   # -Greg
@@ -4752,13 +5434,27 @@ def main():
                                          codecs.getwriter('utf8'),
                                          'replace')
 
+  if _profile_file:
+    _EnableCheckProfiler()
+
   _cpplint_state.ResetErrorCounts()
-  for filename in filenames:
-    ProcessFile(filename, _cpplint_state.verbose_level)
+  ProcessFiles(filenames)
   _cpplint_state.PrintErrorCounts()
 
+  if _check_profiler:
+    _check_profiler.PrintReport()
+    _check_profiler.WriteJson(_profile_file)
+
   sys.exit(_cpplint_state.error_count > 0)
 
 
+def main():
+  args = sys.argv[1:]
+  if len(args) == 1 and args[0].startswith('--server='):
+    RunServer(args[0][len('--server='):])
+  else:
+    _LintMain(args)
+
+
 if __name__ == '__main__':
   main()
@@ -0,0 +1,141 @@
+#
+#     This file is part of CasADi.
+#
+#     Copyright (C) 2019 Jonas Koenemann
+#
+#     This program is free software; you can redistribute it and/or
+#     modify it under the terms of the GNU General Public
+#     License as published by the Free Software Foundation; either
+#     version 3 of the License, or (at your option) any later version.
+#
+#     This program is distributed in the hope that it will be useful,
+#     but WITHOUT ANY WARRANTY; without even the implied warranty of
+#     MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#     General Public License for more details.
+#
+#     You should have received a copy of the GNU General Public
+#     License along with this program;
+#     if not, write to the Free Software
+#     Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+#
+#
+
+# Thin client for the server mode of cpplint.py
+# usage: cpplint_client.py --socket=<path> [cpplint.py arguments] <file> ...
+#
+# The files are linted by a cpplint.py server listening on the given Unix
+# socket, which is started if it is not running yet.  This avoids loading
+# cpplint.py for every lint target.  Where Unix sockets are not available,
+# or the server cannot be reached, cpplint.py is run directly.
+
+import hashlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+CPPLINT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cpplint.py')
+
+# Seconds to wait for a newly started server to accept connections
+SERVER_STARTUP_TIMEOUT = 10.0
+
+# Unix socket paths are limited to about 100 characters
+MAX_SOCKET_PATH = 100
+
+
+def socket_path(path):
+  """Returns a usable socket path, shortening paths that are too long"""
+  path = os.path.abspath(path)
+  if len(path) > MAX_SOCKET_PATH:
+    digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+    path = os.path.join(tempfile.gettempdir(), 'cpplint-%s.sock' % digest)
+  return path
+
+
+def connect(path):
+  """Returns a socket connected to the server, or None"""
+  conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  try:
+    conn.connect(path)
+  except socket.error:
+    conn.close()
+    return None
+  return conn
+
+
+def start_server(path):
+  """Starts a server in the background and returns a connection to it"""
+  with open(os.devnull, 'r+') as devnull:
+    subprocess.Popen([sys.executable, CPPLINT, '--server=' + path],
+                     stdin=devnull, stdout=devnull, stderr=devnull,
+                     close_fds=True, preexec_fn=os.setsid)
+  deadline = time.time() + SERVER_STARTUP_TIMEOUT
+  while time.time() < deadline:
+    conn = connect(path)
+    if conn:
+      return conn
+    time.sleep(0.05)
+  return None
+
+
+def lint(conn, args):
+  """Sends a lint request and forwards the output
+
+  Returns the exit status, or None if the request was not handled.
+  """
+  request = {'cwd': os.getcwd(), 'args': args}
+  try:
+    conn.sendall((json.dumps(request) + '\n').encode('utf-8'))
+  except socket.error:
+    # The server closed the connection, e.g. because it is outdated
+    return None
+  handled = False
+  try:
+    for line in conn.makefile('rb'):
+      message = json.loads(line.decode('utf-8'))
+      if 'stale' in message:
+        return None
+      handled = True
+      if 'stderr' in message:
+        text = message['stderr']
+        if sys.version_info[0] < 3:
+          text = text.encode('utf-8')
+        sys.stderr.write(text)
+      elif 'exit' in message:
+        return message['exit']
+  except socket.error:
+    pass
+  if handled:
+    sys.stderr.write('cpplint server closed the connection\n')
+    return 1
+  return None
+
+
+def main():
+  args = sys.argv[1:]
+  path = None
+  if args and args[0].startswith('--socket='):
+    path = socket_path(args.pop(0)[len('--socket='):])
+
+  if path and hasattr(socket, 'AF_UNIX'):
+    # A second attempt is needed when the server is outdated
+    for attempt in range(2):
+      conn = connect(path) or start_server(path)
+      if not conn:
+        break
+      try:
+        status = lint(conn, args)
+      finally:
+        conn.close()
+      if status is not None:
+        sys.exit(status)
+
+  # No server available
+  sys.exit(subprocess.call([sys.executable, CPPLINT] + args))
+
+
+if __name__ == '__main__':
+  main()
@@ -21,12 +21,36 @@
 #     Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
 #
 #
-from pyparsing import *
-import hunspell
-hobj = hunspell.HunSpell('/usr/share/hunspell/en_US.dic', '/usr/share/hunspell/en_US.aff')
+
+# Spell and grammar checks the comments and strings of source files
+# usage: spellcheck.py [--jobs=N] [--languagetool=<jar>] [--cache=<dir>] [--mock]
+#                      <dir> <file> ...
+#
+# The files are split into N batches. Each batch is checked by a single
+# LanguageTool and a single hunspell process, and their findings are mapped
+# back to the files and lines they came from. With --mock, both checkers are
+# replaced by simple stand-ins implemented in this script, which only report
+# repeated words and the words in mock_misspellings, so that the pipeline
+# can be tried without Java or hunspell.
+#
+# With --cache, the findings for every file are stored in the given directory,
+# keyed by the text extracted from the file, the dictionary, the exclusions
+# and the checkers. Files whose extracted text did not change are not checked
+# again.
+
+try:
+  import hunspell
+  hobj = hunspell.HunSpell('/usr/share/hunspell/en_US.dic', '/usr/share/hunspell/en_US.aff')
+except ImportError:
+  hobj = None
 import subprocess
-from multiprocessing import Process, Queue, Lock, Pool, Manager
-from itertools import chain
+from multiprocessing import Pool
+import bisect
+import hashlib
+import json
+import tempfile
+
+languagetool_jar = '/home/jg/programs/LanguageTool-2.5/languagetool-commandline.jar'
 
 lt_exclusions = [
   'WHITESPACE_RULE',
@@ -54,143 +78,320 @@ import sys
 import re
 import os
 
-def checkfile(f,lock):
-  localsuccess = True
-  text = ""
-  spells = ""
+# Words reported by the mock spell checker, see mock_hunspell
+mock_misspellings = ['teh', 'recieve', 'seperate', 'occured', 'wich', 'paramter']
+
+# Comments and strings, as matched by cppStyleComment and dblQuotedString of
+# pyparsing. The lookahead makes the part before the closing delimiter
+# atomic, since pyparsing does not backtrack into a Regex element.
+comment_re = re.compile(r'(?=(/\*(?:[^*]|\*(?!/))*))\1\*/|//(?:\\\n|[^\n])*')
+string_re = re.compile(r'(?=("(?:[^"\n\r\\]|(?:"")|(?:\\(?:[^x]|x[0-9a-fA-F]+)))*))\1"')
+
+def keep_word(e):
+  return e.group(0) if hobj is None or hobj.spell(e.group()) else ''
+
+# Substitutions applied to every comment and string, in order. Each is only
+# attempted if the text contains one of its trigger strings (None: always).
+scrubs = [(triggers, re.compile(pattern, flags), repl) for (triggers, pattern, repl, flags) in [
+  (['NOLINT'], r'\bNOLINT\(.*?\)', '', 0),
+  (['-by-'], r'\s[^\s]+(-by-)[^\s\)]+(\s)', '\\2', 0),
+  #tex
+  (['\\begin'], '\\\\begin\{(equation|verbatim|pytex)\}.*?\\\\end\{\\1\}', '', re.DOTALL),
+  (['\\'], '\\\\(newcounter|setcounter|addtocounter|texttt|arabic|alph|ref|label|textit|emph)\{.*?\}', 'foo', re.DOTALL),
+  (['\\verb'], '\\\\verb\|.*?\|', '', re.DOTALL),
+  (None, '[\d\.]+\w+', '', 0),
+  (['\\begin'], '\\\\begin\{(.*?)\}(.*?)\\\\end\{\\1\}', '\\2', re.DOTALL),
+  (['\\'], '\\\\(usepackage|includegraphics).*?\{.*?\}', '', re.DOTALL),
+  (['$'], '\$.*?\$', '', 0),
+
+  (['['], '\[\w+\]', '', 0),
+  (['('], '\(\w+\s+x\s+\w+\)', '', 0),
+  (['\\', '@'], '[\\\\@](copydoc|a|e|p|param|defgroup)\s+\w+', '', 0),
+  (['-'], r'\b([A-Z]-)[A-Z_]{2,}\w+', '', 0),
+  (['-'], r'(?<!\w)-+(?!\w)', '', 0),
+  (['\\verbatim'], '\\\\verbatim(.*?)\\\\endverbatim', '', re.DOTALL),
+  (['\\f$'], '\\\\f\$(.*?)\\\\f\$', '', re.DOTALL),
+  (['\\f['], '\\\\f\[(.*?)\\\\f\]\$', '', re.DOTALL),
+
+  (None, r'\b\w+[A-Z]\w+\b', '', 0), # camelcase
+  (['_'], r'\b\w+_\w*\b', '', 0), # camelcase
+  (['\\', '@'], '[\\\\@][a-zA-Z]+\{.*?\}', '', 0),
+  (['\\', '@'], '[\\\\@][a-zA-Z{}]+', '', 0),
+
+  (['<tt>'], '<tt>.*?</tt>', '', 0),
+  (['<'], '</?\w+>', '', 0),
+  (['#'], '#\w+', '', 0),
+  (['*'], '\*', '', 0),
+
+  (['C'], 'C\d+', '', 0), # Visual studio warnings
+  (["'"], "'[^\s]*?'", '', 0),
+  (None, r'\b[ntdpcx][a-zA-Z0-9]\b', keep_word, 0), # should be escaped with \e
+  (['-'], "-\d+", '', 0),
+  (['\b'], "\b\w+\d+\b", '', 0),
+  (['- '], "- ", ' ', 0)]]
+
+def scrub(t):
+  """Removes markup, identifiers and the like from a comment or string"""
+  for (triggers, pattern, repl) in scrubs:
+    if triggers is None or any(trigger in t for trigger in triggers):
+      t = pattern.sub(repl, t)
+  return t
+
+def extract(f):
+  """Returns the text to check in a file, as a list of (lineno, line)"""
+  lines = []
   interface = None
   m = re.search("interfaces/(\w+)/",f)
   if m:
     interface = re.compile(r"\b"+m.group(1)+r"\b",re.I)
-  prevs = ("",0,0)
-  fc = file(f,'r').read()
+  fc = open(f,'r').read()
   if f.endswith(".tex"):
-    chunks = iter([(fc,0,0)])
+    chunks = [(fc,0)]
   else:
-    chunks = chain(cppStyleComment.scanString(fc),dblQuotedString.scanString(fc))
-  for (m,s,e) in chunks:
-
-    
-    lineno = len(fc[:s].split("\n"))
-    t = m if isinstance(m,str)  else m.asList()[0]
-    #if re.match("^\s+$",fc[prevs[2]:s]) and not t.startswith('///') and t.startswith('//') and prevs[0].startswith('///') and "@{" not in prevs[0] and "@}" not in prevs[0]:
-    #  print "%s:%d %s" % (f,lineno,m)
-    #prevs = (t,s,e)
+    # Positions refer to the text with tabs expanded, as with pyparsing
+    fc = fc.expandtabs()
+    chunks = [(m.group(),m.start()) for r in (comment_re, string_re) for m in r.finditer(fc)]
+  # Offsets of all line breaks, to look up line numbers
+  newlines = [m.start() for m in re.finditer("\n",fc)]
+  for (t,s) in chunks:
+    lineno = bisect.bisect_left(newlines,s)+1
     if t[1:-1].endswith(".hpp") or t[1:-1].endswith(".h"):
       continue
-      
-    
     if t.startswith("/*") and not t.startswith("/**"):
       continue
-    #if "//" in t[3:-3]:
-    #  continue
-    
-    t = re.sub(r'\bNOLINT\(.*?\)','',t)
-
-    t = re.sub(r'\s[^\s]+(-by-)[^\s\)]+(\s)','\\2',t)
-    
-    #tex
-    t = re.sub('\\\\begin\{(equation|verbatim|pytex)\}.*?\\\\end\{\\1\}','',t,flags=re.DOTALL)
-    t = re.sub('\\\\(newcounter|setcounter|addtocounter|texttt|arabic|alph|ref|label|textit|emph)\{.*?\}','foo',t,flags=re.DOTALL)
-    t = re.sub('\\\\verb\|.*?\|','',t,flags=re.DOTALL)
-    t = re.sub('[\d\.]+\w+','',t)
-    t = re.sub('\\\\begin\{(.*?)\}(.*?)\\\\end\{\\1\}','\\2',t,flags=re.DOTALL)
-    t = re.sub('\\\\(usepackage|includegraphics).*?\{.*?\}','',t,flags=re.DOTALL)
-    t = re.sub('\$.*?\$','',t)
-    
-    t = re.sub('\[\w+\]','',t)
-    t = re.sub('\(\w+\s+x\s+\w+\)','',t)
-    t = re.sub('[\\\\@](copydoc|a|e|p|param|defgroup)\s+\w+','',t)
-    t = re.sub(r'\b([A-Z]-)[A-Z_]{2,}\w+','',t)
-    t = re.sub(r'(?<!\w)-+(?!\w)','',t)
-    t = re.sub('\\\\verbatim(.*?)\\\\endverbatim','',t,flags=re.DOTALL)
-    t = re.sub('\\\\f\$(.*?)\\\\f\$','',t,flags=re.DOTALL)
-    t = re.sub('\\\\f\[(.*?)\\\\f\]\$','',t,flags=re.DOTALL)
-    
-
-    
-    t = re.sub(r'\b\w+[A-Z]\w+\b','',t) # camelcase
-    t = re.sub(r'\b\w+_\w*\b','',t) # camelcase
-    t = re.sub('[\\\\@][a-zA-Z]+\{.*?\}','',t)
-    t = re.sub('[\\\\@][a-zA-Z{}]+','',t)
-    
-    t = re.sub('<tt>.*?</tt>','',t)
-    t = re.sub('</?\w+>','',t)
-    t = re.sub('#\w+','',t)
-    t = re.sub('\*','',t)
-
-    t = re.sub('C\d+','',t) # Visual studio warnings
-    t = re.sub("'[^\s]*?'",'',t)
-    t = re.sub(r'\b[ntdpcx][a-zA-Z0-9]\b',lambda e: e.group(0) if hobj.spell(e.group()) else '',t) # should be escaped with \e
-    t = re.sub("-\d+",'',t)
-    t = re.sub("\b\w+\d+\b",'',t)
-    t = re.sub("- ",' ',t)
+    t = scrub(t)
     if interface is not None:
       t = interface.sub('',t)
-      
-    
-    text+= t+"\n"
-    #for w in t.split(" "):
-    #  if not hobj.spell(w):
-    #    success = False
-    #    spells+="Spelling error: %s (%s)\n" % (w,str(hobj.suggest(w)))
-    prevs = (t,s,e)
-    
-  p = subprocess.Popen(['java','-jar','/home/jg/programs/LanguageTool-2.5/languagetool-commandline.jar','-l','en','-d',",".join(lt_exclusions),'-'],stdin = subprocess.PIPE, stdout = subprocess.PIPE)
+
+    # Line numbers are exact unless scrubbing removed line breaks
+    for i, line in enumerate(t.split("\n")):
+      lines.append((lineno+i, line))
+  return lines
+
+def checker_commands(mock):
+  """Returns the LanguageTool and hunspell commands"""
+  dic = os.path.join(os.path.dirname(os.path.abspath(__file__)),'casadi.dic')
+  if mock:
+    script = [sys.executable, os.path.abspath(__file__)]
+    return (script + ['--mock-languagetool'],
+            script + ['--mock-hunspell', '-p', dic])
+  return (['java','-jar',languagetool_jar,'-l','en','-d',",".join(lt_exclusions),'-'],
+          ['hunspell','-a','-p',dic])
+
+class CheckerError(Exception):
+  """A checker process could not be run or failed"""
+  pass
+
+def run_checker(command, text):
+  """Runs a checker on text, returning its output
+
+  Raises CheckerError if the checker is missing or exits with an error, so
+  that a broken checker is never mistaken for a clean result.
+  """
+  try:
+    p = subprocess.Popen(command,stdin = subprocess.PIPE, stdout = subprocess.PIPE)
+  except OSError as e:
+    raise CheckerError("Could not run %s: %s" % (command[0],e))
   out, err = p.communicate(text)
-  if len(out.split("\n")[2:-2]) > 0:
-    localsuccess = False
-  ph = subprocess.Popen(['hunspell','-l','-p','casadi.dic'],stdin = subprocess.PIPE, stdout = subprocess.PIPE)
-  outh, errh = ph.communicate(text)
-  
-  if len(outh) > 0:
-    localsuccess = False
-  if not localsuccess:
-    lock.acquire()
-    print "In file %s" % f
-    print "\n".join(out.split("\n")[2:-2])
-    print outh
-    lock.release()
-    return False
-  else:
-    return True
-  
+  if p.returncode!=0:
+    raise CheckerError("%s failed with exit status %d" % (" ".join(command),p.returncode))
+  return out
 
-if __name__ == "__main__":
-  pool = Pool(processes=16)
+def run_languagetool(command, text):
+  """Grammar checks text, returning a list of (line, message)"""
+  out = run_checker(command, text)
+  diagnostics = []
+  # Each match starts with a header like
+  # 1.) Line 3, column 5, Rule ID: EN_A_VS_AN
+  # followed by the message and context, up to an empty line
+  for block in out.split("\n\n"):
+    m = re.search(r'^\d+\.\) Line (\d+), column (\d+), Rule ID: (.*)$',block,re.M)
+    if m:
+      details = block[m.end():].strip("\n").replace("\n","\n    ")
+      diagnostics.append((int(m.group(1)), "%s (column %s)\n    %s" % (m.group(3),m.group(2),details)))
+  return diagnostics
 
-  dir = sys.argv[1]
-  files = sys.argv[2:]
+def run_hunspell(command, lines):
+  """Spell checks lines, returning a list of (line, message)"""
+  # In pipe mode, hunspell answers every input line with one result line per
+  # word, followed by an empty line. The '^' prefix prevents input from being
+  # interpreted as a command.
+  out = run_checker(command, "".join("^"+line+"\n" for line in lines))
+  results = out.split("\n")
+  if results and results[0].startswith("@(#)"):
+    results = results[1:]
+  diagnostics = []
+  lineno = 1
+  for r in results:
+    if not r:
+      lineno += 1
+    elif r[0] in "&#?":
+      diagnostics.append((lineno, "Spelling error: %s" % r.split()[1]))
+  return diagnostics
 
-  if 'core' in dir:
-    sys.exit(0)
+def cache_salt(commands):
+  """Returns a digest of everything besides the text that affects findings"""
+  dic = os.path.join(os.path.dirname(os.path.abspath(__file__)),'casadi.dic')
+  salt = hashlib.sha1()
+  salt.update(open(dic,'rb').read())
+  salt.update(json.dumps([lt_exclusions, commands]))
+  return salt.hexdigest()
 
-  success = True
-  
-  results = []
+def read_cache(cache, key):
+  """Returns the cached findings for a file as a list of (lineno, message), or None"""
+  try:
+    return [tuple(d) for d in json.load(open(os.path.join(cache,key+'.json')))]
+  except (IOError, ValueError):
+    return None
 
-  queue = Queue()
+def write_cache(cache, key, diagnostics):
+  """Stores the findings for a file, ignoring failures"""
+  try:
+    if not os.path.isdir(cache):
+      os.makedirs(cache)
+    # Write a temporary file first, so that entries are never seen partially
+    (fd, tmp) = tempfile.mkstemp(dir=cache,suffix='.tmp')
+    with os.fdopen(fd,'w') as out:
+      json.dump(diagnostics,out)
+    os.rename(tmp,os.path.join(cache,key+'.json'))
+  except (IOError, OSError):
+    pass
 
-  manager = Manager()
-  lock = manager.Lock()
+def check_batch(args):
+  """Checks a batch of files with one checker process of each kind
 
+  Returns a list of (file, lineno, message).
+  """
+  files, languagetool_command, hunspell_command, cache, salt = args
+  results = []
+  lines = []
+  origin = []
+  keys = {}
   for f in files:
-    localsuccess = True
-    ff = os.path.join(dir,f)
-    if f.endswith("cpp"):
-      continue
-    results.append(pool.apply_async(checkfile, args=(ff,lock)))
-    
-  pool.close()
-  pool.join()
-  
-  success = True
-  
-  for r in results:
-    if not r.get():
-      success = False
+    extracted = extract(f)
+    if cache:
+      key = hashlib.sha1(salt+json.dumps(extracted)).hexdigest()
+      cached = read_cache(cache,key)
+      if cached is not None:
+        results+= [(f, lineno, message) for (lineno, message) in cached]
+        continue
+      keys[f] = key
+    for (lineno, line) in extracted:
+      lines.append(line)
+      origin.append((f,lineno))
+    # An empty line ends the paragraph, so that no sentence spans two files
+    lines.append("")
+    origin.append(None)
+
+  if not lines:
+    return results
+
+  # A failing checker raises CheckerError, so nothing of the batch is cached
+  diagnostics = run_languagetool(languagetool_command, "\n".join(lines)+"\n")
+  diagnostics+= run_hunspell(hunspell_command, lines)
 
-  if success:
+  checked = dict((f,[]) for f in keys)
+  for (line, message) in diagnostics:
+    if 0 < line <= len(origin) and origin[line-1] is not None:
+      f, lineno = origin[line-1]
+      results.append((f, lineno, message))
+      if f in checked:
+        checked[f].append((lineno, message))
+  for f in keys:
+    write_cache(cache,keys[f],checked[f])
+  return results
+
+def mock_languagetool():
+  """Stand-in for LanguageTool which only reports repeated words"""
+  text = sys.stdin.read()
+  sys.stdout.write("Expected text language: English (US)\nWorking on STDIN...\n")
+  n = 0
+  for i, line in enumerate(text.split("\n")):
+    for m in re.finditer(r'\b(\w+)\s+\1\b',line,re.I):
+      n+= 1
+      sys.stdout.write("%d.) Line %d, column %d, Rule ID: MOCK_WORD_REPEAT\n" % (n,i+1,m.start()+1))
+      sys.stdout.write("Message: Possible typo: you repeated a word\n%s\n\n" % line)
+  sys.stdout.write("Time: 0ms for 0 sentences (0.0 sentences/sec)\n")
+
+def mock_hunspell(dictionaries):
+  """Stand-in for 'hunspell -a' which only reports mock_misspellings"""
+  known = set()
+  for d in dictionaries:
+    known.update(w.strip() for w in open(d))
+  sys.stdout.write("@(#) International Ispell Version 3.2.06 (but really mock)\n")
+  for line in sys.stdin:
+    line = line.rstrip("\n")
+    if line.startswith("^"):
+      line = line[1:]
+    for m in re.finditer(r"[A-Za-z']+",line):
+      w = m.group()
+      if w.lower() in mock_misspellings and w not in known:
+        sys.stdout.write("# %s %d\n" % (w,m.start()))
+      else:
+        sys.stdout.write("*\n")
+    sys.stdout.write("\n")
+
+if __name__ == "__main__":
+  args = sys.argv[1:]
+  if args and args[0]=='--mock-languagetool':
+    mock_languagetool()
     sys.exit(0)
-  else:
+  if args and args[0]=='--mock-hunspell':
+    mock_hunspell(args[2:] if args[1:2]==['-p'] else [])
+    sys.exit(0)
+
+  # Options
+  mock = False
+  jobs = 16
+  cache = None
+  while args and args[0].startswith('--'):
+    opt = args.pop(0)
+    if opt=='--mock':
+      mock = True
+    elif opt.startswith('--jobs='):
+      jobs = int(opt[len('--jobs='):])
+    elif opt.startswith('--languagetool='):
+      languagetool_jar = opt[len('--languagetool='):]
+    elif opt.startswith('--cache='):
+      cache = os.path.abspath(opt[len('--cache='):])
+    else:
+      sys.exit("Unknown option %s" % opt)
+
+  dir = args[0]
+  files = args[1:]
+
+  if 'core' in dir:
+    sys.exit(0)
+
+  files = [os.path.join(dir,f) for f in files if not f.endswith("cpp")]
+  if not files:
+    sys.exit(0)
+
+  # Each batch is checked by a single LanguageTool and hunspell process
+  languagetool_command, hunspell_command = checker_commands(mock)
+  salt = cache_salt([languagetool_command, hunspell_command]) if cache else None
+  jobs = max(1,min(jobs,len(files)))
+  batches = [(files[i::jobs], languagetool_command, hunspell_command, cache, salt) for i in range(jobs)]
+  pool = Pool(processes=jobs)
+  try:
+    results = sum(pool.map(check_batch, batches),[])
+  except CheckerError as e:
+    sys.exit("spellcheck: %s" % e)
+  finally:
+    pool.close()
+    pool.join()
+
+  # Report per file, in the order of the command line
+  order = dict((f,i) for i, f in enumerate(files))
+  results.sort(key=lambda r: (order[r[0]],r[1]))
+  current = None
+  for (f, lineno, message) in results:
+    if f!=current:
+      sys.stdout.write("In file %s\n" % f)
+      current = f
+    sys.stdout.write("%s:%d: %s\n" % (f,lineno,message))
+
+  if results:
     sys.exit(1)
+  else:
+    sys.exit(0)
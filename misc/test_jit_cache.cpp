@@ -0,0 +1,117 @@
+/*
+ *
+ *    Copyright (C) 2019 Jonas Koenemann
+ *
+ *    This program is free software; you can redistribute it and/or
+ *    modify it under the terms of the GNU General Public
+ *    License as published by the Free Software Foundation; either
+ *    version 3 of the License, or (at your option) any later version.
+ *
+ *    This program is distributed in the hope that it will be useful,
+ *    but WITHOUT ANY WARRANTY; without even the implied warranty of
+ *    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ *    General Public License for more details.
+ *
+ *    You should have received a copy of the GNU General Public
+ *    License along with this program;
+ *    if not, write to the Free Software
+ *    Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ */
+
+
+// Checks that a second process loads a jit compiled function from the cache
+// filled by a first one
+// usage: test_jit_cache [compiler plugin]
+//
+// The second process runs with an empty PATH, such that the "shell" compiler
+// plugin cannot invoke the compiler: it only succeeds on a cache hit.
+// Built with "make test_jit_cache", it is not part of the default build.
+// POSIX only.
+
+#include <casadi/casadi.hpp>
+#include <dirent.h>
+#include <climits>
+#include <cmath>
+#include <cstdlib>
+#include <iostream>
+#include <string>
+#include <vector>
+
+using namespace casadi;
+
+// Jit compiled function, using the cache in dir
+Function jit_function(const std::string& dir, const std::string& compiler) {
+  SX x = SX::sym("x", 2);
+  Dict opts;
+  opts["jit"] = true;
+  opts["jit_cache"] = dir;
+  opts["compiler"] = compiler;
+  return Function("f", {x}, {sin(x)*x(0)}, opts);
+}
+
+// Evaluates the function and checks the result
+bool check(const Function& f) {
+  std::vector<double> r = f(DM({1, 2})).at(0).nonzeros();
+  return std::abs(r[0] - sin(1.)) < 1e-12 && std::abs(r[1] - sin(2.)) < 1e-12;
+}
+
+// Number of libraries in the cache
+casadi_int count_libraries(const std::string& dir) {
+  casadi_int n = 0;
+  DIR* d = opendir(dir.c_str());
+  if (d==nullptr) return 0;
+  while (struct dirent* e = readdir(d)) {
+    std::string name = e->d_name;
+    for (std::string suffix : {".so", ".dylib"}) {
+      if (name.size()>suffix.size() &&
+          name.compare(name.size()-suffix.size(), suffix.size(), suffix)==0) n++;
+    }
+  }
+  closedir(d);
+  return n;
+}
+
+int main(int argc, char* argv[]) {
+  // Second process: must be served from the cache
+  if (argc==4 && std::string(argv[1])=="--child") {
+    try {
+      return check(jit_function(argv[2], argv[3])) ? 0 : 1;
+    } catch (std::exception& e) {
+      std::cerr << e.what() << std::endl;
+      return 1;
+    }
+  }
+
+  std::string compiler = argc>1 ? argv[1] : "shell";
+  char dir[] = "/tmp/casadi_jit_cache_XXXXXX";
+  char self[PATH_MAX];
+  if (mkdtemp(dir)==nullptr || realpath(argv[0], self)==nullptr) {
+    std::cerr << "Failed to set up the test" << std::endl;
+    return 1;
+  }
+
+  // First process: compile and add to the cache
+  if (!check(jit_function(dir, compiler))) {
+    std::cerr << "Wrong result of the compiled function" << std::endl;
+    return 1;
+  }
+  if (count_libraries(dir)!=1) {
+    std::cerr << "Expected one library in " << dir << ", got " << count_libraries(dir)
+              << ". Does the '" << compiler << "' plugin report its library?" << std::endl;
+    return 1;
+  }
+
+  // Second process, without a compiler on the PATH
+  std::string cmd = std::string("PATH= '") + self + "' --child " + dir + " " + compiler;
+  if (std::system(cmd.c_str())!=0) {
+    std::cerr << "The second process did not hit the cache" << std::endl;
+    return 1;
+  }
+  if (count_libraries(dir)!=1) {
+    std::cerr << "The second process added to the cache" << std::endl;
+    return 1;
+  }
+  std::cout << "The second process loaded the function from " << dir << std::endl;
+  return 0;
+}
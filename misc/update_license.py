@@ -22,49 +22,149 @@
 #
 #
 
-# updates the copyright information for all .cs files
-# usage: call recursive_traversal, with the following parameters
-# parent directory, old copyright text content, new copyright text content
+# updates the copyright header of all source files below a directory
+# usage: python3 update_license.py [--python] [--header FILE] [--old-header FILE]
+#                                  [--check] [--diff] [--jobs N] [root]
+#
+# A file is updated by removing the old header, if present, and prepending the
+# new one, unless the file already starts with it. Running the tool twice
+# changes nothing the second time. Up-to-date files are recognized from their
+# first few bytes, without reading them completely. Files are written
+# atomically, so an interrupted run never leaves a truncated file behind.
+#
+# --check only reports the files that would be updated and exits with status 1
+# if there are any, --diff additionally prints the changes. Neither writes.
 
+import argparse
+import concurrent.futures
+import difflib
 import os
+import shutil
+import sys
+import tempfile
+
+# Byte order mark of UTF-8 files, which is kept in front of the header
+utfstr = b'\xef\xbb\xbf'
+
+# Directory names that are never descended into
+excludedir = {'.git', '.hg', '.svn', 'Lib'}
+
+# File extensions and header files, per kind of source
+sources = {
+    'cpp': (('.cpp', '.hpp', '.h', '.i'),
+            'license_header.txt', 'old_license_header.txt'),
+    'python': (('.py',),
+               'license_header_python.txt', 'old_license_header_python.txt'),
+}
 
-excludedir = ["..\\Lib"]
-
-def update_source(filename, oldcopyright, copyright):
-    utfstr = chr(0xef)+chr(0xbb)+chr(0xbf)
-    fdata = file(filename,"r+").read()
-    isUTF = False
-    if (fdata.startswith(utfstr)):
-        isUTF = True
-        fdata = fdata[3:]
-    if (oldcopyright != None):
-        if (fdata.startswith(oldcopyright)):
-            fdata = fdata[len(oldcopyright):]
-    if not (fdata.startswith(copyright)):
-        print "updating "+filename
+
+def find_sources(dir, extensions):
+    """Yields all files below dir with one of the extensions, without following links"""
+    with os.scandir(dir) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in excludedir:
+                    yield from find_sources(entry.path, extensions)
+            elif entry.is_file(follow_symlinks=False) and entry.name.endswith(extensions):
+                yield entry.path
+
+
+def updated_source(fdata, oldcopyright, copyright):
+    """Returns the contents of a file with the new header"""
+    bom = b''
+    if fdata.startswith(utfstr):
+        bom = utfstr
+        fdata = fdata[len(utfstr):]
+    if oldcopyright and fdata.startswith(oldcopyright):
+        fdata = fdata[len(oldcopyright):]
+    if not fdata.startswith(copyright):
         fdata = copyright + fdata
-        if (isUTF):
-            file(filename,"w").write(utfstr+fdata)
-        else:
-            file(filename,"w").write(fdata)
-
-def recursive_traversal(dir,  oldcopyright, copyright):
-    global excludedir
-    fns = os.listdir(dir)
-    print "listing "+dir
-    for fn in fns:
-        fullfn = os.path.join(dir,fn)
-        if (fullfn in excludedir):
-            continue
-        if (os.path.isdir(fullfn)):
-            recursive_traversal(fullfn, oldcopyright, copyright)
-        else:
-            if (fullfn.endswith(".cpp") or fullfn.endswith(".hpp") or fullfn.endswith(".h") or fullfn.endswith(".i")):
-                update_source(fullfn, oldcopyright, copyright)
-
-
-oldcright = file("old_license_header.txt","r+").read()
-#oldcright = None
-cright = file("license_header.txt","r+").read()
-recursive_traversal("..", oldcright, cright)
-exit()
+    return bom + fdata
+
+
+def write_atomic(filename, fdata):
+    """Replaces the contents of a file, keeping its permissions"""
+    fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(filename), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(fdata)
+        shutil.copymode(filename, tmpname)
+        os.replace(tmpname, filename)
+    except BaseException:
+        os.unlink(tmpname)
+        raise
+
+
+def update_source(filename, oldcopyright, copyright, write=True, diff=False):
+    """Brings the header of a file up to date
+
+    Returns None if the file is up to date, otherwise the lines of a diff of
+    the change (empty unless diff is set).
+    """
+    with open(filename, 'rb') as f:
+        # Enough to tell whether the header is already correct
+        prefix = f.read(len(utfstr) + len(oldcopyright or b'') + len(copyright))
+        if updated_source(prefix, oldcopyright, copyright) == prefix:
+            return None
+        if not write and not diff:
+            return []
+        fdata = prefix + f.read()
+    newdata = updated_source(fdata, oldcopyright, copyright)
+    if newdata == fdata:
+        return None
+    if write:
+        write_atomic(filename, newdata)
+    if not diff:
+        return []
+    return list(difflib.unified_diff(
+        fdata.decode('utf-8', 'replace').splitlines(True),
+        newdata.decode('utf-8', 'replace').splitlines(True),
+        filename, filename))
+
+
+def main():
+    kinds = sorted(sources)
+    parser = argparse.ArgumentParser(description='Updates the copyright header of source files.')
+    parser.add_argument('root', nargs='?',
+                        default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        help='directory to process (default: the repository)')
+    parser.add_argument('--kind', choices=kinds, default='cpp',
+                        help='kind of source files (default: cpp)')
+    parser.add_argument('--python', dest='kind', action='store_const', const='python',
+                        help='same as --kind=python')
+    parser.add_argument('--header', help='file with the new header')
+    parser.add_argument('--old-header', help='file with the header to replace')
+    parser.add_argument('--check', action='store_true',
+                        help='only list outdated files, exit with status 1 if there are any')
+    parser.add_argument('--diff', action='store_true',
+                        help='print the changes instead of writing them')
+    parser.add_argument('--jobs', type=int, default=8, help='number of threads')
+    args = parser.parse_args()
+
+    extensions, header, old_header = sources[args.kind]
+    with open(args.header or header, 'rb') as f:
+        copyright = f.read()
+    oldcopyright = None
+    if args.old_header or os.path.exists(old_header):
+        with open(args.old_header or old_header, 'rb') as f:
+            oldcopyright = f.read()
+
+    write = not (args.check or args.diff)
+    files = sorted(find_sources(args.root, extensions))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        results = pool.map(lambda fn: update_source(fn, oldcopyright, copyright, write, args.diff),
+                           files)
+        outdated = 0
+        for fn, result in zip(files, results):
+            if result is None:
+                continue
+            outdated += 1
+            print(("updating " if write else "outdated ") + fn)
+            sys.stdout.writelines(result)
+
+    if args.check and outdated:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
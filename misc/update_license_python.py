@@ -22,48 +22,16 @@
 #
 #
 
-# updates the copyright information for all .cs files
-# usage: call recursive_traversal, with the following parameters
-# parent directory, old copyright text content, new copyright text content
+# updates the copyright header of all .py files
+# usage: python3 update_license_python.py [update_license.py options] [root]
+# same as update_license.py --python
 
 import os
+import sys
 
-excludedir = ["..\\Lib"]
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import update_license
 
-def update_source(filename, oldcopyright, copyright):
-    utfstr = chr(0xef)+chr(0xbb)+chr(0xbf)
-    fdata = file(filename,"r+").read()
-    isUTF = False
-    if (fdata.startswith(utfstr)):
-        isUTF = True
-        fdata = fdata[3:]
-    if (oldcopyright != None):
-        if (fdata.startswith(oldcopyright)):
-            fdata = fdata[len(oldcopyright):]
-    if not (fdata.startswith(copyright)):
-        print "updating "+filename
-        fdata = copyright + fdata
-        if (isUTF):
-            file(filename,"w").write(utfstr+fdata)
-        else:
-            file(filename,"w").write(fdata)
-
-def recursive_traversal(dir,  oldcopyright, copyright):
-    global excludedir
-    fns = os.listdir(dir)
-    print "listing "+dir
-    for fn in fns:
-        fullfn = os.path.join(dir,fn)
-        if (fullfn in excludedir):
-            continue
-        if (os.path.isdir(fullfn)):
-            recursive_traversal(fullfn, oldcopyright, copyright)
-        else:
-            if (fullfn.endswith(".py") ):
-                update_source(fullfn, oldcopyright, copyright)
-
-
-oldcright = file("old_license_header_python.txt","r+").read()
-cright = file("license_header_python.txt","r+").read()
-recursive_traversal("..", oldcright, cright)
-exit()
+if __name__ == '__main__':
+    sys.argv.insert(1, '--python')
+    update_license.main()